@@ -0,0 +1,71 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import TestCase
+
+import numpy as np
+from gym.spaces import Box, Discrete, MultiBinary, MultiDiscrete, Tuple
+
+from ude_gym_bridge.action_batch import ActionBatchDecoder
+
+AGENT_NAMES = ["agent0", "agent1", "agent2"]
+
+
+class ActionBatchDecoderTest(TestCase):
+    def test_unsupported_space(self):
+        with self.assertRaises(ValueError):
+            ActionBatchDecoder(AGENT_NAMES, Tuple([Discrete(2), Discrete(2)]))
+
+    def test_discrete(self):
+        decoder = ActionBatchDecoder(AGENT_NAMES, Discrete(3))
+        actions = decoder.decode(np.array([0, 2, 1]))
+        assert actions == {"agent0": 0, "agent1": 2, "agent2": 1}
+        assert all(type(action) is int for action in actions.values())
+        # The actions are kept across calls.
+        assert decoder.decode([1, 1, 1]) == {"agent0": 1, "agent1": 1, "agent2": 1}
+        assert actions == {"agent0": 0, "agent1": 2, "agent2": 1}
+
+        for batch in [[0, 3, 1], [-1, 0, 0], [0, 1], [0.0, 1.0, 2.0], [[0], [1], [2]]]:
+            with self.assertRaises(ValueError):
+                decoder.decode(batch)
+
+    def test_discrete_start(self):
+        decoder = ActionBatchDecoder(AGENT_NAMES, Discrete(3, start=1))
+        assert decoder.decode([1, 2, 3])["agent2"] == 3
+        with self.assertRaises(ValueError):
+            decoder.decode([0, 1, 2])
+
+    def test_box(self):
+        decoder = ActionBatchDecoder(AGENT_NAMES, Box(low=-1.0, high=1.0, shape=(2,), dtype=np.float32))
+        batch = np.array([[0.0, 0.5], [-1.0, 1.0], [0.25, 0.0]], dtype=np.float32)
+        actions = decoder.decode(batch)
+        np.testing.assert_array_equal(actions["agent1"], [-1.0, 1.0])
+        assert np.shares_memory(actions["agent1"], batch)
+
+        with self.assertRaises(ValueError):
+            decoder.decode(np.array([[0.0, 1.5], [0.0, 0.0], [0.0, 0.0]]))
+        with self.assertRaises(ValueError):
+            decoder.decode(np.zeros((3, 3)))
+
+    def test_multi_discrete_and_multi_binary(self):
+        decoder = ActionBatchDecoder(AGENT_NAMES, MultiDiscrete([2, 3]))
+        np.testing.assert_array_equal(decoder.decode([[1, 2], [0, 0], [1, 1]])["agent0"], [1, 2])
+        with self.assertRaises(ValueError):
+            decoder.decode([[1, 3], [0, 0], [1, 1]])
+
+        decoder = ActionBatchDecoder(AGENT_NAMES, MultiBinary(2))
+        np.testing.assert_array_equal(decoder.decode([[1, 0], [0, 0], [1, 1]])["agent2"], [1, 1])
+        with self.assertRaises(ValueError):
+            decoder.decode([[2, 0], [0, 0], [1, 1]])
@@ -0,0 +1,104 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+import json
+
+from ude_gym_bridge.adaptive_step_scheduler import AdaptiveStepScheduler
+
+
+class AdaptiveStepSchedulerTest(TestCase):
+    def test_invalid_bounds(self):
+        with self.assertRaises(ValueError):
+            AdaptiveStepScheduler(min_period=1.0, max_period=0.5)
+        with self.assertRaises(ValueError):
+            AdaptiveStepScheduler(min_timeout=0.0)
+        with self.assertRaises(ValueError):
+            AdaptiveStepScheduler(decrease_factor=1.0)
+        with self.assertRaises(ValueError):
+            AdaptiveStepScheduler(update_interval=0)
+        with self.assertRaises(ValueError):
+            AdaptiveStepScheduler(late_factor=1.0)
+
+    def test_initial_values(self):
+        scheduler = AdaptiveStepScheduler(min_period=0.01, max_period=0.5, initial_period=0.1,
+                                          min_timeout=1.0, max_timeout=10.0)
+        assert scheduler.step_invoke_period == 0.1
+        assert scheduler.timeout_wait == 1.0
+        assert AdaptiveStepScheduler(max_period=0.5).step_invoke_period == 0.5
+
+    def test_initial_period_out_of_bounds_warns(self):
+        with self.assertLogs("ude_gym_bridge.adaptive_step_scheduler", level="WARNING"):
+            scheduler = AdaptiveStepScheduler(min_period=0.001, max_period=1.0, initial_period=120.0)
+        assert scheduler.step_invoke_period == 1.0
+
+    def test_shrink_when_every_action_arrives(self):
+        on_update = MagicMock()
+        scheduler = AdaptiveStepScheduler(min_period=0.01, max_period=1.0, decrease_factor=0.5,
+                                          smoothing=1.0, update_interval=2, on_update=on_update)
+        scheduler.record_step(num_actions=2, num_agents=2, step_cost=0.001)
+        on_update.assert_not_called()
+        scheduler.record_step(num_actions=2, num_agents=2, step_cost=0.001)
+        assert scheduler.step_invoke_period == 0.5
+        on_update.assert_called_once_with(0.5, scheduler.timeout_wait)
+
+        # The period never shrinks below the step cost with margin, nor the lower bound.
+        for _ in range(20):
+            scheduler.record_step(num_actions=2, num_agents=2, step_cost=0.1)
+        assert abs(scheduler.step_invoke_period - 0.1 * 1.2) < 1e-9
+        for _ in range(40):
+            scheduler.record_step(num_actions=2, num_agents=2, step_cost=0.0)
+        assert scheduler.step_invoke_period == 0.01
+
+    def test_grow_when_actions_miss_the_period(self):
+        scheduler = AdaptiveStepScheduler(min_period=0.01, max_period=1.0, initial_period=0.1,
+                                          min_timeout=0.1, max_timeout=2.0, update_interval=4)
+        scheduler.record_step(num_actions=1, num_agents=2, step_cost=0.01)
+        for _ in range(3):
+            scheduler.record_step(num_actions=2, num_agents=2, step_cost=0.01)
+        assert abs(scheduler.step_invoke_period - 0.15) < 1e-9
+        assert abs(scheduler.timeout_wait - 4.0 * (0.15 + 0.01)) < 1e-9
+
+        for _ in range(40):
+            scheduler.record_step(num_actions=0, num_agents=2, step_cost=0.01)
+        assert scheduler.step_invoke_period == 1.0
+        assert scheduler.timeout_wait == 2.0
+
+    def test_single_agent_grows_when_steps_are_late(self):
+        scheduler = AdaptiveStepScheduler(min_period=0.01, max_period=1.0, initial_period=0.1,
+                                          increase_factor=2.0, update_interval=2)
+        # Steps 0.1 s apart keep up with the period, and then come 0.5 s apart.
+        step_times = [0.0, 0.1, 0.2, 0.7, 1.2]
+        with patch("ude_gym_bridge.adaptive_step_scheduler.time.perf_counter", side_effect=step_times):
+            scheduler.record_step(num_actions=1, num_agents=1, step_cost=0.01)
+            scheduler.record_step(num_actions=1, num_agents=1, step_cost=0.01)
+            scheduler.record_step(num_actions=1, num_agents=1, step_cost=0.01)
+            assert scheduler.step_invoke_period < 0.1
+            scheduler.record_step(num_actions=1, num_agents=1, step_cost=0.01)
+            scheduler.record_step(num_actions=1, num_agents=1, step_cost=0.01)
+        assert scheduler.step_invoke_period > 0.1
+
+    def test_stats(self):
+        scheduler = AdaptiveStepScheduler(update_interval=1)
+        scheduler.record_step(num_actions=1, num_agents=2, step_cost=0.002)
+        scheduler.record_step(num_actions=1, num_agents=2, step_cost=0.002)
+        stats = json.loads(scheduler.to_json())
+        assert stats["step_invoke_period"] == scheduler.step_invoke_period
+        assert stats["timeout_wait"] == scheduler.timeout_wait
+        assert abs(stats["step_cost_ms"] - 2.0) < 1e-9
+        assert stats["arrival_rate"] < 1.0
+        assert stats["num_steps"] == 2
+        assert stats["steps_per_sec"] > 0
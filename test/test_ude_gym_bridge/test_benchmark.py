@@ -0,0 +1,127 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+import json
+import os
+import tempfile
+from unittest import mock, TestCase
+from unittest.mock import MagicMock
+
+from ude import Compression, UDEStepInvokeType
+
+from ude_gym_bridge.benchmark import run_benchmark, run_benchmarks, run_step_allocation_benchmark, main
+from ude_gym_bridge.observation_encoding import RawBufferObservationEncoder
+
+
+@mock.patch("ude_gym_bridge.benchmark.GymEnvRemoteRunner")
+@mock.patch("ude_gym_bridge.benchmark.RemoteEnvironmentAdapter")
+@mock.patch("ude_gym_bridge.benchmark.UDEEnvironment")
+class BenchmarkTest(TestCase):
+    def _set_up_ude_env(self, ude_env_mock, done_every=0):
+        ude_env_obj = ude_env_mock.return_value
+        action_space = MagicMock()
+        action_space.sample.return_value = 1
+        ude_env_obj.action_space = {"agent0": action_space}
+        ude_env_obj.reset.return_value = ({"agent0": [0.0] * 4}, {})
+        step_count = [0]
+
+        def step(action_dict):
+            step_count[0] += 1
+            done = bool(done_every) and step_count[0] % done_every == 0
+            return {"agent0": [0.0] * 4}, {"agent0": 1.0}, {"agent0": done}, action_dict, {}
+        ude_env_obj.step.side_effect = step
+        return ude_env_obj
+
+    def test_run_benchmark(self, ude_env_mock, remote_adapter_mock, runner_mock):
+        ude_env_obj = self._set_up_ude_env(ude_env_mock, done_every=5)
+        runner_mock.return_value.startup_times = {"adapter_init": 0.1}
+
+        result = run_benchmark(env_name="test_env", num_steps=20, num_resets=2, port=4000)
+
+        runner_mock.assert_called_once()
+        assert runner_mock.call_args[1]["port"] == 4000
+        assert runner_mock.call_args[1]["render"] is False
+        remote_adapter_mock.assert_called_once_with("localhost", port=4000,
+                                                    compression=Compression.NoCompression)
+        runner_mock.return_value.start.assert_called_once()
+        runner_mock.return_value.stop.assert_called_once()
+        ude_env_obj.close.assert_called_once()
+        assert ude_env_obj.step.call_count == 20
+        # 2 measured resets and 4 resets on done.
+        assert ude_env_obj.reset.call_count == 6
+        assert result["env_name"] == "test_env"
+        assert result["num_steps"] == 20
+        assert result["num_resets"] == 6
+        assert result["bytes_per_step"] > 0
+        assert result["steps_per_sec"] > 0
+        # Only the step calls are timed.
+        self.assertAlmostEqual(result["steps_per_sec"] * result["step_latency_mean_ms"] / 1000.0, 1.0)
+        assert result["startup_times"] == {"adapter_init": 0.1}
+        assert result["obs_encoding"] == "none"
+        assert runner_mock.call_args[1]["observation_encoder"] is None
+        for key in ["step_latency_p50_ms", "step_latency_p99_ms",
+                    "reset_latency_p50_ms", "reset_latency_p99_ms"]:
+            assert key in result
+
+    def test_run_benchmark_with_obs_encoding(self, ude_env_mock, remote_adapter_mock, runner_mock):
+        ude_env_obj = self._set_up_ude_env(ude_env_mock)
+        ude_env_obj.reset.return_value = ({"agent0": {"ude_obs_encoding": "raw", "dtype": "<f8",
+                                                      "shape": (1,), "data": b"\x00" * 8}}, {})
+        runner_mock.return_value.startup_times = {}
+
+        result = run_benchmark(env_name="test_env", num_steps=2, num_resets=1, port=4000, obs_encoding="raw")
+        assert result["obs_encoding"] == "raw"
+        assert isinstance(runner_mock.call_args[1]["observation_encoder"], RawBufferObservationEncoder)
+
+    def test_run_benchmark_stops_runner_on_error(self, ude_env_mock, remote_adapter_mock, runner_mock):
+        ude_env_mock.return_value.reset.side_effect = RuntimeError("reset failed")
+        with self.assertRaises(RuntimeError):
+            run_benchmark(env_name="test_env", num_steps=1, port=4000)
+        runner_mock.return_value.stop.assert_called_once()
+        ude_env_mock.return_value.close.assert_called_once()
+
+    def test_run_benchmarks(self, ude_env_mock, remote_adapter_mock, runner_mock):
+        self._set_up_ude_env(ude_env_mock)
+        runner_mock.return_value.startup_times = {}
+        results = run_benchmarks(env_names=["env_a", "env_b"],
+                                 compressions=[Compression.NoCompression, Compression.Gzip],
+                                 step_invoke_types=[UDEStepInvokeType.WAIT_FOREVER],
+                                 num_steps=2, num_resets=1, port=4000)
+        assert len(results) == 4
+        assert [(result["env_name"], result["compression"]) for result in results] == [
+            ("env_a", "NoCompression"), ("env_a", "Gzip"), ("env_b", "NoCompression"), ("env_b", "Gzip")]
+
+    def test_main(self, ude_env_mock, remote_adapter_mock, runner_mock):
+        self._set_up_ude_env(ude_env_mock)
+        runner_mock.return_value.startup_times = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = os.path.join(tmp_dir, "result.json")
+            main(["--env", "env_a", "--steps", "3", "--resets", "1",
+                  "--port", "4000", "--output", output_path])
+            with open(output_path) as f:
+                report = json.load(f)
+        assert len(report["results"]) == 1
+        assert report["results"][0]["env_name"] == "env_a"
+        assert report["results"][0]["step_invoke_type"] == "WAIT_FOREVER"
+
+
+class StepAllocationBenchmarkTest(TestCase):
+    def test_run_step_allocation_benchmark(self):
+        results = run_step_allocation_benchmark(env_name="CartPole-v1", num_envs=4, num_steps=50)
+        assert [result["mode"] for result in results] == ["per_agent", "batched"]
+        for result in results:
+            assert result["num_envs"] == 4
+            assert result["steps_per_sec"] > 0
+            assert result["bytes_per_step"] > 0
@@ -0,0 +1,91 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import gym
+import numpy as np
+
+from ude_gym_bridge.env_state import get_env_state, set_env_state
+from ude_gym_bridge.gym_wrappers import FrameStackWrapper
+
+
+class EnvStateTest(TestCase):
+    def test_classic_control_restore_is_deterministic(self):
+        env = gym.make("CartPole-v1")
+        env.reset(seed=0)
+        env.step(0)
+        state = get_env_state(env)
+
+        trajectories = []
+        for _ in range(2):
+            set_env_state(env, state)
+            trajectories.append([env.step(1)[0] for _ in range(3)]
+                                + [env.unwrapped.np_random.random()])
+        np.testing.assert_array_equal(trajectories[0][:3], trajectories[1][:3])
+        assert trajectories[0][3] == trajectories[1][3]
+        # TimeLimit elapsed steps are restored as well.
+        set_env_state(env, state)
+        assert env._elapsed_steps == 1
+        env.close()
+
+    def test_wrapper_state(self):
+        env = FrameStackWrapper(gym.make("CartPole-v1"), num_stack=2)
+        first_obs = env.reset(seed=0)
+        state = get_env_state(env)
+        env.step(0)
+        env.step(0)
+
+        set_env_state(env, state)
+        obs, _, _, _ = env.step(1)
+        np.testing.assert_array_equal(obs[0], first_obs[1])
+        env.close()
+
+    def test_mujoco_py_sim_state(self):
+        env = MagicMock(spec=["unwrapped"])
+        unwrapped = env.unwrapped = MagicMock(spec=["sim"])
+        state = get_env_state(env)
+        assert state["sim"] == unwrapped.sim.get_state.return_value
+
+        set_env_state(env, state)
+        unwrapped.sim.set_state.assert_called_once_with(unwrapped.sim.get_state.return_value)
+        unwrapped.sim.forward.assert_called_once()
+
+    def test_mujoco_qpos_qvel(self):
+        env = MagicMock(spec=["unwrapped"])
+        unwrapped = env.unwrapped = MagicMock(spec=["data", "set_state"])
+        unwrapped.data.qpos = np.array([1.0, 2.0])
+        unwrapped.data.qvel = np.array([3.0])
+        state = get_env_state(env)
+        unwrapped.data.qpos[0] = 5.0
+
+        set_env_state(env, state)
+        qpos, qvel = unwrapped.set_state.call_args[0]
+        np.testing.assert_array_equal(qpos, [1.0, 2.0])
+        np.testing.assert_array_equal(qvel, [3.0])
+
+    def test_ale_state(self):
+        env = MagicMock(spec=["unwrapped"])
+        unwrapped = env.unwrapped = MagicMock(spec=["ale"])
+        state = get_env_state(env)
+        set_env_state(env, state)
+        unwrapped.ale.restoreState.assert_called_once_with(unwrapped.ale.cloneState.return_value)
+
+    def test_unsupported_env(self):
+        env = MagicMock(spec=["unwrapped"])
+        env.unwrapped = MagicMock(spec=[])
+        with self.assertRaises(ValueError):
+            get_env_state(env)
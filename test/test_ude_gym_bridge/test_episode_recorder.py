@@ -0,0 +1,146 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import TestCase
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from ude_gym_bridge.episode_recorder import EpisodeReader, EpisodeRecorder
+
+
+class EpisodeRecorderTest(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.tmp_dir.name
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_initialization_with_invalid_chunk_size(self):
+        with self.assertRaises(ValueError):
+            EpisodeRecorder(self.directory, chunk_size=0)
+
+    def test_record_and_read(self):
+        recorder = EpisodeRecorder(self.directory, chunk_size=2)
+        recorder.record_reset("agent0", np.array([0.0, 0.0]))
+        for idx in range(1, 4):
+            recorder.record_step("agent0", idx % 2, np.array([float(idx), float(idx)]),
+                                 reward=float(idx), done=idx == 3)
+        recorder.close()
+
+        with open(os.path.join(self.directory, "metadata.json")) as f:
+            metadata = json.load(f)
+        assert [chunk["size"] for chunk in metadata["chunks"]] == [2, 1]
+
+        reader = EpisodeReader(self.directory)
+        assert len(reader) == 3
+        row = reader[2]
+        np.testing.assert_array_equal(row["obs"], [2.0, 2.0])
+        assert row["action"] == 1
+        assert row["reward"] == 3.0
+        assert row["done"]
+        np.testing.assert_array_equal(row["next_obs"], [3.0, 3.0])
+        assert row["episode_id"] == 0
+        batch = reader.get_batch([2, 0, 1])
+        np.testing.assert_array_equal(batch["obs"], [[2.0, 2.0], [0.0, 0.0], [1.0, 1.0]])
+        np.testing.assert_array_equal(batch["reward"], [3.0, 1.0, 2.0])
+        with self.assertRaises(IndexError):
+            reader[3]
+
+    def test_new_episode_and_agents(self):
+        recorder = EpisodeRecorder(self.directory)
+        recorder.record_reset("agent0", 0)
+        recorder.record_reset("agent1", 10)
+        recorder.record_step("agent0", 0, 1, reward=1.0, done=True, new_episode=True)
+        recorder.record_step("agent1", 0, 11, reward=1.0, done=False)
+        recorder.record_step("agent0", 0, 2, reward=1.0, done=False)
+        recorder.flush()
+
+        reader = EpisodeReader(self.directory)
+        batch = reader.get_batch(range(len(reader)))
+        np.testing.assert_array_equal(batch["obs"], [0, 10, 1])
+        np.testing.assert_array_equal(batch["next_obs"], [1, 11, 2])
+        np.testing.assert_array_equal(batch["episode_id"], [0, 1, 2])
+
+        # Rows written after the reader was opened become visible on refresh.
+        recorder.record_step("agent1", 0, 12, reward=1.0, done=False)
+        recorder.close()
+        reader.refresh()
+        assert len(reader) == 4
+
+    def test_terminal_obs_of_auto_reset_episode(self):
+        recorder = EpisodeRecorder(self.directory)
+        recorder.record_reset("agent0", 0)
+        recorder.record_step("agent0", 0, 1, reward=1.0, done=False)
+        recorder.record_step("agent0", 0, 10, reward=1.0, done=True, new_episode=True, terminal_obs=2)
+        recorder.record_step("agent0", 0, 11, reward=1.0, done=False)
+        recorder.close()
+
+        batch = EpisodeReader(self.directory).get_batch(range(3))
+        np.testing.assert_array_equal(batch["obs"], [0, 1, 10])
+        # The final row of the episode keeps its terminal observation.
+        np.testing.assert_array_equal(batch["next_obs"], [1, 2, 11])
+        np.testing.assert_array_equal(batch["episode_id"], [0, 0, 1])
+
+    def test_step_without_reset_starts_episode(self):
+        recorder = EpisodeRecorder(self.directory)
+        recorder.record_step("agent0", 0, 1, reward=1.0, done=False)
+        recorder.record_step("agent0", 0, 2, reward=1.0, done=False)
+        recorder.close()
+        reader = EpisodeReader(self.directory)
+        assert len(reader) == 1
+        assert reader[0]["obs"] == 1
+
+    def test_shape_change_starts_new_chunk(self):
+        recorder = EpisodeRecorder(self.directory, chunk_size=8)
+        recorder.record_reset("agent0", np.zeros(2))
+        recorder.record_step("agent0", 0, np.zeros(3), reward=0.0, done=True)
+        recorder.record_reset("agent0", np.zeros(3))
+        recorder.record_step("agent0", 0, np.zeros(3), reward=0.0, done=True)
+        recorder.close()
+
+        reader = EpisodeReader(self.directory)
+        assert len(reader) == 2
+        assert reader[0]["obs"].shape == (2,)
+        assert reader[1]["obs"].shape == (3,)
+
+    def test_write_error_is_raised(self):
+        recorder = EpisodeRecorder(self.directory, max_queue_size=2)
+        recorder.record_reset("agent0", {"position": np.zeros(2)})
+        recorder.record_step("agent0", 0, {"position": np.ones(2)}, reward=0.0, done=False)
+        # The writer thread fails on the object observation, and neither flush nor recording blocks.
+        with self.assertRaises(RuntimeError):
+            recorder.flush()
+        with self.assertRaises(RuntimeError):
+            for _ in range(4):
+                recorder.record_step("agent0", 0, {"position": np.ones(2)}, reward=0.0, done=False)
+        with self.assertRaises(RuntimeError):
+            recorder.close()
+
+    def test_sample(self):
+        recorder = EpisodeRecorder(self.directory, chunk_size=3)
+        recorder.record_reset("agent0", 0)
+        for idx in range(1, 11):
+            recorder.record_step("agent0", idx, idx, reward=float(idx), done=False)
+        recorder.close()
+
+        reader = EpisodeReader(self.directory)
+        batch = reader.sample(16, rng=np.random.default_rng(0))
+        assert batch["obs"].shape == (16,)
+        # Each row holds the observation the action was taken from.
+        np.testing.assert_array_equal(batch["action"], batch["obs"] + 1)
@@ -0,0 +1,129 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from threading import Event
+import struct
+import zlib
+
+import numpy as np
+
+from ude_gym_bridge.frame_capture import FrameCapture, downscale_frame, encode_png
+
+
+def decode_png(data: bytes) -> np.ndarray:
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos = 8
+    chunks = {}
+    while pos < len(data):
+        length, tag = struct.unpack(">I4s", data[pos:pos + 8])
+        chunks[tag] = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+    width, height, _, color_type = struct.unpack(">IIBB", chunks[b"IHDR"][:10])
+    channels = {0: 1, 2: 3, 6: 4}[color_type]
+    rows = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8).reshape(height, -1)
+    assert not rows[:, 0].any()
+    return rows[:, 1:].reshape(height, width, channels)
+
+
+def wait_captured(frame_capture: FrameCapture, count: int) -> None:
+    for _ in range(1000):
+        if frame_capture.stats()["captured"] >= count:
+            return
+        Event().wait(0.005)
+    raise AssertionError("Frames are not captured.")
+
+
+class FrameCaptureTest(TestCase):
+    def test_encode_png(self):
+        frame = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+        np.testing.assert_array_equal(decode_png(encode_png(frame)), frame)
+        gray = np.arange(6, dtype=np.uint8).reshape(2, 3)
+        np.testing.assert_array_equal(decode_png(encode_png(gray))[:, :, 0], gray)
+        with self.assertRaises(ValueError):
+            encode_png(np.zeros((2, 2, 2), dtype=np.uint8))
+
+    def test_downscale_frame(self):
+        frame = np.arange(5 * 4 * 3, dtype=np.uint8).reshape(5, 4, 3)
+        downscaled = downscale_frame(frame, 2)
+        assert downscaled.shape == (2, 2, 3)
+        assert downscaled.dtype == np.uint8
+        np.testing.assert_array_equal(downscaled[0, 0], frame[:2, :2].mean(axis=(0, 1)).astype(np.uint8))
+        assert downscale_frame(frame, 1) is frame
+
+    def test_capture_every_n_steps(self):
+        env = MagicMock()
+        env.render.return_value = np.ones((4, 4, 3), dtype=np.uint8)
+        frame_capture = FrameCapture(every_n_steps=2, downscale=2)
+        released = [frame_capture.on_step(env) for _ in range(4)]
+        assert released[1] is None and released[3] is None
+        for event in released[::2]:
+            if event:
+                assert event.wait(5)
+        frame_capture.close()
+
+        env.render.assert_called_with(mode="rgb_array")
+        stats = frame_capture.stats()
+        assert stats["captured"] + stats["dropped"] == 2
+        assert frame_capture.latest_frame.shape == (2, 2, 3)
+        np.testing.assert_array_equal(decode_png(frame_capture.latest_png()), frame_capture.latest_frame)
+
+    def test_target_fps(self):
+        env = MagicMock()
+        env.render.return_value = np.zeros((2, 2, 3), dtype=np.uint8)
+        frame_capture = FrameCapture(target_fps=0.001)
+        assert frame_capture.on_step(env) is not None
+        assert frame_capture.on_step(env) is None
+        frame_capture.close()
+        assert env.render.call_count == 1
+
+    def test_drop_when_busy(self):
+        proceed = Event()
+        env = MagicMock()
+        env.render.return_value = np.zeros((2, 2, 3), dtype=np.uint8)
+        frame_capture = FrameCapture()
+        with patch("ude_gym_bridge.frame_capture.encode_png", side_effect=lambda *_: proceed.wait(5) and b""):
+            released = frame_capture.on_step(env)
+            assert released.wait(5)
+            # The environment is released while the frame is still being encoded.
+            assert frame_capture.on_step(env) is None
+            proceed.set()
+            frame_capture.close()
+        assert frame_capture.stats() == {"captured": 1, "dropped": 1, "seq": 1}
+
+    def test_frames_since(self):
+        env = MagicMock()
+        frame_capture = FrameCapture(max_frames=2)
+        for idx in range(3):
+            env.render.return_value = np.full((1, 1, 3), idx, dtype=np.uint8)
+            frame_capture.on_step(env)
+            wait_captured(frame_capture, idx + 1)
+        frame_capture.close()
+
+        seq, frames = frame_capture.frames_since(0)
+        assert seq == 3
+        assert [decode_png(frame)[0, 0, 0] for frame in frames] == [1, 2]
+        assert frame_capture.frames_since(2)[1] == frames[1:]
+        assert frame_capture.frames_since(3) == (3, [])
+
+    def test_render_error(self):
+        env = MagicMock()
+        env.render.side_effect = RuntimeError("no display")
+        frame_capture = FrameCapture()
+        assert frame_capture.on_step(env).wait(5)
+        frame_capture.close()
+        assert frame_capture.latest_png() is None
+        assert frame_capture.stats()["captured"] == 0
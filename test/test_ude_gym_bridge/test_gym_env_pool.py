@@ -0,0 +1,109 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import mock, TestCase
+from unittest.mock import MagicMock
+
+from ude_gym_bridge.gym_env_pool import GymEnvPool
+
+
+@mock.patch("gym.make")
+class GymEnvPoolTest(TestCase):
+    def test_initialization_with_negative_max_size(self, gym_make_mock):
+        with self.assertRaises(ValueError):
+            GymEnvPool(max_size=-1)
+
+    def test_acquire_creates_env(self, gym_make_mock):
+        env_pool = GymEnvPool(max_size=2)
+        assert env_pool.acquire("test_env") == gym_make_mock.return_value
+        gym_make_mock.assert_called_once_with("test_env")
+
+    def test_acquire_with_env_factory(self, gym_make_mock):
+        env_factory = MagicMock()
+        env_pool = GymEnvPool(max_size=2, env_factory=env_factory)
+        assert env_pool.acquire("test_env") == env_factory.return_value
+        env_factory.assert_called_once_with("test_env")
+        gym_make_mock.assert_not_called()
+
+    def test_release_and_acquire_reuses_env(self, gym_make_mock):
+        env_pool = GymEnvPool(max_size=2)
+        env_mock = MagicMock()
+        env_pool.release("test_env", env_mock)
+        assert len(env_pool) == 1
+        assert "test_env" in env_pool
+
+        assert env_pool.acquire("test_env") == env_mock
+        assert len(env_pool) == 0
+        assert "test_env" not in env_pool
+        gym_make_mock.assert_not_called()
+        env_mock.close.assert_not_called()
+
+    def test_acquire_variant(self, gym_make_mock):
+        env_factory = MagicMock()
+        env_pool = GymEnvPool(max_size=2)
+        env_mock = MagicMock()
+        env_pool.release("test_env", env_mock, variant="subprocess")
+        assert "test_env" in env_pool
+
+        # Environments of other variants are not reused.
+        assert env_pool.acquire("test_env") == gym_make_mock.return_value
+        assert env_pool.acquire("test_env", env_factory=env_factory, variant="stacked") == env_factory.return_value
+        env_factory.assert_called_once_with("test_env")
+        assert env_pool.acquire("test_env", env_factory=env_factory, variant="subprocess") == env_mock
+        assert len(env_pool) == 0
+
+    def test_release_evicts_least_recently_used(self, gym_make_mock):
+        env_pool = GymEnvPool(max_size=2)
+        env_mocks = [MagicMock(), MagicMock(), MagicMock()]
+        env_pool.release("env_a", env_mocks[0])
+        env_pool.release("env_b", env_mocks[1])
+        env_pool.release("env_c", env_mocks[2])
+
+        assert len(env_pool) == 2
+        assert "env_a" not in env_pool
+        env_mocks[0].close.assert_called_once()
+        env_mocks[1].close.assert_not_called()
+        env_mocks[2].close.assert_not_called()
+
+    def test_warm(self, gym_make_mock):
+        env_mocks = [MagicMock(), MagicMock(), MagicMock()]
+        gym_make_mock.side_effect = env_mocks
+        env_pool = GymEnvPool(max_size=4)
+        env_pool.warm(["env_a", "env_b"], count=1).join(timeout=5.0)
+
+        assert len(env_pool) == 2
+        assert env_pool.acquire("env_a") == env_mocks[0]
+        assert env_pool.acquire("env_b") == env_mocks[1]
+        assert gym_make_mock.call_count == 2
+
+    def test_warm_variant(self, gym_make_mock):
+        env_mocks = [MagicMock(), MagicMock()]
+        env_factory = MagicMock(side_effect=env_mocks)
+        env_pool = GymEnvPool(max_size=4)
+        env_pool.warm(["env_a"], count=2, env_factory=env_factory, variant="subprocess").join(timeout=5.0)
+
+        assert len(env_pool) == 2
+        assert env_pool.acquire("env_a", variant="subprocess") in env_mocks
+        assert env_pool.acquire("env_a", variant="subprocess") in env_mocks
+        assert env_factory.call_count == 2
+        gym_make_mock.assert_not_called()
+
+    def test_close(self, gym_make_mock):
+        env_pool = GymEnvPool(max_size=2)
+        env_mock = MagicMock()
+        env_pool.release("test_env", env_mock)
+        env_pool.close()
+        env_mock.close.assert_called_once()
+        assert len(env_pool) == 0
@@ -0,0 +1,214 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+import json
+from unittest import mock, TestCase
+from unittest.mock import patch, MagicMock
+
+from ude import UDEStepInvokeType
+
+from ude_gym_bridge.gym_env_remote_runner import GymEnvRemoteRunner, RunnerState, main
+
+
+@mock.patch("ude_gym_bridge.gym_env_remote_runner.UDEServer")
+@mock.patch("ude_gym_bridge.gym_env_remote_runner.UDEEnvironment")
+@mock.patch("ude_gym_bridge.gym_env_remote_runner.GymEnvironmentAdapter")
+class GymEnvRemoteRunnerTest(TestCase):
+    def test_initialization(self, adapter_mock, ude_env_mock, ude_server_mock):
+        runner = GymEnvRemoteRunner(env_name="test_env", agent_name="agent", render=False)
+
+        adapter_mock.assert_called_once()
+        assert adapter_mock.call_args[1]["env_name"] == "test_env"
+        assert adapter_mock.call_args[1]["agent_name"] == "agent"
+        assert adapter_mock.call_args[1]["lazy_init"] is False
+        ude_env_mock.assert_called_once_with(ude_env_adapter=adapter_mock.return_value)
+        assert ude_server_mock.call_args[1]["ude_env"] == ude_env_mock.return_value
+        assert runner._env_pool is None
+
+    def test_start_stop_spin(self, adapter_mock, ude_env_mock, ude_server_mock):
+        runner = GymEnvRemoteRunner()
+        runner.start()
+        ude_server_mock.return_value.start.assert_called_once()
+        runner.spin()
+        ude_server_mock.return_value.spin.assert_called_once()
+        runner.stop()
+        ude_server_mock.return_value.close.assert_called_once()
+        adapter_mock.return_value.close.assert_called_once()
+
+    def test_lazy(self, adapter_mock, ude_env_mock, ude_server_mock):
+        adapter_mock.return_value.is_ready = False
+        adapter_mock.return_value.startup_times = {"env_make": 1.0}
+        runner = GymEnvRemoteRunner(lazy=True)
+        runner.start()
+
+        assert adapter_mock.call_args[1]["lazy_init"] is True
+        assert not runner.is_ready
+        startup_times = runner.startup_times
+        assert startup_times["env_make"] == 1.0
+        for phase in ["adapter_init", "ude_server_init", "ude_server_start"]:
+            assert phase in startup_times
+
+    def test_warm_env_names(self, adapter_mock, ude_env_mock, ude_server_mock):
+        with patch("ude_gym_bridge.gym_env_remote_runner.GymEnvPool") as env_pool_mock:
+            runner = GymEnvRemoteRunner(warm_env_names=["env_a", "env_b"], num_envs=2)
+            env_pool_mock.assert_called_once_with(max_size=6)
+            adapter_mock.return_value.warm_pool.assert_called_once_with(["env_a", "env_b"])
+            assert adapter_mock.call_args[1]["env_pool"] == env_pool_mock.return_value
+            runner.stop()
+            env_pool_mock.return_value.close.assert_called_once()
+
+    def test_env_pool_with_subprocess_and_wrappers(self, adapter_mock, ude_env_mock, ude_server_mock):
+        with patch("ude_gym_bridge.gym_env_remote_runner.GymEnvPool") as env_pool_mock:
+            GymEnvRemoteRunner(env_pool_size=2, use_subprocess=True, frame_stack=4, rollout_horizon=8)
+            # The adapter pools the subprocess copies with its own factory and wrappers.
+            env_pool_mock.assert_called_once_with(max_size=2)
+            adapter_kwargs = adapter_mock.call_args[1]
+            assert adapter_kwargs["env_pool"] == env_pool_mock.return_value
+            assert adapter_kwargs["use_subprocess"] is True
+            assert adapter_kwargs["frame_stack"] == 4
+            assert adapter_kwargs["rollout_horizon"] == 8
+
+    def test_adaptive_schedule(self, adapter_mock, ude_env_mock, ude_server_mock):
+        runner = GymEnvRemoteRunner(step_invoke_type=UDEStepInvokeType.PERIODIC,
+                                    step_invoke_period=5.0,
+                                    adaptive_schedule=True,
+                                    step_invoke_period_bounds=(0.01, 0.5),
+                                    timeout_wait_bounds=(1.0, 10.0))
+        # The initial period is clamped to the bounds.
+        assert ude_server_mock.call_args[1]["step_invoke_period"] == 0.5
+        assert ude_server_mock.call_args[1]["timeout_wait"] == 2.0
+        scheduler = adapter_mock.call_args[1]["step_scheduler"]
+        assert runner.step_schedule["step_invoke_period"] == 0.5
+
+        for _ in range(10):
+            scheduler.record_step(num_actions=1, num_agents=1, step_cost=0.001)
+        assert ude_server_mock.return_value.step_invoke_period == scheduler.step_invoke_period < 0.5
+        assert ude_server_mock.return_value.timeout_wait == scheduler.timeout_wait
+
+    def test_adaptive_schedule_default_period(self, adapter_mock, ude_env_mock, ude_server_mock):
+        with patch("ude_gym_bridge.adaptive_step_scheduler.logger") as logger_mock:
+            GymEnvRemoteRunner(step_invoke_type=UDEStepInvokeType.PERIODIC,
+                               adaptive_schedule=True,
+                               step_invoke_period_bounds=(0.01, 0.5),
+                               timeout_wait_bounds=(1.0, 10.0))
+        # Without a given period, the scheduler starts from the upper bound.
+        logger_mock.warning.assert_not_called()
+        assert ude_server_mock.call_args[1]["step_invoke_period"] == 0.5
+        assert ude_server_mock.call_args[1]["timeout_wait"] == 2.0
+
+    def test_adaptive_schedule_with_timeout_wait(self, adapter_mock, ude_env_mock, ude_server_mock):
+        GymEnvRemoteRunner(step_invoke_type=UDEStepInvokeType.PERIODIC,
+                           timeout_wait=30.0,
+                           adaptive_schedule=True,
+                           step_invoke_period_bounds=(0.01, 0.5),
+                           timeout_wait_bounds=(1.0, 10.0))
+        assert ude_server_mock.call_args[1]["timeout_wait"] == 30.0
+        scheduler = adapter_mock.call_args[1]["step_scheduler"]
+        for _ in range(10):
+            scheduler.record_step(num_actions=1, num_agents=1, step_cost=0.001)
+        # The given timeout is kept while the period is tuned.
+        assert scheduler.step_invoke_period < 0.5
+        assert scheduler.timeout_wait == 30.0
+        assert ude_server_mock.return_value.timeout_wait == 30.0
+
+    def test_default_schedule(self, adapter_mock, ude_env_mock, ude_server_mock):
+        GymEnvRemoteRunner(step_invoke_type=UDEStepInvokeType.PERIODIC)
+        assert ude_server_mock.call_args[1]["step_invoke_period"] == 120.0
+        assert ude_server_mock.call_args[1]["timeout_wait"] == 60.0
+
+    def test_adaptive_schedule_disabled_without_periodic(self, adapter_mock, ude_env_mock, ude_server_mock):
+        runner = GymEnvRemoteRunner(adaptive_schedule=True)
+        assert adapter_mock.call_args[1]["step_scheduler"] is None
+        assert runner.step_schedule is None
+
+    def test_adapter_and_auto_reset(self, adapter_mock, ude_env_mock, ude_server_mock):
+        runner = GymEnvRemoteRunner(auto_reset=True)
+        assert runner.adapter is adapter_mock.return_value
+        assert adapter_mock.call_args[1]["auto_reset"] is True
+
+    def test_preprocessing(self, adapter_mock, ude_env_mock, ude_server_mock):
+        GymEnvRemoteRunner(preprocessing={"grayscale": True, "resize": [84, 84]})
+        assert adapter_mock.call_args[1]["preprocessing"].to_config()["resize"] == [84, 84]
+        GymEnvRemoteRunner()
+        assert adapter_mock.call_args[1]["preprocessing"] is None
+
+    def test_readiness_and_liveness(self, adapter_mock, ude_env_mock, ude_server_mock):
+        adapter_mock.return_value.is_ready = True
+        adapter_mock.return_value.init_error = None
+        runner = GymEnvRemoteRunner(request_queue_size=4, request_queue_timeout=0.5)
+        assert adapter_mock.call_args[1]["request_queue_size"] == 4
+        assert adapter_mock.call_args[1]["request_queue_timeout"] == 0.5
+        adapter_mock.return_value.side_channel.register.assert_called_once_with(runner)
+        assert runner.state == RunnerState.CREATED
+        assert not runner.is_ready and runner.is_alive
+
+        runner.start()
+        assert runner.state == RunnerState.SERVING
+        assert runner.is_ready and runner.is_alive
+
+        adapter_mock.return_value.init_error = RuntimeError("make failed")
+        assert not runner.is_ready and not runner.is_alive
+
+        adapter_mock.return_value.init_error = None
+        runner.stop()
+        assert runner.state == RunnerState.STOPPED
+        assert not runner.is_ready and not runner.is_alive
+
+    def test_health_side_channel(self, adapter_mock, ude_env_mock, ude_server_mock):
+        adapter_mock.return_value.is_ready = True
+        adapter_mock.return_value.init_error = None
+        adapter_mock.return_value.active_episodes = 2
+        adapter_mock.return_value.queue_stats.return_value = {"depth": 1, "max_depth": 3, "size": 4, "rejected": 5}
+        runner = GymEnvRemoteRunner()
+        runner.start()
+        side_channel = MagicMock()
+
+        runner.on_received(side_channel=side_channel, key="unknown", value=True)
+        side_channel.send.assert_not_called()
+        runner.on_received(side_channel=side_channel, key="health", value=True)
+        assert side_channel.send.call_args[0][0] == "health"
+        assert json.loads(side_channel.send.call_args[0][1]) == {
+            "state": "serving", "ready": True, "alive": True, "active_episodes": 2,
+            "queue": {"depth": 1, "max_depth": 3, "size": 4, "rejected": 5}
+        }
+
+    def test_drain(self, adapter_mock, ude_env_mock, ude_server_mock):
+        adapter_mock.return_value.init_error = None
+        adapter_mock.return_value.wait_drained.return_value = True
+        runner = GymEnvRemoteRunner()
+        runner.start()
+        assert runner.drain(timeout=10.0)
+
+        adapter_mock.return_value.set_draining.assert_called_once_with(True)
+        adapter_mock.return_value.wait_drained.assert_called_once_with(10.0)
+        ude_server_mock.return_value.close.assert_called_once()
+        adapter_mock.return_value.close.assert_called_once()
+        assert runner.state == RunnerState.STOPPED
+
+        adapter_mock.return_value.wait_drained.return_value = False
+        assert not GymEnvRemoteRunner().drain(timeout=0.0)
+
+    def test_seed(self, adapter_mock, ude_env_mock, ude_server_mock):
+        GymEnvRemoteRunner(seed=5)
+        assert adapter_mock.call_args[1]["seed"] == 5
+        GymEnvRemoteRunner()
+        assert adapter_mock.call_args[1]["seed"] is None
+
+
+class GymEnvRemoteRunnerMainTest(TestCase):
+    def test_main_uses_launcher(self):
+        with patch("ude_gym_bridge.launcher.main") as launcher_main_mock:
+            main(["--num-processes", "2"])
+        launcher_main_mock.assert_called_once_with(["--num-processes", "2"])
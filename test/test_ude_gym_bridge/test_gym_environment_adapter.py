@@ -13,12 +13,56 @@
 #   See the License for the specific language governing permissions and         #
 #   limitations under the License.                                              #
 #################################################################################
+import json
+import threading
+import time
 from unittest import mock, TestCase
 from unittest.mock import patch, MagicMock
 
-from ude_gym_bridge.gym_environment_adapter import GymEnvironmentAdapter
+from ude_gym_bridge.gym_environment_adapter import (
+    GymEnvironmentAdapter, AdapterSaturatedError, AdapterDrainingError
+)
+from ude_gym_bridge.action_batch import BATCH_ACTION_KEY
+from ude_gym_bridge.frame_capture import FrameCapture
+from ude_gym_bridge.preprocessing import PreprocessingPipeline
+from ude_gym_bridge.seeding import SeedSchedule
+from ude_gym_bridge.gym_env_pool import GymEnvPool
+from ude_gym_bridge.gym_wrappers import ActionRepeatWrapper, FrameStackWrapper, PreprocessingWrapper, unwrap_env
+from ude_gym_bridge.subprocess_gym_env import SubprocessGymEnv
 
+import gym
+from gym.spaces import Box, Discrete
 from gym.spaces.space import Space
+import numpy as np
+
+
+class _InProcessSubprocessGymEnv(SubprocessGymEnv):
+    """SubprocessGymEnv hosting the (wrapped) environment in the test process instead."""
+    def __init__(self, env_name, env_wrapper=None):
+        gym.Env.__init__(self)
+        self._env_name = env_name
+        self.env_wrapper = env_wrapper
+        self.env = gym.make(env_name)
+        self.base_observation_space = self.env.observation_space
+        if env_wrapper:
+            self.env = env_wrapper(self.env)
+        self.observation_space, self.action_space = self.env.observation_space, self.env.action_space
+        self._result = None
+
+    def step_async(self, action):
+        self._result = self.env.step(action)
+
+    def step_wait(self):
+        return self._result
+
+    def reset_async(self, seed=None):
+        self._result = self.env.reset()
+
+    def reset_wait(self):
+        return self._result
+
+    def close(self):
+        self.env.close()
 
 
 @mock.patch("gym.make")
@@ -119,12 +163,43 @@ class GymEnvironmentAdapterTest(TestCase):
         assert ret_reset_val == expected_return
         assert gym_env_mock_obj.reset.call_count == 2
 
+    def test_render_with_frame_capture(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = (np.zeros(2), 1.0, False, {})
+        rendering = threading.Lock()
+        overlaps = []
+
+        def render(mode="human"):
+            if not rendering.acquire(blocking=False):
+                overlaps.append(mode)
+                return None
+            try:
+                time.sleep(0.005)
+                return np.zeros((2, 2, 3), dtype=np.uint8) if mode == "rgb_array" else None
+            finally:
+                rendering.release()
+
+        gym_env_mock_obj.render.side_effect = render
+        for async_render in (False, True):
+            frame_capture = FrameCapture()
+            gym_env_adapter = GymEnvironmentAdapter("test_env", render=True, async_render=async_render,
+                                                    frame_capture=frame_capture)
+            for _ in range(5):
+                gym_env_adapter.step(action_dict={"agent0": 0})
+            gym_env_adapter.close()
+            assert frame_capture.stats()["captured"] > 0
+        # The regular render never runs while the capture renders the same environment.
+        assert overlaps == []
+
     def test_close(self, gym_make_mock):
         env_name = "test_env"
         gym_env_mock_obj = gym_make_mock.return_value
         gym_env_adapter = GymEnvironmentAdapter(env_name)
         gym_env_adapter.close()
         gym_env_mock_obj.close.assert_called_once()
+        # The runner closes the adapter after UDE Server, which may have closed it already.
+        gym_env_adapter.close()
+        gym_env_mock_obj.close.assert_called_once()
 
     def test_observation_space(self, gym_make_mock):
         env_name = "test_env"
@@ -219,3 +294,997 @@ class GymEnvironmentAdapterTest(TestCase):
         gym_env_mock_obj.close.assert_not_called()
         assert gym_env_adapter.env == gym_env_mock_obj
         assert gym_env_adapter.env_name == env_name
+
+    def test_initialization_with_num_envs(self, gym_make_mock):
+        env_mocks = [MagicMock(), MagicMock(), MagicMock()]
+        gym_make_mock.side_effect = env_mocks
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=3)
+
+        assert gym_make_mock.call_count == 3
+        assert gym_env_adapter.num_envs == 3
+        assert gym_env_adapter.envs == env_mocks
+        assert gym_env_adapter.env == env_mocks[0]
+        for env_mock in env_mocks:
+            env_mock.reset.assert_called_once()
+
+    def test_initialization_with_invalid_num_envs(self, gym_make_mock):
+        with self.assertRaises(ValueError):
+            GymEnvironmentAdapter("test_env", num_envs=0)
+
+    def test_step_with_num_envs(self, gym_make_mock):
+        env_mocks = [MagicMock(), MagicMock()]
+        gym_make_mock.side_effect = env_mocks
+        env_mocks[0].step.return_value = ("obs0", 1.0, False, {})
+        env_mocks[1].step.return_value = ("terminal_obs1", 2.0, True, {"key": "value"})
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2)
+        env_mocks[1].reset.return_value = "reset_obs1"
+
+        ret_step_val = gym_env_adapter.step(action_dict={"agent0": 0, "agent1": 1})
+
+        expected_return = (
+            {"agent0": "obs0", "agent1": "reset_obs1"},
+            {"agent0": 1.0, "agent1": 2.0},
+            {"agent0": False, "agent1": True},
+            {"agent0": 0, "agent1": 1},
+            {"agent0": {}, "agent1": {"key": "value", "terminal_observation": "terminal_obs1"}}
+        )
+        assert ret_step_val == expected_return
+        env_mocks[0].step.assert_called_once_with(0)
+        env_mocks[1].step.assert_called_once_with(1)
+        assert env_mocks[0].reset.call_count == 1
+        assert env_mocks[1].reset.call_count == 2
+
+    def test_step_with_num_envs_partial_actions(self, gym_make_mock):
+        env_mocks = [MagicMock(), MagicMock()]
+        gym_make_mock.side_effect = env_mocks
+        env_mocks[1].step.return_value = ("obs1", 1.0, False, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2)
+
+        obs, _, _, _, _ = gym_env_adapter.step(action_dict={"agent1": 1})
+        assert obs == {"agent1": "obs1"}
+        env_mocks[0].step.assert_not_called()
+
+    def test_reset_with_num_envs(self, gym_make_mock):
+        env_mocks = [MagicMock(), MagicMock()]
+        gym_make_mock.side_effect = env_mocks
+        env_mocks[0].reset.return_value = "obs0"
+        env_mocks[1].reset.return_value = "obs1"
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2)
+
+        assert gym_env_adapter.reset() == ({"agent0": "obs0", "agent1": "obs1"}, {})
+
+    def test_spaces_with_num_envs(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        observation_space = Space([3, 4])
+        action_space = Space([2])
+        gym_env_mock_obj.observation_space = observation_space
+        gym_env_mock_obj.action_space = action_space
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2)
+
+        assert gym_env_adapter.observation_space == {"agent0": observation_space,
+                                                     "agent1": observation_space}
+        assert gym_env_adapter.action_space == {"agent0": action_space,
+                                                "agent1": action_space}
+
+    def test_step_with_use_subprocess(self, gym_make_mock):
+        env_mocks = [MagicMock(), MagicMock()]
+        env_mocks[0].step_wait.return_value = ("obs0", 1.0, False, {})
+        env_mocks[1].step_wait.return_value = ("terminal_obs1", 2.0, True, {})
+        env_mocks[1].reset_wait.return_value = "reset_obs1"
+        with patch("ude_gym_bridge.gym_environment_adapter.SubprocessGymEnv",
+                   side_effect=env_mocks) as subprocess_env_mock:
+            gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2, use_subprocess=True)
+            assert subprocess_env_mock.call_count == 2
+            gym_make_mock.assert_not_called()
+
+            obs, reward, done, action, info = gym_env_adapter.step(action_dict={"agent0": 0, "agent1": 1})
+
+        env_mocks[0].step_async.assert_called_once_with(0)
+        env_mocks[1].step_async.assert_called_once_with(1)
+        env_mocks[1].reset_async.assert_called_once()
+        env_mocks[0].reset_async.assert_not_called()
+        assert obs == {"agent0": "obs0", "agent1": "reset_obs1"}
+        assert done == {"agent0": False, "agent1": True}
+        assert info["agent1"]["terminal_observation"] == "terminal_obs1"
+
+    def test_step_with_use_subprocess_receives_every_reply_on_error(self, gym_make_mock):
+        env_mocks = [MagicMock(), MagicMock()]
+        env_mocks[0].step_wait.side_effect = ValueError("invalid action")
+        env_mocks[1].step_wait.return_value = ("obs1", 1.0, False, {})
+        with patch("ude_gym_bridge.gym_environment_adapter.SubprocessGymEnv", side_effect=env_mocks):
+            gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2, use_subprocess=True)
+            with self.assertRaises(ValueError):
+                gym_env_adapter.step(action_dict={"agent0": 5, "agent1": 0})
+        # The reply of the other copy is received, so it is not left in its pipe.
+        env_mocks[1].step_wait.assert_called_once()
+
+        env_mocks[0].step_wait.side_effect = None
+        for env_mock in env_mocks:
+            env_mock.step_wait.return_value = ("terminal_obs", 1.0, True, {})
+        env_mocks[0].reset_wait.side_effect = RuntimeError("reset failed")
+        with self.assertRaises(RuntimeError):
+            gym_env_adapter.step(action_dict={"agent0": 0, "agent1": 0})
+        env_mocks[1].reset_wait.assert_called_once()
+
+    def test_step_with_async_render(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = ("next_state", 42, False, {})
+        render_started = threading.Event()
+        render_release = threading.Event()
+
+        def render():
+            render_started.set()
+            render_release.wait(timeout=5.0)
+        gym_env_mock_obj.render.side_effect = render
+
+        gym_env_adapter = GymEnvironmentAdapter("test_env", render=True, async_render=True)
+        ret_step_val = gym_env_adapter.step(action_dict={"agent0": 1})
+
+        # step returns while render is still in progress on background thread.
+        assert ret_step_val[0] == {"agent0": "next_state"}
+        assert render_started.wait(timeout=5.0)
+        render_release.set()
+        gym_env_adapter.step(action_dict={"agent0": 1})
+        gym_env_adapter.close()
+        assert gym_env_mock_obj.render.call_count == 2
+        gym_env_mock_obj.close.assert_called_once()
+
+    def test_reset_with_async_render_waits_pending_render(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        call_order = []
+        gym_env_mock_obj.render.side_effect = lambda: call_order.append("render")
+        gym_env_mock_obj.step.side_effect = lambda action: call_order.append("step") or ("obs", 0, False, {})
+        gym_env_mock_obj.reset.side_effect = lambda: call_order.append("reset")
+
+        gym_env_adapter = GymEnvironmentAdapter("test_env", render=True, async_render=True)
+        gym_env_adapter.step(action_dict={"agent0": 1})
+        gym_env_adapter.reset()
+        gym_env_adapter.close()
+        assert call_order == ["reset", "step", "render", "reset", "render"]
+
+    def test_env_switch_with_env_pool(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        new_env_mock = MagicMock()
+        env_pool = GymEnvPool(max_size=2)
+        env_pool.release("CartPole-v1", new_env_mock)
+        gym_env_adapter = GymEnvironmentAdapter("CartPole-v0", env_pool=env_pool)
+
+        gym_env_adapter.on_received(side_channel=gym_env_adapter.side_channel,
+                                    key="env",
+                                    value="CartPole-v1")
+        gym_env_adapter.reset()
+
+        assert gym_env_adapter.env == new_env_mock
+        assert gym_env_adapter.env_name == "CartPole-v1"
+        # Replaced environment is returned to the pool instead of closed.
+        gym_env_mock_obj.close.assert_not_called()
+        assert env_pool.acquire("CartPole-v0") == gym_env_mock_obj
+        assert gym_make_mock.call_count == 1
+
+    def test_env_pool_with_use_subprocess(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=0.0, high=1.0, shape=(2,), dtype=np.float32)
+        gym_env_mock_obj.reset.return_value = np.ones(2, dtype=np.float32)
+        gym_env_mock_obj.step.return_value = (np.ones(2, dtype=np.float32), 1.0, False, {})
+        env_pool = GymEnvPool(max_size=4)
+        with patch("ude_gym_bridge.gym_environment_adapter.SubprocessGymEnv", _InProcessSubprocessGymEnv):
+            gym_env_adapter = GymEnvironmentAdapter("CartPole-v0", num_envs=2, use_subprocess=True,
+                                                    env_pool=env_pool, frame_stack=3)
+
+            # Copies are created in the subprocess with the wrappers inside, and not wrapped again.
+            assert all(isinstance(env, _InProcessSubprocessGymEnv) for env in gym_env_adapter.envs)
+            assert all(isinstance(env.env, FrameStackWrapper) for env in gym_env_adapter.envs)
+            assert gym_env_adapter.observation_space["agent0"].shape == (3, 2)
+            obs, _, _, _, _ = gym_env_adapter.step(action_dict={"agent0": 0, "agent1": 1})
+            assert obs["agent0"].shape == (3, 2)
+
+            gym_env_adapter.on_received(side_channel=gym_env_adapter.side_channel,
+                                        key="env",
+                                        value="CartPole-v1")
+            gym_env_adapter.reset()
+
+        subprocess_envs = [env_pool.acquire("CartPole-v0", variant=gym_env_adapter._pool_variant)
+                           for _ in range(2)]
+        assert all(isinstance(env, _InProcessSubprocessGymEnv) for env in subprocess_envs)
+        # In-process copies of the same name are not served from the subprocess copies.
+        assert not isinstance(env_pool.acquire("CartPole-v0"), SubprocessGymEnv)
+
+    def test_env_pool_shared_by_adapters_with_different_configs(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=0.0, high=1.0, shape=(2,), dtype=np.float32)
+        gym_env_mock_obj.reset.return_value = np.ones(2, dtype=np.float32)
+        env_pool = GymEnvPool(max_size=4)
+        with patch("ude_gym_bridge.gym_environment_adapter.SubprocessGymEnv", _InProcessSubprocessGymEnv):
+            in_process_adapter = GymEnvironmentAdapter("CartPole-v0", env_pool=env_pool)
+            in_process_adapter.on_received(side_channel=in_process_adapter.side_channel,
+                                           key="env",
+                                           value="CartPole-v1")
+            in_process_adapter.reset()
+            assert len(env_pool) == 1
+
+            # The idle in-process copy is not handed to the subprocess tenant.
+            subprocess_adapter = GymEnvironmentAdapter("CartPole-v0", num_envs=2, use_subprocess=True,
+                                                       env_pool=env_pool, frame_stack=3)
+        assert len(env_pool) == 1
+        assert all(isinstance(env, _InProcessSubprocessGymEnv) for env in subprocess_adapter.envs)
+        assert subprocess_adapter.observation_space["agent0"].shape == (3, 2)
+
+    def test_setters_twice_before_reset_discards_pending_env(self, gym_make_mock):
+        first_env_mock, second_env_mock = MagicMock(), MagicMock()
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        gym_make_mock.side_effect = [first_env_mock, second_env_mock]
+
+        gym_env_adapter.env_name = "first_env"
+        gym_env_adapter.env_name = "second_env"
+        first_env_mock.close.assert_called_once()
+        gym_env_adapter.reset()
+        assert gym_env_adapter.env == second_env_mock
+        assert gym_env_adapter.env_name == "second_env"
+
+    def test_on_received_unversioned_env_name(self, gym_make_mock):
+        gym_env_adapter = GymEnvironmentAdapter("CartPole-v0")
+        new_env_mock = MagicMock()
+        gym_make_mock.return_value = new_env_mock
+
+        with patch.object(gym_env_adapter._registry_index, "resolve", return_value="CartPole-v1") as resolve_mock:
+            gym_env_adapter.on_received(side_channel=gym_env_adapter.side_channel,
+                                        key="env",
+                                        value="CartPole")
+            resolve_mock.assert_called_once_with("CartPole")
+        gym_make_mock.assert_called_with("CartPole-v1")
+        gym_env_adapter.reset()
+        assert gym_env_adapter.env_name == "CartPole-v1"
+
+    def test_initialization_with_lazy_init(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        make_release = threading.Event()
+        gym_make_mock.side_effect = lambda env_name: make_release.wait(timeout=5.0) and gym_env_mock_obj
+
+        gym_env_adapter = GymEnvironmentAdapter("test_env", lazy_init=True)
+        assert not gym_env_adapter.is_ready
+        make_release.set()
+
+        # Accessing the environment waits for the background construction.
+        assert gym_env_adapter.env == gym_env_mock_obj
+        assert gym_env_adapter.is_ready
+        gym_env_mock_obj.reset.assert_called_once()
+        assert set(gym_env_adapter.startup_times.keys()) == {"env_make", "env_reset"}
+
+    def test_initialization_with_lazy_init_error(self, gym_make_mock):
+        gym_make_mock.side_effect = RuntimeError("make failed")
+
+        gym_env_adapter = GymEnvironmentAdapter("test_env", lazy_init=True)
+        with self.assertRaises(RuntimeError):
+            gym_env_adapter.reset()
+        assert gym_env_adapter.is_ready
+        # Closing after the failed construction does not raise, so the caller can go on shutting down.
+        gym_env_adapter.close()
+
+    def test_initialization_error(self, gym_make_mock):
+        gym_make_mock.side_effect = RuntimeError("make failed")
+        with self.assertRaises(RuntimeError):
+            GymEnvironmentAdapter("test_env")
+
+    def test_initialization_error_closes_built_envs(self, gym_make_mock):
+        env_mocks = [MagicMock(), MagicMock()]
+        env_mocks[1].reset.side_effect = RuntimeError("reset failed")
+        gym_make_mock.side_effect = env_mocks
+        with self.assertRaises(RuntimeError):
+            GymEnvironmentAdapter("test_env", num_envs=2)
+        for env_mock in env_mocks:
+            env_mock.close.assert_called_once()
+
+        env_mock = MagicMock()
+        gym_make_mock.side_effect = [env_mock, RuntimeError("make failed")]
+        with self.assertRaises(RuntimeError):
+            GymEnvironmentAdapter("test_env", num_envs=2)
+        env_mock.close.assert_called_once()
+
+    def test_step_without_profile(self, gym_make_mock):
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        assert gym_env_adapter.profiler is None
+
+    def test_step_with_profile(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.side_effect = [("obs", 1.0, False, {}), ("obs", 2.0, True, {})]
+        gym_env_adapter = GymEnvironmentAdapter("test_env", render=True, profile=True)
+        gym_env_adapter.reset()
+        gym_env_adapter.step(action_dict={"agent0": 1})
+        gym_env_adapter.step(action_dict={"agent0": 1})
+
+        stats = gym_env_adapter.profiler.stats()
+        for phase in ["lock_wait", "simulate", "render", "pack"]:
+            assert stats["phases"][phase]["count"] == 2
+        assert stats["phases"]["reset"]["count"] == 1
+        assert stats["episodes"] == {"count": 1, "mean_length": 2.0, "max_length": 2, "mean_reward": 3.0}
+
+    def test_on_received_stats(self, gym_make_mock):
+        gym_env_adapter = GymEnvironmentAdapter("test_env", profile=True)
+        side_channel = MagicMock()
+        gym_env_adapter.reset()
+        gym_env_adapter.on_received(side_channel=side_channel, key="stats", value=True)
+
+        side_channel.send.assert_called_once()
+        key, value = side_channel.send.call_args[0]
+        assert key == "stats"
+        assert json.loads(value)["phases"]["reset"]["count"] == 1
+
+        gym_env_adapter.on_received(side_channel=side_channel, key="stats_clear", value=True)
+        assert gym_env_adapter.profiler.stats()["phases"] == {}
+
+    def test_on_received_stats_without_profile(self, gym_make_mock):
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        side_channel = MagicMock()
+        gym_env_adapter.on_received(side_channel=side_channel, key="stats", value=True)
+        side_channel.send.assert_not_called()
+
+    def test_step_and_reset_with_observation_encoder(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.reset.return_value = "reset_obs"
+        gym_env_mock_obj.step.return_value = ("next_state", 42, True, {})
+        encoder = MagicMock()
+        encoder.encode.side_effect = lambda agent_name, obs, new_episode: (obs, new_episode)
+        gym_env_adapter = GymEnvironmentAdapter("test_env", observation_encoder=encoder)
+
+        assert gym_env_adapter.reset() == ({"agent0": ("reset_obs", True)}, {})
+        obs, reward, done, _, _ = gym_env_adapter.step(action_dict={"agent0": 1})
+        # Single environment is not automatically reset, so done does not start new episode.
+        assert obs == {"agent0": ("next_state", False)}
+        assert reward == {"agent0": 42}
+        gym_env_adapter.close()
+        encoder.close.assert_called_once()
+
+    def test_step_with_observation_encoder_and_num_envs(self, gym_make_mock):
+        env_mocks = [MagicMock(), MagicMock()]
+        gym_make_mock.side_effect = env_mocks
+        env_mocks[0].step.return_value = ("obs0", 1.0, False, {})
+        env_mocks[1].step.return_value = ("terminal_obs1", 2.0, True, {})
+        env_mocks[1].reset.return_value = "reset_obs1"
+        encoder = MagicMock()
+        encoder.encode.side_effect = lambda agent_name, obs, new_episode: (obs, new_episode)
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2, observation_encoder=encoder)
+
+        obs, _, _, _, _ = gym_env_adapter.step(action_dict={"agent0": 0, "agent1": 1})
+        assert obs == {"agent0": ("obs0", False), "agent1": ("reset_obs1", True)}
+
+    def test_initialization_with_frame_skip(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = ("next_state", 1.0, False, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env", frame_skip=4)
+
+        assert isinstance(gym_env_adapter.env, ActionRepeatWrapper)
+        _, reward, _, _, _ = gym_env_adapter.step(action_dict={"agent0": 1})
+        assert reward == {"agent0": 4.0}
+        assert gym_env_mock_obj.step.call_count == 4
+
+    def test_initialization_with_frame_stack(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=0.0, high=1.0, shape=(2,), dtype=np.float32)
+        gym_env_mock_obj.reset.return_value = np.ones(2, dtype=np.float32)
+        gym_env_adapter = GymEnvironmentAdapter("test_env", frame_stack=3)
+
+        assert isinstance(gym_env_adapter.env, FrameStackWrapper)
+        assert gym_env_adapter.observation_space["agent0"].shape == (3, 2)
+        obs, _ = gym_env_adapter.reset()
+        assert obs["agent0"].shape == (3, 2)
+
+    def test_env_switch_with_frame_skip_releases_unwrapped_env(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        env_pool = GymEnvPool(max_size=2)
+        gym_env_adapter = GymEnvironmentAdapter("CartPole-v0", env_pool=env_pool, frame_skip=2)
+        gym_make_mock.return_value = MagicMock()
+
+        gym_env_adapter.on_received(side_channel=gym_env_adapter.side_channel,
+                                    key="env",
+                                    value="CartPole-v1")
+        gym_env_adapter.reset()
+
+        assert isinstance(gym_env_adapter.env, ActionRepeatWrapper)
+        assert env_pool.acquire("CartPole-v0") == gym_env_mock_obj
+
+    def test_env_pool_wraps_in_process_copies(self, gym_make_mock):
+        pooled_env_mock = MagicMock()
+        pooled_env_mock.observation_space = Box(low=0.0, high=1.0, shape=(2,), dtype=np.float32)
+        pooled_env_mock.reset.return_value = np.ones(2, dtype=np.float32)
+        env_pool = GymEnvPool(max_size=2)
+        env_pool.release("CartPole-v0", pooled_env_mock)
+        gym_env_adapter = GymEnvironmentAdapter("CartPole-v0", env_pool=env_pool, frame_stack=3)
+
+        assert isinstance(gym_env_adapter.env, FrameStackWrapper)
+        assert gym_env_adapter.env.env == pooled_env_mock
+        assert gym_env_adapter.observation_space["agent0"].shape == (3, 2)
+        gym_make_mock.assert_not_called()
+
+    def test_step_with_rollout_horizon(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.side_effect = [(np.array([1.0]), 1.0, False, {}),
+                                             (np.array([2.0]), 2.0, True, {}),
+                                             (np.array([3.0]), 4.0, False, {})]
+        gym_env_mock_obj.reset.return_value = np.array([0.0])
+        gym_env_adapter = GymEnvironmentAdapter("test_env", rollout_horizon=5)
+
+        obs, reward, done, last_action, info = gym_env_adapter.step(action_dict={"agent0": [1, 0, 1]})
+        # Rollout stops at done, and the environment is reset automatically.
+        np.testing.assert_array_equal(obs["agent0"], [[1.0], [0.0]])
+        np.testing.assert_array_equal(reward["agent0"], [1.0, 2.0])
+        np.testing.assert_array_equal(done["agent0"], [False, True])
+        np.testing.assert_array_equal(last_action["agent0"], [1, 0])
+        # A single environment returns the list of step infos as is.
+        np.testing.assert_array_equal(info[1]["terminal_observation"], [2.0])
+        assert gym_env_mock_obj.step.call_count == 2
+        assert gym_env_adapter.step_count == 2
+
+    def test_step_with_rollout_horizon_and_scalar_action(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = (np.array([1.0]), 1.0, False, {"step": True})
+        gym_env_adapter = GymEnvironmentAdapter("test_env", rollout_horizon=3)
+
+        obs, reward, done, last_action, info = gym_env_adapter.step(action_dict={"agent0": 1})
+        # The scalar action is repeated over the horizon.
+        np.testing.assert_array_equal(last_action["agent0"], [1, 1, 1])
+        np.testing.assert_array_equal(reward["agent0"], [1.0, 1.0, 1.0])
+        assert obs["agent0"].shape == (3, 1)
+        assert info == [{"step": True}] * 3
+        assert gym_env_mock_obj.step.call_count == 3
+
+    def test_step_with_rollout_policy_and_num_envs(self, gym_make_mock):
+        env_mocks = [MagicMock(), MagicMock()]
+        gym_make_mock.side_effect = env_mocks
+        for env_mock in env_mocks:
+            env_mock.step.return_value = (np.array([5.0]), 1.0, False, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2, rollout_horizon=3)
+
+        obs, reward, _, last_action, _ = gym_env_adapter.step(
+            action_dict={"agent0": {"policy": "constant", "action": 1},
+                         "agent1": {"policy": "constant", "action": 0, "steps": 1}})
+        assert obs["agent0"].shape == (3, 1)
+        assert gym_env_adapter.step_count == 4
+        np.testing.assert_array_equal(last_action["agent0"], [1, 1, 1])
+        np.testing.assert_array_equal(reward["agent1"], [1.0])
+        assert env_mocks[0].step.call_count == 3
+        assert env_mocks[1].step.call_count == 1
+
+    def test_on_received_rollout_horizon(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = ("next_state", 1.0, False, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        gym_env_adapter.on_received(side_channel=gym_env_adapter.side_channel,
+                                    key="rollout_horizon",
+                                    value=2)
+
+        _, reward, _, _, _ = gym_env_adapter.step(action_dict={"agent0": {"policy": "random"}})
+        assert len(reward["agent0"]) == 2
+
+    def test_on_received_invalid_rollout_horizon(self, gym_make_mock):
+        gym_env_adapter = GymEnvironmentAdapter("test_env", rollout_horizon=3)
+        side_channel = MagicMock()
+        for value in ["abc", None, -1]:
+            gym_env_adapter.on_received(side_channel=side_channel, key="rollout_horizon", value=value)
+            assert "error" in json.loads(side_channel.send.call_args[0][1])
+        assert gym_env_adapter._rollout_horizon == 3
+        gym_env_adapter.on_received(side_channel=side_channel, key="rollout_horizon", value="0")
+        assert json.loads(side_channel.send.call_args[0][1]) == {"rollout_horizon": 0}
+
+    def test_initialization_with_negative_rollout_horizon(self, gym_make_mock):
+        with self.assertRaises(ValueError):
+            GymEnvironmentAdapter("test_env", rollout_horizon=-1)
+
+    def test_spaces_and_env_switch_do_not_wait_for_step(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        new_env_mock = MagicMock()
+        gym_make_mock.return_value = new_env_mock
+
+        lock_acquired, release_lock = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with gym_env_adapter._lock:
+                lock_acquired.set()
+                release_lock.wait()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        lock_acquired.wait()
+        try:
+            # None of these take the lock held by in-flight step.
+            assert gym_env_adapter.observation_space == {"agent0": gym_env_mock_obj.observation_space}
+            assert gym_env_adapter.action_space == {"agent0": gym_env_mock_obj.action_space}
+            assert gym_env_adapter.env == gym_env_mock_obj
+            gym_env_adapter.env_name = "new_test_env"
+        finally:
+            release_lock.set()
+            holder.join()
+
+        gym_env_adapter.reset()
+        assert gym_env_adapter.env == new_env_mock
+        assert gym_env_adapter.action_space == {"agent0": new_env_mock.action_space}
+        gym_env_mock_obj.close.assert_called_once()
+
+    def test_close_closes_pending_envs(self, gym_make_mock):
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        new_env_mock = MagicMock()
+        gym_make_mock.return_value = new_env_mock
+        gym_env_adapter.env_name = "new_test_env"
+
+        gym_env_adapter.close()
+        new_env_mock.close.assert_called_once()
+
+    def test_space_version_changes_on_env_switch(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=0.0, high=1.0, shape=(2,), dtype=np.float32)
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        space_version = gym_env_adapter.space_version
+        assert gym_env_adapter.space_descriptors["observation_space"]["agent0"]["shape"] == [2]
+
+        new_env_mock = MagicMock()
+        new_env_mock.observation_space = Box(low=0.0, high=1.0, shape=(3,), dtype=np.float32)
+        gym_make_mock.return_value = new_env_mock
+        gym_env_adapter.env_name = "new_test_env"
+        assert gym_env_adapter.space_version == space_version
+        gym_env_adapter.reset()
+        assert gym_env_adapter.space_version != space_version
+
+    def test_on_received_spaces(self, gym_make_mock):
+        gym_make_mock.return_value.observation_space = Box(low=0.0, high=1.0, shape=(2,), dtype=np.float32)
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        side_channel = MagicMock()
+
+        gym_env_adapter.on_received(side_channel=side_channel, key="spaces", value="")
+        key, value = side_channel.send.call_args[0]
+        assert key == "spaces"
+        spaces = json.loads(value)
+        assert spaces["version"] == gym_env_adapter.space_version
+        assert spaces["observation_space"]["agent0"]["type"] == "Box"
+
+        gym_env_adapter.on_received(side_channel=side_channel, key="spaces", value=spaces["version"])
+        assert json.loads(side_channel.send.call_args[0][1]) == {"version": spaces["version"], "unchanged": True}
+
+    def test_step_with_auto_reset(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = ("terminal_state", 1.0, True, {})
+        gym_env_mock_obj.reset.return_value = "reset_state"
+        gym_env_adapter = GymEnvironmentAdapter("test_env", auto_reset=True)
+
+        obs, _, done, _, info = gym_env_adapter.step(action_dict={"agent0": 1})
+        assert obs == {"agent0": "reset_state"}
+        assert done == {"agent0": True}
+        assert info == {"terminal_observation": "terminal_state"}
+
+    def test_step_and_reset_with_recorder(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.reset.return_value = "reset_state"
+        gym_env_mock_obj.step.return_value = ("next_state", 1.0, False, {})
+        recorder = MagicMock()
+        gym_env_adapter = GymEnvironmentAdapter("test_env", recorder=recorder)
+
+        gym_env_adapter.reset()
+        recorder.record_reset.assert_called_once_with("agent0", "reset_state")
+        gym_env_adapter.step(action_dict={"agent0": 1})
+        recorder.record_step.assert_called_once_with("agent0", 1, "next_state", 1.0, False, new_episode=False,
+                                                     terminal_obs=None)
+        gym_env_adapter.close()
+        recorder.close.assert_called_once()
+
+    def test_step_with_auto_reset_records_terminal_obs(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.reset.return_value = "reset_state"
+        gym_env_mock_obj.step.return_value = ("terminal_state", 1.0, True, {})
+        recorder = MagicMock()
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2, auto_reset=True, recorder=recorder)
+
+        gym_env_adapter.step(action_dict={"agent1": 0})
+        recorder.record_step.assert_called_once_with("agent1", 0, "reset_state", 1.0, True, new_episode=True,
+                                                     terminal_obs="terminal_state")
+
+    def test_snapshot_and_restore_on_reset(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.reset.return_value = "reset_state"
+        gym_env_mock_obj.step.return_value = ("warm_state", 0.0, False, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        side_channel = MagicMock()
+
+        with patch("ude_gym_bridge.gym_environment_adapter.get_env_state", return_value={"state": 1}), \
+                patch("ude_gym_bridge.gym_environment_adapter.set_env_state") as set_env_state_mock:
+            gym_env_adapter.step(action_dict={"agent0": 0})
+            gym_env_adapter.on_received(side_channel=side_channel, key="snapshot", value="start")
+            assert json.loads(side_channel.send.call_args[0][1]) == {"name": "start"}
+            assert gym_env_adapter.snapshot_names == ["start"]
+
+            gym_env_adapter.on_received(side_channel=side_channel, key="restore", value="start")
+            gym_env_mock_obj.reset.reset_mock()
+            assert gym_env_adapter.reset() == ({"agent0": "warm_state"}, {})
+            set_env_state_mock.assert_called_once_with(gym_env_mock_obj, {"state": 1})
+            gym_env_mock_obj.reset.assert_not_called()
+
+            gym_env_adapter.on_received(side_channel=side_channel, key="restore", value="")
+            assert gym_env_adapter.reset() == ({"agent0": "reset_state"}, {})
+
+    def test_snapshot_errors(self, gym_make_mock):
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        side_channel = MagicMock()
+
+        with patch("ude_gym_bridge.gym_environment_adapter.get_env_state", side_effect=ValueError("unsupported")):
+            gym_env_adapter.on_received(side_channel=side_channel, key="snapshot", value="start")
+        assert json.loads(side_channel.send.call_args[0][1])["error"] == "unsupported"
+        gym_env_adapter.on_received(side_channel=side_channel, key="restore", value="unknown")
+        assert "error" in json.loads(side_channel.send.call_args[0][1])
+
+    def test_snapshot_limit(self, gym_make_mock):
+        gym_env_adapter = GymEnvironmentAdapter("test_env", max_snapshots=2)
+        with patch("ude_gym_bridge.gym_environment_adapter.get_env_state", return_value={}):
+            for name in ["a", "b", "c"]:
+                gym_env_adapter.snapshot(name)
+        assert gym_env_adapter.snapshot_names == ["b", "c"]
+
+    def test_frame_capture(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = ("next_state", 1.0, False, {})
+        frame_capture = MagicMock()
+        released = threading.Event()
+        frame_capture.on_step.return_value = released
+        gym_env_adapter = GymEnvironmentAdapter("test_env", frame_capture=frame_capture)
+        gym_env_adapter.reset()
+        frame_capture.on_step.assert_called_once_with(gym_env_mock_obj)
+        gym_env_mock_obj.render.assert_not_called()
+
+        # The next step waits for the capture to release the environment.
+        step_thread = threading.Thread(target=gym_env_adapter.step, kwargs={"action_dict": {"agent0": 1}})
+        step_thread.start()
+        step_thread.join(0.05)
+        assert step_thread.is_alive()
+        gym_env_mock_obj.step.assert_not_called()
+        released.set()
+        step_thread.join(5)
+        gym_env_mock_obj.step.assert_called_once_with(1)
+        assert frame_capture.on_step.call_count == 2
+
+        gym_env_adapter.close()
+        frame_capture.close.assert_called_once()
+
+    def test_frame_side_channel(self, gym_make_mock):
+        frame_capture = MagicMock()
+        frame_capture.on_step.return_value = None
+        frame_capture.latest_png.return_value = b"png"
+        frame_capture.frames_since.return_value = (3, [b"a", b"b"])
+        frame_capture.stats.return_value = {"captured": 3, "dropped": 0, "seq": 3}
+        gym_env_adapter = GymEnvironmentAdapter("test_env", frame_capture=frame_capture)
+        side_channel = MagicMock()
+
+        gym_env_adapter.on_received(side_channel=side_channel, key="frame", value=True)
+        side_channel.send.assert_called_with("frame", b"png")
+        gym_env_adapter.on_received(side_channel=side_channel, key="frames", value=1)
+        frame_capture.frames_since.assert_called_once_with(1)
+        side_channel.send.assert_any_call("frames", b"ab")
+        side_channel.send.assert_called_with("frames_seq", 3)
+        gym_env_adapter.on_received(side_channel=side_channel, key="frame_stats", value=True)
+        assert json.loads(side_channel.send.call_args[0][1])["captured"] == 3
+        for value in ["abc", -1, [1]]:
+            gym_env_adapter.on_received(side_channel=side_channel, key="frames", value=value)
+            assert "error" in json.loads(side_channel.send.call_args[0][1])
+        frame_capture.frames_since.assert_called_once_with(1)
+
+        side_channel.reset_mock()
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        gym_env_adapter.on_received(side_channel=side_channel, key="frame", value=True)
+        gym_env_adapter.on_received(side_channel=side_channel, key="frames", value=0)
+        side_channel.send.assert_not_called()
+
+    def test_step_scheduler(self, gym_make_mock):
+        gym_make_mock.return_value.step.return_value = ("next_state", 1.0, False, {})
+        step_scheduler = MagicMock()
+        step_scheduler.to_json.return_value = "{}"
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2, step_scheduler=step_scheduler)
+
+        gym_env_adapter.step(action_dict={"agent1": 0})
+        kwargs = step_scheduler.record_step.call_args[1]
+        assert kwargs["num_actions"] == 1
+        assert kwargs["num_agents"] == 2
+        assert kwargs["step_cost"] >= 0.0
+
+        side_channel = MagicMock()
+        gym_env_adapter.on_received(side_channel=side_channel, key="schedule", value=True)
+        side_channel.send.assert_called_once_with("schedule", "{}")
+
+    def test_step_with_action_batch(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = ("next_state", 1.0, False, {})
+        gym_env_mock_obj.action_space = Discrete(2)
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2)
+
+        _, _, _, last_action, _ = gym_env_adapter.step(action_dict={BATCH_ACTION_KEY: np.array([1, 0])})
+        assert last_action == {"agent0": 1, "agent1": 0}
+        assert [call[0][0] for call in gym_env_mock_obj.step.call_args_list] == [1, 0]
+        with self.assertRaises(ValueError):
+            gym_env_adapter.step(action_dict={BATCH_ACTION_KEY: np.array([1, 2])})
+        with self.assertRaises(ValueError):
+            gym_env_adapter.step(action_dict={BATCH_ACTION_KEY: np.array([1])})
+
+    def test_step_with_action_batch_single_env(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = ("next_state", 1.0, False, {})
+        gym_env_mock_obj.action_space = Discrete(2)
+        gym_env_adapter = GymEnvironmentAdapter("test_env", agent_name="agent")
+
+        _, _, _, last_action, _ = gym_env_adapter.step(action_dict={BATCH_ACTION_KEY: [1]})
+        assert last_action == {"agent": 1}
+        gym_env_mock_obj.step.assert_called_once_with(1)
+
+    def test_step_results_are_not_shared_across_steps(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = ("next_state", 1.0, False, {})
+        gym_env_mock_obj.action_space = Discrete(2)
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2)
+
+        # The previous result may still be serialized while the next step runs.
+        first_result = gym_env_adapter.step(action_dict={BATCH_ACTION_KEY: [0, 1]})
+        second_result = gym_env_adapter.step(action_dict={BATCH_ACTION_KEY: [1, 0]})
+        assert first_result[3] == {"agent0": 0, "agent1": 1}
+        assert second_result[3] == {"agent0": 1, "agent1": 0}
+
+    def test_preprocessing(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=0, high=255, shape=(4, 4, 3), dtype=np.uint8)
+        gym_env_mock_obj.reset.return_value = np.full((4, 4, 3), 10, dtype=np.uint8)
+        gym_env_mock_obj.step.return_value = (np.full((4, 4, 3), 20, dtype=np.uint8), 5.0, True, {})
+        preprocessing = PreprocessingPipeline(grayscale=True, resize=(2, 2), clip_reward=1.0)
+        gym_env_adapter = GymEnvironmentAdapter("test_env", auto_reset=True, preprocessing=preprocessing)
+        assert gym_env_adapter.observation_space["agent0"].shape == (2, 2)
+
+        obs, _ = gym_env_adapter.reset()
+        np.testing.assert_array_equal(obs["agent0"], np.full((2, 2), 10, dtype=np.uint8))
+        obs, reward, _, _, info = gym_env_adapter.step(action_dict={"agent0": 0})
+        np.testing.assert_array_equal(obs["agent0"], np.full((2, 2), 10, dtype=np.uint8))
+        np.testing.assert_array_equal(info["terminal_observation"], np.full((2, 2), 20, dtype=np.uint8))
+        assert reward == {"agent0": 1.0}
+
+    def test_step_count(self, gym_make_mock):
+        gym_make_mock.return_value.step.return_value = (np.zeros(2), 1.0, False, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        assert gym_env_adapter.step_count == 0
+        gym_env_adapter.step(action_dict={"agent0": 0})
+        gym_env_adapter.step(action_dict={"agent0": 1})
+        # Counted without profiling.
+        assert gym_env_adapter.profiler is None
+        assert gym_env_adapter.step_count == 2
+
+        multi_env_adapter = GymEnvironmentAdapter("test_env", num_envs=3)
+        multi_env_adapter.step(action_dict={"agent0": 0, "agent2": 1})
+        assert multi_env_adapter.step_count == 2
+
+    def test_preprocessing_multiple_envs(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=-1.0, high=1.0, shape=(4,), dtype=np.float32)
+        gym_env_mock_obj.step.return_value = (np.zeros(4, dtype=np.float32), -3.0, False, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2,
+                                                preprocessing=PreprocessingPipeline(clip_reward=1.0))
+        _, reward, _, _, _ = gym_env_adapter.step(action_dict={"agent0": 0, "agent1": 1})
+        assert reward == {"agent0": -1.0, "agent1": -1.0}
+
+    def test_preprocessing_before_frame_stack(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=0, high=255, shape=(40, 40, 3), dtype=np.uint8)
+        gym_env_mock_obj.reset.return_value = np.full((40, 40, 3), 10, dtype=np.uint8)
+        gym_env_mock_obj.step.return_value = (np.full((40, 40, 3), 20, dtype=np.uint8), 1.0, False, {})
+        preprocessing = PreprocessingPipeline(grayscale=True, resize=(20, 20))
+        gym_env_adapter = GymEnvironmentAdapter("test_env", frame_stack=4, preprocessing=preprocessing)
+
+        # Each frame is transformed before the frames are stacked.
+        assert isinstance(gym_env_adapter.env, FrameStackWrapper)
+        assert isinstance(gym_env_adapter.env.env, PreprocessingWrapper)
+        assert gym_env_adapter.observation_space["agent0"].shape == (4, 20, 20)
+        obs, _ = gym_env_adapter.reset()
+        assert obs["agent0"].shape == (4, 20, 20)
+        obs, _, _, _, _ = gym_env_adapter.step(action_dict={"agent0": 0})
+        np.testing.assert_array_equal(obs["agent0"][-1], np.full((20, 20), 20, dtype=np.uint8))
+        np.testing.assert_array_equal(obs["agent0"][0], np.full((20, 20), 10, dtype=np.uint8))
+
+    def test_preprocessing_counts_terminal_obs_once(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=-10.0, high=10.0, shape=(2,), dtype=np.float32)
+        gym_env_mock_obj.reset.return_value = np.zeros(2, dtype=np.float32)
+        gym_env_mock_obj.step.return_value = (np.full(2, 4.0, dtype=np.float32), 1.0, True, {})
+        preprocessing = PreprocessingPipeline(normalize=True)
+        gym_env_adapter = GymEnvironmentAdapter("test_env", auto_reset=True, preprocessing=preprocessing)
+        count = preprocessing.stats()["count"]
+
+        _, _, _, _, info = gym_env_adapter.step(action_dict={"agent0": 0})
+        # The terminal frame and the frame after the automatic reset are counted once each.
+        assert preprocessing.stats()["count"] == count + 2
+        assert info["terminal_observation"].dtype == np.float32
+        assert np.all(info["terminal_observation"] > 0)
+
+    def test_set_preprocessing_with_frame_stack(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=0, high=255, shape=(8, 8, 3), dtype=np.uint8)
+        gym_env_mock_obj.reset.return_value = np.zeros((8, 8, 3), dtype=np.uint8)
+        gym_env_adapter = GymEnvironmentAdapter("test_env", frame_stack=2)
+
+        # The pipeline is validated against the frames before they are stacked.
+        gym_env_adapter.set_preprocessing(PreprocessingPipeline(grayscale=True, resize=(4, 4)))
+        obs, _ = gym_env_adapter.reset()
+        assert obs["agent0"].shape == (2, 4, 4)
+        assert gym_env_adapter.observation_space["agent0"].shape == (2, 4, 4)
+        gym_env_adapter.set_preprocessing(PreprocessingPipeline())
+        obs, _ = gym_env_adapter.reset()
+        assert obs["agent0"].shape == (2, 8, 8, 3)
+        assert unwrap_env(gym_env_adapter.env) == gym_env_mock_obj
+
+    def test_set_preprocessing_remakes_subprocess_copies(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=0, high=255, shape=(8, 8, 3), dtype=np.uint8)
+        gym_env_mock_obj.reset.return_value = np.zeros((8, 8, 3), dtype=np.uint8)
+        env_pool = GymEnvPool(max_size=4)
+        with patch("ude_gym_bridge.gym_environment_adapter.SubprocessGymEnv", _InProcessSubprocessGymEnv):
+            gym_env_adapter = GymEnvironmentAdapter("test_env", use_subprocess=True, env_pool=env_pool,
+                                                    frame_stack=2)
+            prev_env = gym_env_adapter.env
+            gym_env_adapter.set_preprocessing(PreprocessingPipeline(grayscale=True))
+            obs, _ = gym_env_adapter.reset()
+
+        # The copy running the previous wrappers is closed instead of pooled.
+        assert gym_env_adapter.env is not prev_env
+        assert isinstance(gym_env_adapter.env.env.env, PreprocessingWrapper)
+        assert obs["agent0"].shape == (2, 8, 8)
+        assert len(env_pool) == 0
+
+    def test_preprocess_side_channel(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=-1.0, high=1.0, shape=(4,), dtype=np.float32)
+        gym_env_mock_obj.reset.return_value = np.ones(4, dtype=np.float32)
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        side_channel = MagicMock()
+        version = gym_env_adapter.space_version
+
+        gym_env_adapter.on_received(side_channel=side_channel, key="preprocess", value='{"grayscale": true}')
+        assert "error" in json.loads(side_channel.send.call_args[0][1])
+        gym_env_adapter.on_received(side_channel=side_channel, key="preprocess", value='{"normalize": true}')
+        reply = json.loads(side_channel.send.call_args[0][1])
+        assert reply["pending"] and reply["config"]["normalize"]
+        # The pipeline takes effect at next reset.
+        assert gym_env_adapter.space_version == version
+        with patch("ude_gym_bridge.gym_environment_adapter.get_env_state", return_value={}):
+            gym_env_adapter.snapshot("start")
+        obs, _ = gym_env_adapter.reset()
+        assert obs["agent0"].dtype == np.float32
+        assert gym_env_adapter.space_version != version
+        assert gym_env_adapter.observation_space["agent0"].dtype == np.float32
+        assert gym_env_adapter.snapshot_names == []
+
+        gym_env_adapter.on_received(side_channel=side_channel, key="preprocess_stats", value=True)
+        assert json.loads(side_channel.send.call_args[0][1])["stats"]["count"] == 1
+        gym_env_adapter.on_received(side_channel=side_channel, key="preprocess", value="{}")
+        gym_env_adapter.reset()
+        assert gym_env_adapter.space_version == version
+        gym_env_adapter.on_received(side_channel=side_channel, key="preprocess_stats", value=True)
+        assert json.loads(side_channel.send.call_args[0][1]) == {}
+
+    def test_request_queue_rejects_when_saturated(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = (0, 1.0, False, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env", request_queue_size=1)
+        step_started, release_step = threading.Event(), threading.Event()
+
+        def blocking_step(action):
+            step_started.set()
+            release_step.wait()
+            return 0, 1.0, False, {}
+
+        gym_env_mock_obj.step.side_effect = blocking_step
+        step_thread = threading.Thread(target=gym_env_adapter.step, kwargs={"action_dict": {"agent0": 1}})
+        step_thread.start()
+        assert step_started.wait(5)
+        with self.assertRaises(AdapterSaturatedError):
+            gym_env_adapter.step(action_dict={"agent0": 1})
+        with self.assertRaises(AdapterSaturatedError):
+            gym_env_adapter.reset()
+        assert gym_env_adapter.queue_stats() == {"depth": 1, "max_depth": 1, "size": 1, "rejected": 2}
+        release_step.set()
+        step_thread.join()
+
+        gym_env_mock_obj.step.side_effect = None
+        gym_env_adapter.step(action_dict={"agent0": 1})
+        assert gym_env_adapter.queue_stats()["depth"] == 0
+
+    def test_request_queue_unlimited_by_default(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = (0, 1.0, False, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        gym_env_adapter.step(action_dict={"agent0": 1})
+        assert gym_env_adapter.queue_stats() == {"depth": 0, "max_depth": 1, "size": 0, "rejected": 0}
+        with self.assertRaises(ValueError):
+            GymEnvironmentAdapter("test_env", request_queue_size=-1)
+
+    def test_drain(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = (0, 1.0, False, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2, auto_reset=True)
+        gym_env_adapter.reset()
+        assert gym_env_adapter.active_episodes == 2
+
+        gym_env_adapter.set_draining(True)
+        assert gym_env_adapter.is_draining
+        with self.assertRaises(AdapterDrainingError):
+            gym_env_adapter.reset()
+        assert not gym_env_adapter.wait_drained(timeout=0.0)
+
+        # Unfinished episodes continue, and an automatically reset copy does not start new episode.
+        gym_env_mock_obj.step.side_effect = [(0, 1.0, True, {}), (0, 1.0, False, {})]
+        gym_env_adapter.step(action_dict={"agent0": 1, "agent1": 1})
+        assert gym_env_adapter.active_episodes == 1
+        gym_env_mock_obj.step.side_effect = [(0, 1.0, False, {}), (0, 1.0, True, {})]
+        gym_env_adapter.step(action_dict={"agent0": 1, "agent1": 1})
+        assert gym_env_adapter.active_episodes == 0
+        assert gym_env_adapter.wait_drained(timeout=0.0)
+
+        gym_env_adapter.set_draining(False)
+        gym_env_mock_obj.step.side_effect = None
+        gym_env_adapter.reset()
+        assert gym_env_adapter.active_episodes == 2
+
+    def test_wait_drained_wakes_on_done(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = (0, 1.0, True, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        gym_env_adapter.reset()
+        gym_env_adapter.set_draining(True)
+        drained = []
+        waiter = threading.Thread(target=lambda: drained.append(gym_env_adapter.wait_drained(timeout=5)))
+        waiter.start()
+        gym_env_adapter.step(action_dict={"agent0": 1})
+        waiter.join()
+        assert drained == [True]
+        assert gym_env_adapter.init_error is None
+
+    def test_seeded_reset_and_auto_reset(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = (0, 1.0, True, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env", num_envs=2, seed=42)
+        schedule = SeedSchedule(seed=42, num_envs=2)
+
+        # The construction resets episode 0 of each copy, and the first reset counts from zero again.
+        assert gym_env_mock_obj.reset.call_args_list[:2] == [mock.call(seed=schedule.episode_seed(0, 0)),
+                                                             mock.call(seed=schedule.episode_seed(1, 0))]
+        _, info = gym_env_adapter.reset()
+        assert info == {"seed": 42, "episode_seeds": {"agent0": schedule.episode_seed(0, 0),
+                                                      "agent1": schedule.episode_seed(1, 0)}}
+        _, _, _, _, info = gym_env_adapter.step(action_dict={"agent1": 0})
+        assert info["agent1"]["episode_seed"] == schedule.episode_seed(1, 1)
+        gym_env_mock_obj.reset.assert_called_with(seed=schedule.episode_seed(1, 1))
+        assert gym_env_adapter.seed_schedule.episodes == [1, 2]
+
+    def test_seed_matches_set_seed(self, gym_make_mock):
+        seeded_adapter = GymEnvironmentAdapter("test_env", num_envs=2, seed=7)
+        unseeded_adapter = GymEnvironmentAdapter("test_env", num_envs=2)
+        unseeded_adapter.set_seed(7)
+        for _ in range(2):
+            assert seeded_adapter.reset()[1] == unseeded_adapter.reset()[1]
+
+    def test_seeded_auto_reset_single_env(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.step.return_value = (0, 1.0, True, {})
+        gym_env_adapter = GymEnvironmentAdapter("test_env", auto_reset=True, seed=3)
+        _, _, _, _, info = gym_env_adapter.step(action_dict={"agent0": 0})
+        assert info["episode_seed"] == SeedSchedule(seed=3).episode_seed(0, 1)
+
+    def test_seed_side_channel(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_adapter = GymEnvironmentAdapter("test_env")
+        side_channel = MagicMock()
+        assert gym_env_adapter.seed_schedule is None
+
+        gym_env_adapter.on_received(side_channel=side_channel, key="seed", value="abc")
+        assert "error" in json.loads(side_channel.send.call_args[0][1])
+        gym_env_adapter.on_received(side_channel=side_channel, key="seed", value=9)
+        assert json.loads(side_channel.send.call_args[0][1]) == {"seed": 9, "pending": True}
+        # The seed takes effect at next reset, counting the episodes from zero.
+        assert gym_env_adapter.seed_schedule is None
+        _, info = gym_env_adapter.reset()
+        seed = SeedSchedule(seed=9).episode_seed(0, 0)
+        assert info == {"seed": 9, "episode_seeds": {"agent0": seed}}
+        gym_env_mock_obj.reset.assert_called_with(seed=seed)
+        gym_env_adapter.on_received(side_channel=side_channel, key="seed", value=9)
+        assert gym_env_adapter.reset()[1]["episode_seeds"] == {"agent0": seed}
+
+        gym_env_adapter.on_received(side_channel=side_channel, key="seed", value="")
+        assert gym_env_adapter.reset()[1] == {}
+        gym_env_mock_obj.reset.assert_called_with()
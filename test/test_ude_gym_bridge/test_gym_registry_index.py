@@ -0,0 +1,67 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import TestCase
+from unittest.mock import patch
+
+from ude_gym_bridge.gym_registry_index import GymRegistryIndex
+
+
+class FakeRegistry(object):
+    def __init__(self, env_ids):
+        self.env_specs = {env_id: None for env_id in env_ids}
+
+
+class GymRegistryIndexTest(TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(["CartPole-v0", "CartPole-v1", "ALE/Pong-v5", "Custom"])
+        self.registry_patcher = patch("gym.envs.registry", self.registry)
+        self.registry_patcher.start()
+
+    def tearDown(self) -> None:
+        self.registry_patcher.stop()
+
+    def test_get_instance(self):
+        assert GymRegistryIndex.get_instance() is GymRegistryIndex.get_instance()
+
+    def test_contains(self):
+        registry_index = GymRegistryIndex()
+        assert "CartPole-v0" in registry_index
+        assert "Custom" in registry_index
+        assert "bad-test-env" not in registry_index
+        assert len(registry_index) == 4
+
+    def test_resolve(self):
+        registry_index = GymRegistryIndex()
+        assert registry_index.resolve("CartPole-v0") == "CartPole-v0"
+        assert registry_index.resolve("cartpole-v0") == "CartPole-v0"
+        assert registry_index.resolve("CartPole") == "CartPole-v1"
+        assert registry_index.resolve("ALE/Pong") == "ALE/Pong-v5"
+        assert registry_index.resolve("bad-test-env") is None
+        assert registry_index.resolve(42) is None
+
+    def test_refresh_on_runtime_registration(self):
+        registry_index = GymRegistryIndex()
+        assert "CartPole-v2" not in registry_index
+        assert registry_index.resolve("CartPole") == "CartPole-v1"
+
+        self.registry.env_specs["CartPole-v2"] = None
+        assert "CartPole-v2" in registry_index
+        assert registry_index.resolve("CartPole") == "CartPole-v2"
+
+    def test_registry_dict(self):
+        with patch("gym.envs.registry", {"CartPole-v0": None}):
+            registry_index = GymRegistryIndex()
+            assert registry_index.env_ids == frozenset(["CartPole-v0"])
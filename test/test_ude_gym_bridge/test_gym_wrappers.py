@@ -0,0 +1,164 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import numpy as np
+from gym.spaces import Box, Discrete
+
+from ude_gym_bridge.gym_wrappers import (
+    ActionRepeatWrapper,
+    FrameStackWrapper,
+    PreprocessingWrapper,
+    env_wrapper_key,
+    make_env_wrapper,
+    unwrap_env,
+    wrap_env
+)
+from ude_gym_bridge.preprocessing import PreprocessingPipeline
+
+
+def _make_env_mock(shape=(2,)):
+    env_mock = MagicMock()
+    env_mock.observation_space = Box(low=0.0, high=255.0, shape=shape, dtype=np.float32)
+    env_mock.action_space = Discrete(2)
+    return env_mock
+
+
+class ActionRepeatWrapperTest(TestCase):
+    def test_initialization_with_invalid_repeat(self):
+        with self.assertRaises(ValueError):
+            ActionRepeatWrapper(_make_env_mock(), repeat=0)
+
+    def test_step_sums_rewards(self):
+        env_mock = _make_env_mock()
+        env_mock.step.return_value = ("obs", 1.5, False, {"key": "value"})
+        env = ActionRepeatWrapper(env_mock, repeat=3)
+
+        assert env.step(1) == ("obs", 4.5, False, {"key": "value"})
+        assert env_mock.step.call_count == 3
+        env_mock.step.assert_called_with(1)
+
+    def test_step_stops_on_done(self):
+        env_mock = _make_env_mock()
+        env_mock.step.side_effect = [("obs0", 1.0, False, {}),
+                                     ("obs1", 2.0, True, {}),
+                                     ("obs2", 4.0, False, {})]
+        env = ActionRepeatWrapper(env_mock, repeat=3)
+
+        assert env.step(0) == ("obs1", 3.0, True, {})
+        assert env_mock.step.call_count == 2
+
+    def test_step_with_max_pool(self):
+        env_mock = _make_env_mock()
+        env_mock.step.side_effect = [(np.array([9.0, 9.0]), 0.0, False, {}),
+                                     (np.array([1.0, 5.0]), 0.0, False, {}),
+                                     (np.array([4.0, 2.0]), 0.0, False, {})]
+        env = ActionRepeatWrapper(env_mock, repeat=3, max_pool=True)
+
+        obs, _, _, _ = env.step(0)
+        np.testing.assert_array_equal(obs, [4.0, 5.0])
+
+
+class FrameStackWrapperTest(TestCase):
+    def test_initialization_with_invalid_num_stack(self):
+        with self.assertRaises(ValueError):
+            FrameStackWrapper(_make_env_mock(), num_stack=0)
+
+    def test_initialization_with_non_box_observation_space(self):
+        env_mock = _make_env_mock()
+        env_mock.observation_space = Discrete(3)
+        with self.assertRaises(ValueError):
+            FrameStackWrapper(env_mock, num_stack=2)
+
+    def test_observation_space(self):
+        env = FrameStackWrapper(_make_env_mock(shape=(4, 3)), num_stack=2)
+        assert env.observation_space.shape == (2, 4, 3)
+        assert env.observation_space.dtype == np.float32
+
+    def test_reset_and_step_stack_oldest_first(self):
+        env_mock = _make_env_mock()
+        env_mock.reset.return_value = np.array([0.0, 0.0])
+        env_mock.step.side_effect = [(np.array([float(idx), float(idx)]), 1.0, False, {})
+                                     for idx in range(1, 5)]
+        env = FrameStackWrapper(env_mock, num_stack=3)
+
+        np.testing.assert_array_equal(env.reset(), [[0, 0], [0, 0], [0, 0]])
+        np.testing.assert_array_equal(env.step(0)[0], [[0, 0], [0, 0], [1, 1]])
+        np.testing.assert_array_equal(env.step(0)[0], [[0, 0], [1, 1], [2, 2]])
+        np.testing.assert_array_equal(env.step(0)[0], [[1, 1], [2, 2], [3, 3]])
+        obs = env.step(0)[0]
+        np.testing.assert_array_equal(obs, [[2, 2], [3, 3], [4, 4]])
+        # Returned stack must not alias the ring buffer.
+        env_mock.reset.return_value = np.array([7.0, 7.0])
+        env.reset()
+        np.testing.assert_array_equal(obs, [[2, 2], [3, 3], [4, 4]])
+
+
+class PreprocessingWrapperTest(TestCase):
+    def test_process_obs_and_reward(self):
+        env_mock = _make_env_mock(shape=(4, 4, 3))
+        env_mock.reset.return_value = np.full((4, 4, 3), 10.0, dtype=np.float32)
+        env_mock.step.return_value = (np.full((4, 4, 3), 20.0, dtype=np.float32), 5.0, True, {"x": 1})
+        env = PreprocessingWrapper(env_mock, PreprocessingPipeline(grayscale=True, resize=(2, 2), clip_reward=1.0))
+
+        assert env.observation_space.shape == (2, 2)
+        np.testing.assert_allclose(env.reset(), np.full((2, 2), 10.0))
+        obs, reward, done, info = env.step(0)
+        np.testing.assert_allclose(obs, np.full((2, 2), 20.0))
+        assert reward == 1.0
+        assert done and info == {"x": 1}
+
+
+class WrapEnvTest(TestCase):
+    def test_wrap_env_without_config(self):
+        env_mock = _make_env_mock()
+        assert wrap_env(env_mock) is env_mock
+        assert make_env_wrapper() is None
+
+    def test_wrap_env_and_unwrap_env(self):
+        env_mock = _make_env_mock()
+        env = wrap_env(env_mock, frame_skip=4, frame_stack=2)
+
+        assert isinstance(env, FrameStackWrapper)
+        assert isinstance(env.env, ActionRepeatWrapper)
+        assert unwrap_env(env) is env_mock
+
+    def test_wrap_env_with_preprocessing(self):
+        env_mock = _make_env_mock(shape=(8, 8, 3))
+        env = wrap_env(env_mock, frame_skip=2, frame_stack=4, preprocessing=PreprocessingPipeline(grayscale=True))
+
+        # Frames are transformed after action repeat and before being stacked.
+        assert isinstance(env, FrameStackWrapper)
+        assert isinstance(env.env, PreprocessingWrapper)
+        assert isinstance(env.env.env, ActionRepeatWrapper)
+        assert env.observation_space.shape == (4, 8, 8)
+        assert unwrap_env(env) is env_mock
+        assert wrap_env(env_mock, preprocessing=PreprocessingPipeline()) is env_mock
+
+    def test_make_env_wrapper(self):
+        env_wrapper = make_env_wrapper(frame_skip=2, max_pool=True)
+        env = env_wrapper(_make_env_mock())
+        assert isinstance(env, ActionRepeatWrapper)
+        assert env._max_pool
+        assert make_env_wrapper(preprocessing=PreprocessingPipeline()) is None
+
+    def test_env_wrapper_key(self):
+        assert env_wrapper_key(None) is None
+        key = env_wrapper_key(make_env_wrapper(frame_stack=4, preprocessing=PreprocessingPipeline(grayscale=True)))
+        assert key == env_wrapper_key(make_env_wrapper(frame_stack=4,
+                                                       preprocessing=PreprocessingPipeline(grayscale=True)))
+        assert key != env_wrapper_key(make_env_wrapper(frame_stack=4))
@@ -0,0 +1,208 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+import itertools
+import multiprocessing
+import threading
+import time
+from unittest import mock, TestCase
+from unittest.mock import MagicMock, patch
+
+from ude import UDEStepInvokeType, Compression
+
+from ude_gym_bridge.launcher import RunnerLauncher, assign_cpus, main, parse_port_range
+
+
+class _ThreadProcess(object):
+    """
+    Process running the target as a thread.
+    """
+    _pids = itertools.count(1000)
+
+    def __init__(self, target, args, daemon):
+        self._thread = threading.Thread(target=self._run, args=(target, args), daemon=daemon)
+        self.pid = None
+        self.exitcode = None
+
+    def _run(self, target, args):
+        try:
+            target(*args)
+            self.exitcode = 0
+        except Exception:
+            self.exitcode = 1
+
+    def start(self):
+        self.pid = next(self._pids)
+        self._thread.start()
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def terminate(self):
+        pass
+
+
+class _ThreadConnection(object):
+    """
+    Write end of the pipe shared with the parent thread, closed only by the worker.
+    """
+    def __init__(self, conn):
+        self._conn = conn
+        self._close_count = 0
+
+    def send(self, obj):
+        self._conn.send(obj)
+
+    def close(self):
+        # The first close comes from the parent after starting the worker.
+        self._close_count += 1
+        if self._close_count > 1:
+            self._conn.close()
+
+
+class _ThreadContext(object):
+    """
+    Multiprocessing context running the runner processes as threads.
+    """
+    Event = threading.Event
+    Process = _ThreadProcess
+
+    @staticmethod
+    def Pipe(duplex):
+        conn, worker_conn = multiprocessing.Pipe(duplex=duplex)
+        return conn, _ThreadConnection(worker_conn)
+
+
+@mock.patch("ude_gym_bridge.launcher.os.sched_setaffinity", create=True)
+@mock.patch("ude_gym_bridge.launcher.multiprocessing.get_context", return_value=_ThreadContext())
+@mock.patch("ude_gym_bridge.launcher.GymEnvRemoteRunner")
+class RunnerLauncherTest(TestCase):
+    def test_run(self, runner_mock, get_context_mock, setaffinity_mock):
+        runner_mock.return_value.adapter.step_count = 10
+        runner_mock.return_value.adapter.profiler.stats.return_value = {"episodes": {"count": 2}}
+        with patch("ude_gym_bridge.launcher.assign_cpus", return_value=[[0], [1]]):
+            launcher = RunnerLauncher(num_processes=2, port_range=(4000, 4003), pin_cpus=True,
+                                      report_interval=0.02, seed=1, env_name="test_env", profile=True)
+        summary = launcher.run(duration=0.2)
+
+        assert launcher.ports == [4000, 4001]
+        assert launcher.cpus == [[0], [1]]
+        kwargs = [call[1] for call in runner_mock.call_args_list]
+        assert sorted(kwargs_item["port"] for kwargs_item in kwargs) == [4000, 4001]
+        assert all(kwargs_item["profile"] and kwargs_item["env_name"] == "test_env" for kwargs_item in kwargs)
+        assert len({kwargs_item["seed"] for kwargs_item in kwargs}) == 2
+        assert sorted(call[0][1] for call in setaffinity_mock.call_args_list) == [[0], [1]]
+        assert runner_mock.return_value.stop.call_count == 2
+        assert summary["steps"] == 20
+        assert summary["episodes"] == 4
+        assert summary["worker_steps"] == [10, 10]
+        assert summary["steps_per_sec"] > 0
+        assert summary["restarts"] == 0
+        assert summary["alive"] == 0
+
+    def test_steps_reported_without_profiling(self, runner_mock, get_context_mock, setaffinity_mock):
+        runner_mock.return_value.adapter.step_count = 7
+        runner_mock.return_value.adapter.profiler = None
+        summary = RunnerLauncher(num_processes=1, report_interval=0.01).run(duration=0.05)
+
+        assert "profile" not in runner_mock.call_args[1]
+        assert summary["steps"] == 7
+        assert summary["episodes"] == 0
+        # Processes are not pinned by default.
+        setaffinity_mock.assert_not_called()
+
+    def test_pin_divides_available_cpus(self, runner_mock, get_context_mock, setaffinity_mock):
+        with patch("ude_gym_bridge.launcher.available_cpus", return_value=[0, 1, 2, 3, 4]):
+            launcher = RunnerLauncher(num_processes=2, port_range=(4000, 4001), pin_cpus=True)
+            assert launcher.cpus == [[0, 1], [2, 3]]
+            assert RunnerLauncher(pin_cpus=True).cpus == [[0, 1, 2, 3, 4]]
+            assert RunnerLauncher(pin_cpus=True, cpus_per_process=1).cpus == [[0]]
+        assert RunnerLauncher().cpus == [None]
+
+    def test_restart_crashed_process(self, runner_mock, get_context_mock, setaffinity_mock):
+        runner_mock.side_effect = [RuntimeError("crash"), MagicMock()]
+        launcher = RunnerLauncher(num_processes=1, restart_delay=0.0, report_interval=0.01)
+        launcher.start()
+        deadline = time.monotonic() + 5.0
+        while launcher.throughput()["restarts"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+            launcher.supervise()
+        assert launcher.throughput()["restarts"] == 1
+        assert launcher.is_running
+        launcher.stop()
+        assert runner_mock.call_count == 2
+        setaffinity_mock.assert_not_called()
+
+    def test_give_up_after_max_restarts(self, runner_mock, get_context_mock, setaffinity_mock):
+        runner_mock.side_effect = RuntimeError("crash")
+        launcher = RunnerLauncher(num_processes=1, max_restarts=2, restart_delay=0.0, report_interval=0.01)
+        summary = launcher.run(duration=5.0)
+        assert not launcher.is_running
+        assert summary["restarts"] == 2
+        assert summary["failed"] == 1
+        assert runner_mock.call_count == 3
+
+    def test_invalid_arguments(self, runner_mock, get_context_mock, setaffinity_mock):
+        with self.assertRaises(ValueError):
+            RunnerLauncher(num_processes=0)
+        with self.assertRaises(ValueError):
+            RunnerLauncher(num_processes=3, port_range=(4000, 4001))
+
+    def test_main(self, runner_mock, get_context_mock, setaffinity_mock):
+        runner_mock.return_value.adapter.step_count = 0
+        runner_mock.return_value.adapter.profiler.stats.return_value = {}
+        summary = main(["--env", "test_env", "--num-processes", "2", "--ports", "5000-5001",
+                        "--compression", "Gzip", "--step-invoke-type", "PERIODIC", "--step-invoke-period", "0.1",
+                        "--render", "--num-envs", "4", "--use-subprocess", "--seed", "7",
+                        "--report-interval", "0.01", "--duration", "0.05"])
+        assert runner_mock.call_count == 2
+        kwargs = runner_mock.call_args[1]
+        assert kwargs["env_name"] == "test_env"
+        assert kwargs["compression"] == Compression.Gzip
+        assert kwargs["step_invoke_type"] == UDEStepInvokeType.PERIODIC
+        assert kwargs["step_invoke_period"] == 0.1
+        assert kwargs["render"] is True
+        assert kwargs["num_envs"] == 4
+        assert kwargs["use_subprocess"] is True
+        assert kwargs["seed"] is not None
+        assert sorted(call[1]["port"] for call in runner_mock.call_args_list) == [5000, 5001]
+        setaffinity_mock.assert_not_called()
+        assert "steps_per_sec" in summary
+
+    def test_main_with_pin(self, runner_mock, get_context_mock, setaffinity_mock):
+        runner_mock.return_value.adapter.step_count = 0
+        runner_mock.return_value.adapter.profiler = None
+        with patch("ude_gym_bridge.launcher.available_cpus", return_value=[0, 1, 2, 3]):
+            main(["--env", "test_env", "--num-processes", "2", "--ports", "5000-5001", "--pin",
+                  "--report-interval", "0.01", "--duration", "0.05"])
+        assert sorted(call[0][1] for call in setaffinity_mock.call_args_list) == [[0, 1], [2, 3]]
+
+
+class LauncherUtilsTest(TestCase):
+    def test_assign_cpus(self):
+        assert assign_cpus(2, 1, cpus=[5, 7]) == [[5], [7]]
+        assert assign_cpus(3, 2, cpus=[0, 1, 2, 3]) == [[0, 1], [2, 3], [0, 1]]
+        assert assign_cpus(1, 4, cpus=[0, 1]) == [[0, 1]]
+        with self.assertRaises(ValueError):
+            assign_cpus(1, 0)
+
+    def test_parse_port_range(self):
+        assert parse_port_range("3003") == (3003, 3003)
+        assert parse_port_range("3003-3010") == (3003, 3010)
+        with self.assertRaises(ValueError):
+            parse_port_range("3010-3003")
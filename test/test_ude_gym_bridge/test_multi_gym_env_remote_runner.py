@@ -0,0 +1,58 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import mock, TestCase
+
+from ude_gym_bridge.multi_gym_env_remote_runner import MultiGymEnvRemoteRunner
+
+
+@mock.patch("ude_gym_bridge.multi_gym_env_remote_runner.UDEServer")
+@mock.patch("ude_gym_bridge.multi_gym_env_remote_runner.UDEEnvironment")
+@mock.patch("ude_gym_bridge.multi_gym_env_remote_runner.MultiGymEnvironmentAdapter")
+@mock.patch("ude_gym_bridge.multi_gym_env_remote_runner.GymEnvironmentAdapter")
+class MultiGymEnvRemoteRunnerTest(TestCase):
+    def test_initialization_with_env_names(self, adapter_mock, multi_adapter_mock, ude_env_mock, ude_server_mock):
+        runner = MultiGymEnvRemoteRunner(tenants=["env_a", "env_b"], admission_limit=2)
+
+        assert adapter_mock.call_count == 2
+        assert adapter_mock.call_args_list[0][1] == {"env_name": "env_a", "render": False,
+                                                     "auto_reset": True, "env_pool": None}
+        multi_adapter_kwargs = multi_adapter_mock.call_args[1]
+        assert list(multi_adapter_kwargs["adapters"]) == ["env_a", "env_b"]
+        assert multi_adapter_kwargs["admission_limits"] == {"env_a": 2, "env_b": 2}
+        ude_env_mock.assert_called_once_with(ude_env_adapter=multi_adapter_mock.return_value)
+        assert ude_server_mock.call_args[1]["ude_env"] == ude_env_mock.return_value
+        assert runner.adapter == multi_adapter_mock.return_value
+
+    def test_initialization_with_tenant_kwargs(self, adapter_mock, multi_adapter_mock, ude_env_mock, ude_server_mock):
+        MultiGymEnvRemoteRunner(tenants={"pong": {"env_name": "ALE/Pong-v5", "num_envs": 4}},
+                                admission_limits={"pong": 1},
+                                env_pool_size=4)
+
+        adapter_kwargs = adapter_mock.call_args[1]
+        assert adapter_kwargs["env_name"] == "ALE/Pong-v5"
+        assert adapter_kwargs["num_envs"] == 4
+        assert adapter_kwargs["env_pool"] is not None
+        assert multi_adapter_mock.call_args[1]["admission_limits"] == {"pong": 1}
+
+    def test_start_stop_spin(self, adapter_mock, multi_adapter_mock, ude_env_mock, ude_server_mock):
+        runner = MultiGymEnvRemoteRunner(tenants=["env_a"])
+        runner.start()
+        ude_server_mock.return_value.start.assert_called_once()
+        runner.spin()
+        ude_server_mock.return_value.spin.assert_called_once()
+        runner.stop()
+        ude_server_mock.return_value.close.assert_called_once()
+        multi_adapter_mock.return_value.close.assert_called_once()
@@ -0,0 +1,148 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import TestCase
+from unittest.mock import MagicMock
+import threading
+
+from ude_gym_bridge.multi_gym_environment_adapter import (
+    MultiGymEnvironmentAdapter,
+    TenantAdmissionError,
+    split_agent_id
+)
+
+
+def _make_adapter_mock(agent_names=("agent0",)):
+    adapter_mock = MagicMock()
+    adapter_mock.num_envs = len(agent_names)
+    adapter_mock.observation_space = {agent_name: "obs_space" for agent_name in agent_names}
+    adapter_mock.action_space = {agent_name: "action_space" for agent_name in agent_names}
+    adapter_mock.reset.return_value = ({agent_name: "reset_obs" for agent_name in agent_names}, {})
+    return adapter_mock
+
+
+class MultiGymEnvironmentAdapterTest(TestCase):
+    def test_initialization_without_adapters(self):
+        with self.assertRaises(ValueError):
+            MultiGymEnvironmentAdapter(adapters={})
+
+    def test_initialization_with_unknown_admission_limit(self):
+        with self.assertRaises(ValueError):
+            MultiGymEnvironmentAdapter(adapters={"a": _make_adapter_mock()}, admission_limits={"b": 1})
+
+    def test_split_agent_id(self):
+        assert split_agent_id("CartPole-v0/agent0") == ("CartPole-v0", "agent0")
+        assert split_agent_id("ALE/Pong-v5/agent1") == ("ALE/Pong-v5", "agent1")
+        with self.assertRaises(KeyError):
+            split_agent_id("agent0")
+
+    def test_spaces(self):
+        adapter = MultiGymEnvironmentAdapter(adapters={"a": _make_adapter_mock(),
+                                                       "b": _make_adapter_mock(("agent0", "agent1"))})
+        assert adapter.observation_space == {"a/agent0": "obs_space",
+                                             "b/agent0": "obs_space",
+                                             "b/agent1": "obs_space"}
+        assert list(adapter.action_space) == ["a/agent0", "b/agent0", "b/agent1"]
+        adapter.close()
+
+    def test_step_routes_to_tenants(self):
+        adapter_a, adapter_b = _make_adapter_mock(), _make_adapter_mock(("agent0", "agent1"))
+        adapter_a.step.return_value = ({"agent0": "obs_a"}, {"agent0": 1.0}, {"agent0": False},
+                                       {"agent0": 1}, {"key": "value"})
+        adapter_b.step.return_value = ({"agent1": "obs_b"}, {"agent1": 2.0}, {"agent1": True},
+                                       {"agent1": 0}, {"agent1": {"terminal_observation": "obs"}})
+        adapter = MultiGymEnvironmentAdapter(adapters={"a": adapter_a, "b": adapter_b})
+
+        obs, reward, done, last_action, info = adapter.step({"a/agent0": 1, "b/agent1": 0})
+        adapter_a.step.assert_called_once_with({"agent0": 1})
+        adapter_b.step.assert_called_once_with({"agent1": 0})
+        assert obs == {"a/agent0": "obs_a", "b/agent1": "obs_b"}
+        assert reward == {"a/agent0": 1.0, "b/agent1": 2.0}
+        assert done == {"a/agent0": False, "b/agent1": True}
+        assert last_action == {"a/agent0": 1, "b/agent1": 0}
+        assert info == {"a/agent0": {"key": "value"}, "b/agent1": {"terminal_observation": "obs"}}
+        adapter.close()
+
+    def test_step_routes_info_by_tenant(self):
+        adapter_a, adapter_b = _make_adapter_mock(), _make_adapter_mock(("agent0", "agent1"))
+        # The info of a single environment is routed as is, even with a key named after the agent.
+        adapter_a.step.return_value = ({"agent0": "obs_a"}, {"agent0": 1.0}, {"agent0": False},
+                                       {"agent0": 1}, {"agent0": "value"})
+        adapter_b.step.return_value = ({"agent0": "obs_b"}, {"agent0": 2.0}, {"agent0": False},
+                                       {"agent0": 0}, {})
+        adapter = MultiGymEnvironmentAdapter(adapters={"a": adapter_a, "b": adapter_b})
+
+        _, _, _, _, info = adapter.step({"a/agent0": 1, "b/agent0": 0})
+        assert info == {"a/agent0": {"agent0": "value"}, "b/agent0": {}}
+        adapter.close()
+
+    def test_step_with_unknown_tenant(self):
+        adapter = MultiGymEnvironmentAdapter(adapters={"a": _make_adapter_mock()})
+        with self.assertRaises(KeyError):
+            adapter.step({"b/agent0": 1})
+        adapter.close()
+
+    def test_reset(self):
+        adapter_a, adapter_b = _make_adapter_mock(), _make_adapter_mock()
+        adapter = MultiGymEnvironmentAdapter(adapters={"a": adapter_a, "b": adapter_b})
+
+        assert adapter.reset() == ({"a/agent0": "reset_obs", "b/agent0": "reset_obs"}, {})
+        adapter_a.reset.assert_called_once()
+        adapter_b.reset.assert_called_once()
+        adapter_a.reset.return_value = ({"agent0": "reset_obs"}, {"seed": 1, "episode_seeds": {"agent0": 5}})
+        assert adapter.reset()[1] == {"a": {"seed": 1, "episode_seeds": {"agent0": 5}}}
+        adapter.close()
+        adapter_a.close.assert_called_once()
+        adapter_b.close.assert_called_once()
+
+    def test_admission_limit(self):
+        adapter_a = _make_adapter_mock()
+        step_started, release_step = threading.Event(), threading.Event()
+
+        def step(action_dict):
+            step_started.set()
+            release_step.wait()
+            return {"agent0": "obs"}, {"agent0": 0.0}, {"agent0": False}, {"agent0": 0}, {}
+
+        adapter_a.step.side_effect = step
+        adapter = MultiGymEnvironmentAdapter(adapters={"a": adapter_a},
+                                             admission_limits={"a": 1},
+                                             admission_timeout=0.01)
+        thread = threading.Thread(target=adapter.step, args=({"a/agent0": 0},))
+        thread.start()
+        step_started.wait()
+        try:
+            with self.assertRaises(TenantAdmissionError):
+                adapter.step({"a/agent0": 0})
+        finally:
+            release_step.set()
+            thread.join()
+        # Admission is released after the request completes.
+        adapter.step({"a/agent0": 0})
+        adapter.close()
+
+    def test_on_received_forwards_to_tenant(self):
+        adapter_a = _make_adapter_mock()
+        adapter_a.on_received.side_effect = lambda side_channel, key, value: side_channel.send(key, "reply")
+        adapter = MultiGymEnvironmentAdapter(adapters={"ALE/Pong-v5": adapter_a})
+        side_channel = MagicMock()
+
+        adapter.on_received(side_channel=side_channel, key="ALE/Pong-v5/stats", value="")
+        assert adapter_a.on_received.call_args[1]["key"] == "stats"
+        side_channel.send.assert_called_once_with("ALE/Pong-v5/stats", "reply")
+
+        adapter.on_received(side_channel=side_channel, key="unknown/stats", value="")
+        assert adapter_a.on_received.call_count == 1
+        adapter.close()
@@ -0,0 +1,189 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+import pickle
+from unittest import TestCase
+
+import numpy as np
+
+from ude_gym_bridge.observation_encoding import (
+    ENCODING_KEY,
+    ObservationEncoder,
+    RawBufferObservationEncoder,
+    SharedMemoryObservationEncoder,
+    DeltaObservationEncoder,
+    ObservationDecoder,
+    create_observation_encoder
+)
+
+
+class ObservationEncodingTest(TestCase):
+    def setUp(self) -> None:
+        self.obs = np.arange(210 * 160 * 3, dtype=np.uint8).reshape(210, 160, 3)
+
+    def test_base_encoder(self):
+        assert ObservationEncoder().encode("agent0", self.obs) is self.obs
+
+    def test_raw_buffer(self):
+        encoder = RawBufferObservationEncoder()
+        encoded = encoder.encode("agent0", self.obs[:, ::2])
+        assert encoded[ENCODING_KEY] == "raw"
+        decoded = ObservationDecoder().decode(pickle.loads(pickle.dumps(encoded)))
+        assert np.array_equal(decoded, self.obs[:, ::2])
+
+    def test_non_array_passes_through(self):
+        decoder = ObservationDecoder()
+        for encoder in [RawBufferObservationEncoder(), SharedMemoryObservationEncoder()]:
+            assert encoder.encode("agent0", 3) == 3
+            assert decoder.decode(3) == 3
+            encoder.close()
+
+    def test_shared_memory(self):
+        encoder = SharedMemoryObservationEncoder(num_slots=2)
+        decoder = ObservationDecoder()
+        try:
+            encoded = encoder.encode("agent0", self.obs)
+            assert encoded[ENCODING_KEY] == "shm"
+            # Only the descriptor is sent through the transport.
+            assert len(pickle.dumps(encoded)) < 200
+            assert np.array_equal(decoder.decode(encoded), self.obs)
+
+            second = encoder.encode("agent0", self.obs + 1)
+            third = encoder.encode("agent0", self.obs + 2)
+            assert second["name"] != encoded["name"]
+            # The slot is reused after num_slots observations.
+            assert third["name"] == encoded["name"]
+            assert np.array_equal(decoder.decode(third), self.obs + 2)
+        finally:
+            decoder.close()
+            encoder.close()
+
+    def test_shared_memory_grows_slot(self):
+        encoder = SharedMemoryObservationEncoder(num_slots=1)
+        decoder = ObservationDecoder()
+        try:
+            encoder.encode("agent0", np.zeros(4, dtype=np.uint8))
+            encoded = encoder.encode("agent0", self.obs)
+            assert np.array_equal(decoder.decode(encoded), self.obs)
+        finally:
+            decoder.close()
+            encoder.close()
+
+    def test_shared_memory_detaches_replaced_slot(self):
+        encoder = SharedMemoryObservationEncoder(num_slots=1)
+        decoder = ObservationDecoder()
+        try:
+            small = encoder.encode("agent0", np.zeros(4, dtype=np.uint8))
+            decoder.decode(small, "agent0")
+            small_segment = decoder._segments[("agent0", 0)]
+            # The server replaces the slot with a larger segment.
+            encoded = encoder.encode("agent0", self.obs)
+            assert encoded["name"] != small["name"]
+            assert np.array_equal(decoder.decode(encoded, "agent0"), self.obs)
+            assert len(decoder._segments) == 1
+            assert small_segment.buf is None
+        finally:
+            decoder.close()
+            encoder.close()
+
+    def test_shared_memory_invalid_num_slots(self):
+        with self.assertRaises(ValueError):
+            SharedMemoryObservationEncoder(num_slots=0)
+
+    def test_decode_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            ObservationDecoder().decode({ENCODING_KEY: "unknown"})
+
+    def test_create_observation_encoder(self):
+        assert create_observation_encoder(None) is None
+        assert create_observation_encoder("none") is None
+        assert isinstance(create_observation_encoder("raw"), RawBufferObservationEncoder)
+        encoder = create_observation_encoder("shm", num_slots=2)
+        assert isinstance(encoder, SharedMemoryObservationEncoder)
+        encoder.close()
+        assert isinstance(create_observation_encoder("delta", keyframe_interval=5), DeltaObservationEncoder)
+        with self.assertRaises(ValueError):
+            create_observation_encoder("unknown")
+
+    def test_delta(self):
+        encoder = DeltaObservationEncoder(keyframe_interval=3)
+        decoder = ObservationDecoder()
+        base = np.random.RandomState(0).randint(0, 256, size=self.obs.shape).astype(np.uint8)
+        frames = [base.copy() for _ in range(5)]
+        for idx, frame in enumerate(frames):
+            frame[idx, :10] = 255 - frame[idx, :10]
+
+        encoded_frames = [encoder.encode("agent0", frame) for frame in frames]
+        assert [encoded["keyframe"] for encoded in encoded_frames] == [True, False, False, True, False]
+        # Delta frames are far smaller than keyframes.
+        assert len(encoded_frames[1]["data"]) * 10 < len(encoded_frames[0]["data"])
+        for frame, encoded in zip(frames, encoded_frames):
+            assert np.array_equal(decoder.decode(pickle.loads(pickle.dumps(encoded)), "agent0"), frame)
+
+    def test_delta_new_episode_is_keyframe(self):
+        encoder = DeltaObservationEncoder(keyframe_interval=100)
+        encoder.encode("agent0", self.obs)
+        assert not encoder.encode("agent0", self.obs)["keyframe"]
+        assert encoder.encode("agent0", self.obs, new_episode=True)["keyframe"]
+        # Agents are encoded independently.
+        assert encoder.encode("agent1", self.obs)["keyframe"]
+
+    def test_delta_with_reused_obs_buffer(self):
+        encoder = DeltaObservationEncoder(keyframe_interval=100)
+        decoder = ObservationDecoder()
+        obs_buffer = self.obs.copy()
+        # The environment writes every observation into the same buffer.
+        for idx in range(3):
+            obs_buffer[idx] = 0
+            encoded = encoder.encode("agent0", obs_buffer)
+            assert np.array_equal(decoder.decode(encoded, "agent0"), obs_buffer)
+
+    def test_delta_quantize(self):
+        encoder = DeltaObservationEncoder(quantize_range=(-1.0, 1.0))
+        decoder = ObservationDecoder()
+        obs = np.linspace(-1.0, 1.0, 64, dtype=np.float32).reshape(8, 8)
+        for frame in [obs, obs[::-1].copy()]:
+            encoded = encoder.encode("agent0", frame)
+            assert encoded["dtype"] == np.dtype(np.uint8).str
+            decoded = decoder.decode(encoded, "agent0")
+            assert decoded.dtype == np.float32
+            assert np.allclose(decoded, frame, atol=2.0 / 255.0)
+
+    def test_delta_before_keyframe(self):
+        encoder = DeltaObservationEncoder()
+        encoder.encode("agent0", self.obs)
+        with self.assertRaises(ValueError):
+            ObservationDecoder().decode(encoder.encode("agent0", self.obs), "agent0")
+
+    def test_delta_missing_frame(self):
+        encoder = DeltaObservationEncoder(keyframe_interval=3)
+        decoder = ObservationDecoder()
+        encoded_frames = [encoder.encode("agent0", self.obs) for _ in range(5)]
+        assert [encoded["seq"] for encoded in encoded_frames] == [0, 1, 2, 3, 4]
+        decoder.decode(encoded_frames[0], "agent0")
+        # The second frame is lost.
+        with self.assertRaises(ValueError):
+            decoder.decode(encoded_frames[2], "agent0")
+        # No delta is applied until the next keyframe.
+        with self.assertRaises(ValueError):
+            decoder.decode(encoded_frames[2], "agent0")
+        assert np.array_equal(decoder.decode(encoded_frames[3], "agent0"), self.obs)
+        assert np.array_equal(decoder.decode(encoded_frames[4], "agent0"), self.obs)
+
+    def test_delta_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            DeltaObservationEncoder(keyframe_interval=0)
+        with self.assertRaises(ValueError):
+            DeltaObservationEncoder(quantize_range=(1.0, -1.0))
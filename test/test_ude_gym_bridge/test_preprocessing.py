@@ -0,0 +1,106 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import TestCase
+
+import numpy as np
+from gym.spaces import Box, Discrete
+
+from ude_gym_bridge.preprocessing import PreprocessingPipeline
+
+
+def image_space(shape=(8, 6, 3)):
+    return Box(low=0, high=255, shape=shape, dtype=np.uint8)
+
+
+class PreprocessingPipelineTest(TestCase):
+    def test_invalid_config(self):
+        with self.assertRaises(ValueError):
+            PreprocessingPipeline(resize=[84])
+        with self.assertRaises(ValueError):
+            PreprocessingPipeline(clip_obs=0.0)
+        with self.assertRaises(ValueError):
+            PreprocessingPipeline(clip_reward=-1.0)
+        with self.assertRaises(TypeError):
+            PreprocessingPipeline.from_config({"unknown": True})
+
+    def test_identity(self):
+        pipeline = PreprocessingPipeline()
+        assert pipeline.is_identity
+        obs = np.zeros(3)
+        assert pipeline.process_obs(obs) is obs
+        assert pipeline.process_reward(5.0) == 5.0
+        space = Discrete(3)
+        assert pipeline.observation_space(space) is space
+
+    def test_grayscale_and_resize(self):
+        pipeline = PreprocessingPipeline(grayscale=True, resize=(4, 3))
+        space = pipeline.observation_space(image_space())
+        assert space.shape == (4, 3)
+        assert space.dtype == np.uint8
+        assert space.low.min() == 0 and space.high.max() == 255
+
+        obs = np.random.default_rng(0).integers(0, 256, size=(8, 6, 3), dtype=np.uint8)
+        processed = pipeline.process_obs(obs)
+        gray = np.rint(obs @ np.array([0.299, 0.587, 0.114]))
+        np.testing.assert_array_equal(processed, gray[::2, ::2].astype(np.uint8))
+        assert space.contains(processed)
+        # Each observation gets its own output array.
+        assert pipeline.process_obs(obs) is not processed
+
+    def test_resize_keeps_channels(self):
+        pipeline = PreprocessingPipeline(resize=(2, 3))
+        assert pipeline.observation_space(image_space()).shape == (2, 3, 3)
+        obs = np.arange(8 * 6 * 3, dtype=np.uint8).reshape(8, 6, 3)
+        np.testing.assert_array_equal(pipeline.process_obs(obs), obs[::4, ::2])
+
+    def test_unsupported_space(self):
+        with self.assertRaises(ValueError):
+            PreprocessingPipeline(grayscale=True).observation_space(Discrete(3))
+        with self.assertRaises(ValueError):
+            PreprocessingPipeline(grayscale=True).observation_space(image_space((8, 6)))
+        with self.assertRaises(ValueError):
+            PreprocessingPipeline(resize=(2, 2)).observation_space(Box(low=0, high=1, shape=(4,)))
+
+    def test_normalize(self):
+        pipeline = PreprocessingPipeline(normalize=True, clip_obs=5.0)
+        space = pipeline.observation_space(Box(low=-np.inf, high=np.inf, shape=(2,)))
+        assert space == Box(low=-5.0, high=5.0, shape=(2,), dtype=np.float32)
+
+        samples = np.random.default_rng(0).normal(loc=[10.0, -3.0], scale=[2.0, 0.5], size=(500, 2))
+        for sample in samples:
+            processed = pipeline.process_obs(sample)
+        assert processed.dtype == np.float32
+        stats = pipeline.stats()
+        assert stats["count"] == 500
+        np.testing.assert_allclose(pipeline._stats.mean, samples.mean(axis=0))
+        np.testing.assert_allclose(pipeline._stats.std, samples.std(axis=0))
+        np.testing.assert_allclose(processed, (samples[-1] - samples.mean(axis=0)) / samples.std(axis=0),
+                                   rtol=1e-5)
+        assert np.abs(pipeline.process_obs(np.array([1e6, 0.0]))).max() == 5.0
+
+        pipeline.update_stats = False
+        pipeline.process_obs(samples[0])
+        assert pipeline.stats()["count"] == 501
+
+    def test_clip_reward(self):
+        pipeline = PreprocessingPipeline(clip_reward=1.0)
+        assert not pipeline.is_identity
+        assert [pipeline.process_reward(reward) for reward in [-3.0, 0.5, 2.0]] == [-1.0, 0.5, 1.0]
+
+    def test_config_round_trip(self):
+        config = {"grayscale": True, "resize": [84, 84], "normalize": True, "clip_obs": 5.0,
+                  "clip_reward": 1.0, "update_stats": False}
+        assert PreprocessingPipeline.from_config(config).to_config() == config
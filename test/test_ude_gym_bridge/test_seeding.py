@@ -0,0 +1,74 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import numpy as np
+import gym
+
+from ude_gym_bridge.seeding import SeedSchedule, reset_env
+
+
+class SeedScheduleTest(TestCase):
+    def test_episode_seeds_are_reproducible(self):
+        schedule = SeedSchedule(seed=42, num_envs=2)
+        seeds = [schedule.next_seed(0), schedule.next_seed(1), schedule.next_seed(0)]
+        # The seeds depend only on the copy and episode indices, not on the order of resets.
+        replay = SeedSchedule(seed=42, num_envs=2)
+        assert [replay.next_seed(1), replay.next_seed(0), replay.next_seed(0)] == [seeds[1], seeds[0], seeds[2]]
+        assert len(set(seeds)) == 3
+        assert schedule.episodes == [2, 1]
+        assert schedule.to_dict() == {"seed": 42, "episodes": [2, 1]}
+        assert SeedSchedule(seed=43).episode_seed(0, 0) != seeds[0]
+
+    def test_episode_seed_matches_spawned_streams(self):
+        schedule = SeedSchedule(seed=7, num_envs=3)
+        spawned = np.random.SeedSequence(7).spawn(3)[2].spawn(5)[4]
+        assert schedule.episode_seed(2, 4) == int(spawned.generate_state(1, dtype=np.uint32)[0])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            SeedSchedule(seed=-1)
+        with self.assertRaises(ValueError):
+            SeedSchedule(seed=0, num_envs=0)
+
+
+class ResetEnvTest(TestCase):
+    def test_reset_without_seed(self):
+        env = MagicMock()
+        assert reset_env(env) == env.reset.return_value
+        env.reset.assert_called_once_with()
+        env.action_space.seed.assert_not_called()
+
+    def test_reset_with_seed_is_reproducible(self):
+        env = gym.make("CartPole-v1")
+        obs = reset_env(env, seed=3)
+        action = env.action_space.sample()
+        assert np.array_equal(reset_env(env, seed=3), obs)
+        assert env.action_space.sample() == action
+        env.close()
+
+    def test_reset_with_seed_on_legacy_api(self):
+        def legacy_reset(**kwargs):
+            if kwargs:
+                raise TypeError("reset() got an unexpected keyword argument 'seed'")
+            return "obs"
+
+        env = MagicMock()
+        env.reset.side_effect = legacy_reset
+        assert reset_env(env, seed=5) == "obs"
+        env.seed.assert_called_once_with(5)
+        env.action_space.seed.assert_called_once_with(5)
@@ -0,0 +1,147 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+import json
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+from unittest import mock, TestCase
+from unittest.mock import MagicMock
+
+from ude_gym_bridge.soak import _resource_report, main, read_process_stats, run_soak
+
+
+class _ThreadContext(object):
+    """
+    Multiprocessing context running the client processes as threads.
+    """
+    Event = threading.Event
+    Queue = queue.Queue
+    Value = staticmethod(multiprocessing.Value)
+
+    @staticmethod
+    def Process(target, args, daemon):
+        return threading.Thread(target=target, args=args, daemon=daemon)
+
+
+def _sample(rss_kb, num_threads=10.0, num_fds=20.0, time=0.0, cpu_sec=0.0):
+    return {"rss_kb": rss_kb, "num_threads": num_threads, "num_fds": num_fds, "time": time, "cpu_sec": cpu_sec}
+
+
+@mock.patch("ude_gym_bridge.soak.multiprocessing.get_context", return_value=_ThreadContext())
+@mock.patch("ude_gym_bridge.soak.GymEnvRemoteRunner")
+@mock.patch("ude_gym_bridge.soak.RemoteEnvironmentAdapter")
+@mock.patch("ude_gym_bridge.soak.UDEEnvironment")
+class SoakTest(TestCase):
+    def _set_up_ude_env(self, ude_env_mock):
+        ude_env_obj = ude_env_mock.return_value
+        action_space = MagicMock()
+        action_space.sample.return_value = 1
+        ude_env_obj.action_space = {"agent0": action_space, "agent1": action_space}
+        ude_env_obj.step.return_value = ({}, {}, {}, {}, {})
+        return ude_env_obj
+
+    def test_run_soak(self, ude_env_mock, remote_adapter_mock, runner_mock, get_context_mock):
+        ude_env_obj = self._set_up_ude_env(ude_env_mock)
+        runner_obj = runner_mock.return_value
+        runner_obj.adapter.profiler.stats.return_value = {"phases": {"lock_wait": {"count": 3}}}
+
+        result = run_soak(env_name="env_a", num_clients=3, num_envs=2, duration=0.3, port=4000,
+                          switch_env_names=["env_b"], switch_interval=0.1, sample_interval=0.05)
+
+        assert runner_mock.call_args[1]["port"] == 4000
+        assert runner_mock.call_args[1]["profile"] is True
+        assert runner_mock.call_args[1]["auto_reset"] is True
+        runner_obj.start.assert_called_once()
+        runner_obj.stop.assert_called_once()
+        acted = {call[0][0].keys().__iter__().__next__() for call in ude_env_obj.step.call_args_list}
+        assert acted == {"agent0", "agent1"}
+        assert ude_env_obj.close.call_count == 3
+
+        switched = [call[0][2] for call in runner_obj.adapter.on_received.call_args_list]
+        assert switched[:2] == ["env_b", "env_a"]
+        # Each client resets at start, and again after the switches to swap the environment in.
+        assert ude_env_obj.reset.call_count > 3
+        assert result["num_resets"] == ude_env_obj.reset.call_count
+        assert result["num_clients"] == 3
+        assert result["completed_clients"] == 3
+        assert result["hung_clients"] == 0
+        assert result["num_steps"] > 0
+        assert result["steps_per_sec"] > 0
+        assert result["errors"] == {}
+        assert result["lock_wait"] == {"count": 3}
+        assert "step_latency_p99_ms" in result
+        assert result["env_switch"]["num_switches"] == len(switched)
+
+    def test_client_errors(self, ude_env_mock, remote_adapter_mock, runner_mock, get_context_mock):
+        ude_env_obj = self._set_up_ude_env(ude_env_mock)
+        ude_env_obj.step.side_effect = TimeoutError()
+        remote_adapter_mock.side_effect = [MagicMock(), ConnectionError()]
+
+        result = run_soak(num_clients=2, duration=0.05)
+        assert result["num_steps"] == 0
+        assert result["errors"]["ConnectionError"] == 1
+        assert result["errors"]["TimeoutError"] > 0
+
+    def test_invalid_num_clients(self, ude_env_mock, remote_adapter_mock, runner_mock, get_context_mock):
+        with self.assertRaises(ValueError):
+            run_soak(num_clients=0)
+
+    def test_main(self, ude_env_mock, remote_adapter_mock, runner_mock, get_context_mock):
+        self._set_up_ude_env(ude_env_mock)
+        runner_mock.return_value.adapter.profiler.stats.return_value = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "report.json")
+            results = main(["--clients", "1", "--clients", "2", "--duration", "0.05", "--output", output])
+            with open(output) as f:
+                report = json.load(f)
+        assert [result["num_clients"] for result in results] == [1, 2]
+        assert len(report["results"]) == 2
+
+
+class ResourceReportTest(TestCase):
+    def test_read_process_stats(self):
+        stats = read_process_stats()
+        if not os.path.exists("/proc/self/status"):
+            assert stats == {}
+            return
+        assert stats["rss_kb"] > 0
+        assert stats["num_threads"] >= 1
+        assert stats["num_fds"] >= 1
+        assert stats["cpu_sec"] >= 0
+        assert read_process_stats(pid=2 ** 30) == {}
+
+    def test_resource_report(self):
+        samples = [_sample(1000.0, time=0.0, cpu_sec=0.0), _sample(1600.0, time=60.0, cpu_sec=30.0)]
+        switch_samples = [_sample(rss_kb) for rss_kb in [500.0, 900.0, 1000.0, 1000.0, 1010.0]]
+        report = _resource_report(samples, switch_samples, warmup_switches=2, leak_threshold_kb=256.0)
+        assert report["rss_max_kb"] == 1600.0
+        assert report["rss_growth_kb_per_min"] == 600.0
+        assert report["cpu_percent"] == 50.0
+        leak = report["env_switch"]
+        assert leak["num_switches"] == 5
+        assert leak["checked_switches"] == 3
+        assert not leak["leak_suspected"]
+
+    def test_leak_suspected(self):
+        rss_leak = [_sample(1000.0 + 1000.0 * idx) for idx in range(4)]
+        assert _resource_report([], rss_leak, 0, 256.0)["env_switch"]["leak_suspected"]
+        thread_leak = [_sample(1000.0, num_threads=10.0 + idx) for idx in range(4)]
+        leak = _resource_report([], thread_leak, 0, 256.0)["env_switch"]
+        assert leak["leak_suspected"]
+        assert leak["thread_growth"] == 3.0
+        assert "leak_suspected" not in _resource_report([], thread_leak[:1], 0, 256.0)["env_switch"]
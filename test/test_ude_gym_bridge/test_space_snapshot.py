@@ -0,0 +1,72 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import TestCase
+import json
+
+import numpy as np
+from gym.spaces import Box, Dict, Discrete, MultiBinary, MultiDiscrete, Tuple
+
+from ude_gym_bridge.space_snapshot import SpaceSnapshot, describe_space
+
+
+class DescribeSpaceTest(TestCase):
+    def test_box(self):
+        descriptor = describe_space(Box(low=0, high=255, shape=(2, 3), dtype=np.uint8))
+        assert descriptor == {"type": "Box", "shape": [2, 3], "dtype": "|u1", "low": 0, "high": 255}
+
+    def test_box_with_non_uniform_bounds(self):
+        descriptor = describe_space(Box(low=np.array([0.0, -1.0], dtype=np.float32),
+                                        high=np.array([1.0, 1.0], dtype=np.float32), dtype=np.float32))
+        assert descriptor["low"] == [0.0, -1.0]
+        assert descriptor["high"] == 1.0
+
+    def test_discrete_and_multi_spaces(self):
+        assert describe_space(Discrete(3)) == {"type": "Discrete", "n": 3, "start": 0}
+        assert describe_space(MultiDiscrete([2, 3])) == {"type": "MultiDiscrete", "nvec": [2, 3]}
+        assert describe_space(MultiBinary(4)) == {"type": "MultiBinary", "n": 4}
+
+    def test_composite_spaces(self):
+        descriptor = describe_space(Dict({"a": Discrete(2), "b": Tuple((Discrete(3), MultiBinary(2)))}))
+        assert descriptor["type"] == "Dict"
+        assert descriptor["spaces"]["a"] == {"type": "Discrete", "n": 2, "start": 0}
+        assert descriptor["spaces"]["b"]["type"] == "Tuple"
+        json.dumps(descriptor)
+
+
+class SpaceSnapshotTest(TestCase):
+    def test_version_is_stable(self):
+        snapshot = SpaceSnapshot({"agent0": Box(low=-1.0, high=1.0, shape=(4,))}, {"agent0": Discrete(2)})
+        same_snapshot = SpaceSnapshot({"agent0": Box(low=-1.0, high=1.0, shape=(4,))}, {"agent0": Discrete(2)})
+        other_snapshot = SpaceSnapshot({"agent0": Box(low=-1.0, high=1.0, shape=(4,))}, {"agent0": Discrete(3)})
+
+        assert snapshot.version == same_snapshot.version
+        assert snapshot.version != other_snapshot.version
+
+    def test_accessors_return_copies(self):
+        action_space = Discrete(2)
+        snapshot = SpaceSnapshot({}, {"agent0": action_space})
+        snapshot.action_spaces["agent1"] = action_space
+        snapshot.descriptors["action_space"]["agent1"] = {}
+
+        assert snapshot.action_spaces == {"agent0": action_space}
+        assert list(snapshot.descriptors["action_space"]) == ["agent0"]
+
+    def test_to_json(self):
+        snapshot = SpaceSnapshot({"agent0": Discrete(5)}, {"agent0": Discrete(2)})
+        value = json.loads(snapshot.to_json())
+        assert value["version"] == snapshot.version
+        assert value["observation_space"]["agent0"]["n"] == 5
+        assert value["action_space"]["agent0"]["n"] == 2
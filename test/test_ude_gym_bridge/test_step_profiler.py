@@ -0,0 +1,65 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+import json
+import threading
+from unittest import TestCase
+
+from ude_gym_bridge.step_profiler import StepProfiler
+
+
+class StepProfilerTest(TestCase):
+    def test_record(self):
+        profiler = StepProfiler()
+        for _ in range(99):
+            profiler.record("simulate", 0.001)
+        profiler.record("simulate", 0.1)
+
+        stats = profiler.stats()["phases"]["simulate"]
+        assert stats["count"] == 100
+        assert abs(stats["max_ms"] - 100.0) < 1e-6
+        assert abs(stats["min_ms"] - 1.0) < 1e-6
+        # p50 is reported as the upper bound of the log2 bucket holding it.
+        assert 1.0 <= stats["p50_ms"] < 2.1
+        assert stats["p99_ms"] <= stats["max_ms"]
+
+    def test_lap(self):
+        profiler = StepProfiler()
+        lap_time = profiler.lap("render", 0.0)
+        assert lap_time > 0.0
+        assert profiler.stats()["phases"]["render"]["count"] == 1
+
+    def test_record_episode(self):
+        profiler = StepProfiler()
+        profiler.record_episode(10, 5.0)
+        profiler.record_episode(20, 15.0)
+
+        episodes = profiler.stats()["episodes"]
+        assert episodes == {"count": 2, "mean_length": 15.0, "max_length": 20, "mean_reward": 10.0}
+
+    def test_to_json_and_clear(self):
+        profiler = StepProfiler()
+        profiler.record("simulate", 0.001)
+        assert "simulate" in json.loads(profiler.to_json())["phases"]
+        profiler.clear()
+        assert profiler.stats()["phases"] == {}
+        assert profiler.stats()["episodes"] == {"count": 0}
+
+    def test_periodic_dump(self):
+        profiler = StepProfiler()
+        dumped = threading.Event()
+        profiler.start_periodic_dump(0.01, callback=lambda stats: dumped.set())
+        assert dumped.wait(timeout=5.0)
+        profiler.stop_periodic_dump()
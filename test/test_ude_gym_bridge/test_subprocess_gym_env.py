@@ -0,0 +1,168 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+import multiprocessing
+import threading
+from unittest import mock, TestCase
+from unittest.mock import patch
+
+import numpy as np
+from gym.spaces import Box, Discrete
+
+from ude_gym_bridge.gym_wrappers import make_env_wrapper
+from ude_gym_bridge.subprocess_gym_env import SubprocessGymEnv
+
+
+class ThreadConnection(object):
+    """Worker connection shared with the parent thread, closed only by the worker."""
+    def __init__(self, conn):
+        self._conn = conn
+        self._close_count = 0
+
+    def send(self, obj):
+        self._conn.send(obj)
+
+    def recv(self):
+        return self._conn.recv()
+
+    def close(self):
+        # The first close comes from the parent after starting the worker.
+        self._close_count += 1
+        if self._close_count > 1:
+            self._conn.close()
+
+
+class ThreadContext(object):
+    """multiprocessing context running the worker in a thread, so gym.make mock applies."""
+    @staticmethod
+    def Pipe():
+        parent_conn, worker_conn = multiprocessing.Pipe()
+        return parent_conn, ThreadConnection(worker_conn)
+
+    @staticmethod
+    def Process(target, args, daemon):
+        return threading.Thread(target=target, args=args, daemon=daemon)
+
+
+@mock.patch("gym.make")
+class SubprocessGymEnvTest(TestCase):
+    def setUp(self) -> None:
+        self.context_patcher = patch("ude_gym_bridge.subprocess_gym_env.multiprocessing.get_context",
+                                     return_value=ThreadContext)
+        self.context_patcher.start()
+
+    def tearDown(self) -> None:
+        self.context_patcher.stop()
+
+    def test_spaces(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=0, high=255, shape=(2, 2), dtype=np.uint8)
+        gym_env_mock_obj.action_space = Discrete(3)
+        env = SubprocessGymEnv("test_env")
+
+        gym_make_mock.assert_called_once_with("test_env")
+        assert env.env_name == "test_env"
+        assert env.observation_space == gym_env_mock_obj.observation_space
+        assert env.action_space == gym_env_mock_obj.action_space
+        env.close()
+        gym_env_mock_obj.close.assert_called_once()
+
+    def test_step_and_reset_through_shared_memory(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=0, high=255, shape=(2, 2), dtype=np.uint8)
+        gym_env_mock_obj.action_space = Discrete(3)
+        reset_obs = np.zeros((2, 2), dtype=np.uint8)
+        step_obs = np.arange(4, dtype=np.uint8).reshape(2, 2)
+        gym_env_mock_obj.reset.return_value = reset_obs
+        gym_env_mock_obj.step.return_value = (step_obs, 1.0, False, {"key": "value"})
+        env = SubprocessGymEnv("test_env")
+
+        assert np.array_equal(env.reset(), reset_obs)
+        obs, reward, done, info = env.step(2)
+        assert np.array_equal(obs, step_obs)
+        assert reward == 1.0
+        assert not done
+        assert info == {"key": "value"}
+        gym_env_mock_obj.step.assert_called_once_with(2)
+
+        # Returned observation must not alias the shared-memory buffer.
+        gym_env_mock_obj.step.return_value = (reset_obs, 0.0, True, {})
+        env.step(0)
+        assert np.array_equal(obs, step_obs)
+        env.close()
+
+    def test_step_through_pipe(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Discrete(5)
+        gym_env_mock_obj.action_space = Discrete(3)
+        gym_env_mock_obj.step.return_value = (4, 1.0, True, {})
+        env = SubprocessGymEnv("test_env")
+
+        env.step_async(1)
+        assert env.step_wait() == (4, 1.0, True, {})
+        env.close()
+
+    def test_worker_error(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Discrete(5)
+        gym_env_mock_obj.action_space = Discrete(3)
+        gym_env_mock_obj.step.side_effect = RuntimeError("step failed")
+        env = SubprocessGymEnv("test_env")
+
+        with self.assertRaises(RuntimeError):
+            env.step(1)
+        env.close()
+
+    def test_env_wrapper_applied_in_worker(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Box(low=0, high=255, shape=(2,), dtype=np.uint8)
+        gym_env_mock_obj.action_space = Discrete(3)
+        gym_env_mock_obj.reset.return_value = np.ones(2, dtype=np.uint8)
+        env = SubprocessGymEnv("test_env", env_wrapper=make_env_wrapper(frame_stack=4))
+
+        assert env.observation_space.shape == (4, 2)
+        assert env.base_observation_space.shape == (2,)
+        assert env.reset().shape == (4, 2)
+        env.close()
+
+    def test_get_and_set_state(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Discrete(5)
+        gym_env_mock_obj.action_space = Discrete(3)
+        env = SubprocessGymEnv("test_env")
+
+        with patch("ude_gym_bridge.subprocess_gym_env.get_env_state", return_value={"state": 1}) as get_mock, \
+                patch("ude_gym_bridge.subprocess_gym_env.set_env_state", return_value=None) as set_mock:
+            assert env.get_state() == {"state": 1}
+            get_mock.assert_called_once_with(gym_env_mock_obj)
+            env.set_state({"state": 2})
+            set_mock.assert_called_once_with(gym_env_mock_obj, {"state": 2})
+        env.close()
+
+    def test_reset_with_seed(self, gym_make_mock):
+        gym_env_mock_obj = gym_make_mock.return_value
+        gym_env_mock_obj.observation_space = Discrete(5)
+        gym_env_mock_obj.action_space = Discrete(3)
+        gym_env_mock_obj.reset.return_value = 1
+        env = SubprocessGymEnv("test_env")
+
+        assert env.reset(seed=11) == 1
+        gym_env_mock_obj.reset.assert_called_once_with(seed=11)
+        # The action space of the parent process is seeded along with the worker.
+        action = env.action_space.sample()
+        env.reset_async(11)
+        env.reset_wait()
+        assert env.action_space.sample() == action
+        env.close()
@@ -0,0 +1,80 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+from unittest import TestCase
+
+import numpy as np
+from gym.spaces import Discrete
+
+from ude_gym_bridge.trajectory_buffer import TrajectoryBuffer, make_action_source
+
+
+class TrajectoryBufferTest(TestCase):
+    def test_initialization_with_invalid_horizon(self):
+        with self.assertRaises(ValueError):
+            TrajectoryBuffer(horizon=0)
+
+    def test_append_and_arrays(self):
+        buffer = TrajectoryBuffer(horizon=4)
+        buffer.append(np.array([1.0, 2.0]), 1, 0.5, False, {"step": 0})
+        buffer.append(np.array([3.0, 4.0]), 0, 1.5, True, {"step": 1})
+
+        assert len(buffer) == 2
+        obs, rewards, dones, actions, infos = buffer.arrays()
+        np.testing.assert_array_equal(obs, [[1.0, 2.0], [3.0, 4.0]])
+        np.testing.assert_array_equal(rewards, [0.5, 1.5])
+        np.testing.assert_array_equal(dones, [False, True])
+        np.testing.assert_array_equal(actions, [1, 0])
+        assert infos == [{"step": 0}, {"step": 1}]
+        assert obs.flags["C_CONTIGUOUS"]
+
+    def test_append_beyond_horizon(self):
+        buffer = TrajectoryBuffer(horizon=1)
+        buffer.append(0, 0, 0.0, False, {})
+        with self.assertRaises(IndexError):
+            buffer.append(0, 0, 0.0, False, {})
+
+    def test_arrays_when_empty(self):
+        obs, rewards, dones, actions, infos = TrajectoryBuffer(horizon=2).arrays()
+        assert len(obs) == len(rewards) == len(dones) == len(actions) == 0
+        assert infos == []
+
+
+class MakeActionSourceTest(TestCase):
+    def test_action_sequence(self):
+        source = make_action_source([2, 1, 0], Discrete(3), horizon=2)
+        assert [source(idx) for idx in range(3)] == [2, 1, None]
+
+    def test_scalar_action(self):
+        source = make_action_source(1, Discrete(3), horizon=2)
+        assert [source(idx) for idx in range(3)] == [1, 1, None]
+        source = make_action_source(np.array(2), Discrete(3), horizon=1)
+        assert [source(idx) for idx in range(2)] == [2, None]
+
+    def test_random_policy(self):
+        source = make_action_source({"policy": "random", "steps": 2}, Discrete(3), horizon=5)
+        assert source(0) in range(3)
+        assert source(1) in range(3)
+        assert source(2) is None
+
+    def test_constant_policy(self):
+        source = make_action_source({"policy": "constant", "action": 1}, Discrete(3), horizon=2)
+        assert [source(idx) for idx in range(3)] == [1, 1, None]
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            make_action_source({"policy": "unknown"}, Discrete(3), horizon=2)
+        with self.assertRaises(ValueError):
+            make_action_source({"policy": "constant"}, Discrete(3), horizon=2)
@@ -17,3 +17,18 @@
 
 def test_ude_gym_bridge_importable():
     import ude_gym_bridge
+
+
+def test_ude_gym_bridge_lazy_import():
+    import sys
+    import ude_gym_bridge
+    assert ude_gym_bridge.GymEnvironmentAdapter.__name__ == "GymEnvironmentAdapter"
+    assert "ude_gym_bridge.gym_environment_adapter" in sys.modules
+    assert "GymEnvironmentAdapter" in dir(ude_gym_bridge)
+
+
+def test_ude_gym_bridge_unknown_attribute():
+    import pytest
+    import ude_gym_bridge
+    with pytest.raises(AttributeError):
+        ude_gym_bridge.UnknownClass
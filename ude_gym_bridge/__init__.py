@@ -13,5 +13,56 @@
 #   See the License for the specific language governing permissions and         #
 #   limitations under the License.                                              #
 #################################################################################
-from ude_gym_bridge.gym_env_remote_runner import GymEnvRemoteRunner
-from ude_gym_bridge.gym_environment_adapter import GymEnvironmentAdapter
+"""UDE Gym Bridge package.
+
+Public classes are imported lazily on first access (Python 3.7+),
+so importing the package does not import OpenAI Gym and UDE upfront.
+"""
+import importlib
+import sys
+
+_LAZY_IMPORTS = {
+    "GymEnvRemoteRunner": "ude_gym_bridge.gym_env_remote_runner",
+    "GymEnvironmentAdapter": "ude_gym_bridge.gym_environment_adapter",
+    "MultiGymEnvRemoteRunner": "ude_gym_bridge.multi_gym_env_remote_runner",
+    "MultiGymEnvironmentAdapter": "ude_gym_bridge.multi_gym_environment_adapter",
+    "SubprocessGymEnv": "ude_gym_bridge.subprocess_gym_env",
+    "GymEnvPool": "ude_gym_bridge.gym_env_pool",
+    "GymRegistryIndex": "ude_gym_bridge.gym_registry_index",
+    "StepProfiler": "ude_gym_bridge.step_profiler",
+    "ObservationEncoder": "ude_gym_bridge.observation_encoding",
+    "RawBufferObservationEncoder": "ude_gym_bridge.observation_encoding",
+    "SharedMemoryObservationEncoder": "ude_gym_bridge.observation_encoding",
+    "DeltaObservationEncoder": "ude_gym_bridge.observation_encoding",
+    "ObservationDecoder": "ude_gym_bridge.observation_encoding",
+    "ActionRepeatWrapper": "ude_gym_bridge.gym_wrappers",
+    "FrameStackWrapper": "ude_gym_bridge.gym_wrappers",
+    "PreprocessingWrapper": "ude_gym_bridge.gym_wrappers",
+    "TrajectoryBuffer": "ude_gym_bridge.trajectory_buffer",
+    "SpaceSnapshot": "ude_gym_bridge.space_snapshot",
+    "EpisodeRecorder": "ude_gym_bridge.episode_recorder",
+    "EpisodeReader": "ude_gym_bridge.episode_recorder",
+    "FrameCapture": "ude_gym_bridge.frame_capture",
+    "AdaptiveStepScheduler": "ude_gym_bridge.adaptive_step_scheduler",
+    "ActionBatchDecoder": "ude_gym_bridge.action_batch",
+    "PreprocessingPipeline": "ude_gym_bridge.preprocessing",
+    "SeedSchedule": "ude_gym_bridge.seeding",
+    "RunnerLauncher": "ude_gym_bridge.launcher",
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        module_name = _LAZY_IMPORTS.get(name)
+        if module_name is None:
+            raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+        value = getattr(importlib.import_module(module_name), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(list(globals()) + __all__)
+else:  # pragma: no cover - module __getattr__ is not supported before Python 3.7
+    for _name, _module_name in _LAZY_IMPORTS.items():
+        globals()[_name] = getattr(importlib.import_module(_module_name), _name)
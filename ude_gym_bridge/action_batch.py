@@ -0,0 +1,100 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class for decoding stacked action batches of all agents in one step request."""
+from typing import Any, Sequence
+
+import numpy as np
+from gym.spaces import Box, Discrete, MultiBinary, MultiDiscrete
+from gym.spaces.space import Space
+
+from ude import AgentID, MultiAgentDict
+
+# The key of the stacked actions of all agents in the action dict of step request.
+BATCH_ACTION_KEY = "*"
+
+
+class ActionBatchDecoder(object):
+    """
+    ActionBatchDecoder class to split the stacked actions of all agents into per-agent
+    actions. The batch is validated against the action space with one check for the whole
+    batch instead of per-agent space.contains. Discrete actions are returned as Python ints,
+    and the others as views into the batch.
+    """
+    def __init__(self, agent_names: Sequence[AgentID], action_space: Space):
+        """
+        Initialize ActionBatchDecoder
+
+        Args:
+            agent_names (Sequence[AgentID]): the agent names in the order of the batch rows.
+            action_space (Space): the action space shared by the agents.
+        """
+        if not isinstance(action_space, (Box, Discrete, MultiBinary, MultiDiscrete)):
+            raise ValueError("Batched actions are not supported for {}.".format(type(action_space).__name__))
+        self._agent_names = list(agent_names)
+        self._action_space = action_space
+        self._batch_shape = (len(self._agent_names),) + tuple(action_space.shape or ())
+        self._is_discrete = isinstance(action_space, Discrete)
+
+    def validate(self, batch: np.ndarray) -> None:
+        """
+        Validate the batch against the number of agents and the action space.
+
+        Args:
+            batch (np.ndarray): the stacked actions.
+
+        Raises:
+            ValueError: if the batch does not match the agents or the action space.
+        """
+        if batch.shape != self._batch_shape:
+            raise ValueError("Action batch shape {} does not match {}.".format(batch.shape, self._batch_shape))
+        space = self._action_space
+        if isinstance(space, Box):
+            valid = np.all(batch >= space.low) and np.all(batch <= space.high)
+        elif not np.issubdtype(batch.dtype, np.integer):
+            valid = False
+        elif isinstance(space, Discrete):
+            start = getattr(space, "start", 0)
+            valid = start <= batch.min() and batch.max() < start + space.n
+        elif isinstance(space, MultiDiscrete):
+            valid = np.all(batch >= 0) and np.all(batch < space.nvec)
+        else:
+            valid = np.all((batch == 0) | (batch == 1))
+        if not valid:
+            raise ValueError("Action batch is out of the action space {}.".format(space))
+
+    def decode(self, batch: Any) -> MultiAgentDict:
+        """
+        Split the batch into the actions of agents.
+
+        Args:
+            batch (Any): the stacked actions (array-like) with the agents as the first dimension.
+
+        Returns:
+            MultiAgentDict: the action for each agent with agent name as key.
+        """
+        batch = np.asarray(batch)
+        if self._is_discrete:
+            if batch.shape != self._batch_shape or not np.issubdtype(batch.dtype, np.integer):
+                self.validate(batch)
+            # Checking the bounds on Python ints is cheaper than numpy reductions for small batches,
+            # and environments take Python ints faster than numpy scalars.
+            values = batch.tolist()
+            start = int(getattr(self._action_space, "start", 0))
+            if min(values) < start or max(values) >= start + self._action_space.n:
+                raise ValueError("Action batch is out of the action space {}.".format(self._action_space))
+            return dict(zip(self._agent_names, values))
+        self.validate(batch)
+        return {agent_name: batch[idx] for idx, agent_name in enumerate(self._agent_names)}
@@ -0,0 +1,221 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class for tuning UDE Server step invoke period and timeout online."""
+from typing import Any, Callable, Dict, Optional
+from threading import Lock
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveStepScheduler(object):
+    """
+    AdaptiveStepScheduler class to tune step_invoke_period and timeout_wait of UDE Server
+    in PERIODIC step invoke mode within configured bounds.
+
+    Each step reports how many agents' actions arrived within the period, and how long the
+    environment step took. The period grows multiplicatively when steps missed the period
+    (slow clients), and shrinks slowly toward the smoothed step cost when every agent made
+    it (fast clients waiting on the period). A step missed the period when actions of some
+    agents did not arrive, or when it came more than late_factor times the period plus the
+    step cost after the previous step, which is the only signal with a single agent.
+    The timeout follows the period plus the step cost with a margin, so clients are not
+    timed out by the tuning.
+    """
+    def __init__(self,
+                 min_period: float = 0.001,
+                 max_period: float = 1.0,
+                 min_timeout: float = 1.0,
+                 max_timeout: float = 60.0,
+                 initial_period: Optional[float] = None,
+                 increase_factor: float = 1.5,
+                 decrease_factor: float = 0.95,
+                 cost_margin: float = 1.2,
+                 timeout_margin: float = 4.0,
+                 smoothing: float = 0.1,
+                 late_factor: float = 2.0,
+                 update_interval: int = 10,
+                 on_update: Optional[Callable[[float, float], None]] = None):
+        """
+        Initialize AdaptiveStepScheduler
+
+        Args:
+            min_period (float): the minimum step invoke period in seconds.
+            max_period (float): the maximum step invoke period in seconds.
+            min_timeout (float): the minimum timeout in seconds to respond step request.
+            max_timeout (float): the maximum timeout in seconds to respond step request.
+            initial_period (Optional[float]): the step invoke period to start from (default: max_period).
+                A period out of the bounds is clamped to them with a warning.
+            increase_factor (float): the factor to grow the period by when actions missed the period.
+            decrease_factor (float): the factor to shrink the period by when every action arrived.
+            cost_margin (float): the margin over the smoothed step cost the period never shrinks below.
+            timeout_margin (float): the margin over the period plus the step cost to set the timeout to.
+            smoothing (float): the weight of the latest sample in the moving averages.
+            late_factor (float): the factor of the period plus the step cost, beyond which the
+                interval between steps counts as missing the period.
+            update_interval (int): the number of steps between updates of the period and timeout.
+            on_update (Optional[Callable[[float, float], None]]): the callback called with the new
+                period and timeout when they change.
+        """
+        if not 0 < min_period <= max_period:
+            raise ValueError("Invalid period bounds: [{}, {}]".format(min_period, max_period))
+        if not 0 < min_timeout <= max_timeout:
+            raise ValueError("Invalid timeout bounds: [{}, {}]".format(min_timeout, max_timeout))
+        if increase_factor <= 1.0 or not 0.0 < decrease_factor < 1.0:
+            raise ValueError("increase_factor must be above 1 and decrease_factor must be in (0, 1).")
+        if late_factor <= 1.0:
+            raise ValueError("late_factor must be above 1: {}".format(late_factor))
+        if update_interval < 1:
+            raise ValueError("update_interval must be at least 1: {}".format(update_interval))
+        self._min_period = min_period
+        self._max_period = max_period
+        self._min_timeout = min_timeout
+        self._max_timeout = max_timeout
+        self._increase_factor = increase_factor
+        self._decrease_factor = decrease_factor
+        self._cost_margin = cost_margin
+        self._timeout_margin = timeout_margin
+        self._smoothing = smoothing
+        self._late_factor = late_factor
+        self._update_interval = update_interval
+        self._on_update = on_update
+
+        self._lock = Lock()
+        if initial_period is not None and not min_period <= initial_period <= max_period:
+            logger.warning("Initial step invoke period %s s is out of the bounds [%s, %s], and is clamped.",
+                           initial_period, min_period, max_period)
+        self._period = self._clamp_period(initial_period if initial_period is not None else max_period)
+        self._timeout = self._clamp_timeout(self._timeout_margin * self._period)
+        self._step_cost = 0.0
+        self._step_interval = 0.0
+        self._arrival_rate = 1.0
+        self._last_step_time = None  # type: Optional[float]
+        self._pending_steps = 0
+        self._pending_missed = 0
+        self._num_steps = 0
+        self._num_updates = 0
+
+    def _clamp_period(self, period: float) -> float:
+        return min(max(period, self._min_period), self._max_period)
+
+    def _clamp_timeout(self, timeout: float) -> float:
+        return min(max(timeout, self._min_timeout), self._max_timeout)
+
+    @property
+    def step_invoke_period(self) -> float:
+        """
+        Returns the step invoke period chosen.
+
+        Returns:
+            float: the step invoke period in seconds.
+        """
+        return self._period
+
+    @property
+    def timeout_wait(self) -> float:
+        """
+        Returns the timeout chosen to respond step request.
+
+        Returns:
+            float: the timeout in seconds.
+        """
+        return self._timeout
+
+    def record_step(self, num_actions: int, num_agents: int, step_cost: float) -> None:
+        """
+        Record the step invoked by UDE Server.
+
+        Args:
+            num_actions (int): the number of agents whose action arrived within the period.
+            num_agents (int): the number of agents expected to act.
+            step_cost (float): the time taken in seconds to step the environment.
+        """
+        now = time.perf_counter()
+        update = None
+        with self._lock:
+            alpha = self._smoothing
+            late = False
+            if self._last_step_time is not None:
+                interval = now - self._last_step_time
+                self._step_interval += alpha * (interval - self._step_interval)
+                late = interval > self._late_factor * (self._period + step_cost)
+            self._last_step_time = now
+            if self._num_steps:
+                self._step_cost += alpha * (step_cost - self._step_cost)
+            else:
+                self._step_cost = step_cost
+            arrival = min(num_actions / num_agents, 1.0) if num_agents else 1.0
+            self._arrival_rate += alpha * (arrival - self._arrival_rate)
+            self._num_steps += 1
+            self._pending_steps += 1
+            if num_actions < num_agents or late:
+                self._pending_missed += 1
+            if self._pending_steps >= self._update_interval:
+                update = self._update()
+        if update and self._on_update:
+            self._on_update(*update)
+
+    def _update(self) -> Optional[tuple]:
+        """
+        Tune the period and timeout from the steps recorded since the last update.
+        Must be called with lock held.
+
+        Returns:
+            Optional[tuple]: the new (period, timeout) if either changed, None otherwise.
+        """
+        if self._pending_missed:
+            period = self._period * self._increase_factor
+        else:
+            period = max(self._period * self._decrease_factor, self._step_cost * self._cost_margin)
+        self._pending_steps = 0
+        self._pending_missed = 0
+        period = self._clamp_period(period)
+        timeout = self._clamp_timeout(self._timeout_margin * (period + self._step_cost))
+        if period == self._period and timeout == self._timeout:
+            return None
+        self._period = period
+        self._timeout = timeout
+        self._num_updates += 1
+        logger.debug("Step invoke period: %.6f s, timeout: %.3f s", period, timeout)
+        return period, timeout
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the chosen values and the measurements they are based on.
+
+        Returns:
+            Dict[str, Any]: the stats of the scheduler.
+        """
+        with self._lock:
+            return {"step_invoke_period": self._period,
+                    "timeout_wait": self._timeout,
+                    "step_cost_ms": self._step_cost * 1000.0,
+                    "step_interval_ms": self._step_interval * 1000.0,
+                    "arrival_rate": self._arrival_rate,
+                    "steps_per_sec": 1.0 / self._step_interval if self._step_interval else 0.0,
+                    "num_steps": self._num_steps,
+                    "num_updates": self._num_updates}
+
+    def to_json(self) -> str:
+        """
+        Returns the stats of the scheduler in JSON.
+
+        Returns:
+            str: the stats in JSON.
+        """
+        return json.dumps(self.stats())
@@ -0,0 +1,330 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""Benchmark of UDE Gym Bridge throughput and latency over localhost.
+
+Usage:
+    python -m ude_gym_bridge.benchmark --env CartPole-v0 --env PongNoFrameskip-v4 \
+        --compression NoCompression --compression Gzip --output result.json
+
+    python -m ude_gym_bridge.benchmark --alloc-steps 10000 --alloc-num-envs 8
+"""
+from typing import Any, Dict, List, Optional, Sequence
+import argparse
+import json
+import pickle
+import platform
+import socket
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from ude import (
+    UDEEnvironment,
+    RemoteEnvironmentAdapter,
+    UDEStepInvokeType,
+    Compression
+)
+from ude_gym_bridge.gym_env_remote_runner import GymEnvRemoteRunner
+from ude_gym_bridge.gym_environment_adapter import GymEnvironmentAdapter
+from ude_gym_bridge.action_batch import BATCH_ACTION_KEY
+from ude_gym_bridge.observation_encoding import ObservationDecoder, create_observation_encoder
+
+
+def _find_free_port() -> int:
+    """
+    Returns a free TCP port on localhost.
+
+    Returns:
+        int: a free TCP port.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def _latency_stats(name: str, latencies: Sequence[float]) -> Dict[str, float]:
+    """
+    Returns p50, p99 and mean of given latencies in milliseconds.
+
+    Args:
+        name (str): the prefix of the stat names.
+        latencies (Sequence[float]): the latencies in seconds.
+
+    Returns:
+        Dict[str, float]: the latency stats with stat name as key.
+    """
+    if not latencies:
+        return {}
+    latencies_ms = np.asarray(latencies) * 1000.0
+    return {"{}_latency_p50_ms".format(name): float(np.percentile(latencies_ms, 50)),
+            "{}_latency_p99_ms".format(name): float(np.percentile(latencies_ms, 99)),
+            "{}_latency_mean_ms".format(name): float(np.mean(latencies_ms))}
+
+
+def run_benchmark(env_name: str = "CartPole-v0",
+                  num_steps: int = 1000,
+                  num_resets: int = 10,
+                  compression: Compression = Compression.NoCompression,
+                  step_invoke_type: UDEStepInvokeType = UDEStepInvokeType.WAIT_FOREVER,
+                  step_invoke_period: float = 120.0,
+                  port: Optional[int] = None,
+                  agent_name: str = "agent0",
+                  obs_encoding: Optional[str] = None,
+                  **runner_kwargs) -> Dict[str, Any]:
+    """
+    Start GymEnvRemoteRunner on localhost, drive it with UDE client, and measure
+    throughput and latency.
+
+    Steps per second is measured over the step calls only, so the episode resets
+    and the payload measurement are excluded. Bytes per step is measured outside the
+    timed window as the pickled size of the step result received by the client,
+    which approximates the payload carried per step.
+
+    Args:
+        env_name (str): OpenAI Gym environment name.
+        num_steps (int): the number of steps to measure.
+        num_resets (int): the number of resets to measure before stepping.
+        compression (Compression): channel compression type.
+        step_invoke_type (UDEStepInvokeType): step invoke type.
+        step_invoke_period (float): step invoke period (used only with PERIODIC step_invoke_type).
+        port (Optional[int]): port to use for UDE Server (default: a free port).
+        agent_name (str): Name of agent to use.
+        obs_encoding (Optional[str]): observation encoding ("raw", "shm" or "delta") to compare against
+            the default path. The client decodes observations within the measured step time.
+        runner_kwargs: Arbitrary keyword arguments for GymEnvRemoteRunner.
+
+    Returns:
+        Dict[str, Any]: the benchmark result.
+    """
+    port = port or _find_free_port()
+    decoder = ObservationDecoder()
+    runner = GymEnvRemoteRunner(env_name=env_name,
+                                agent_name=agent_name,
+                                render=False,
+                                step_invoke_type=step_invoke_type,
+                                step_invoke_period=step_invoke_period,
+                                port=port,
+                                compression=compression,
+                                observation_encoder=create_observation_encoder(obs_encoding),
+                                **runner_kwargs)
+    runner.start()
+    try:
+        ude_env = UDEEnvironment(RemoteEnvironmentAdapter("localhost",
+                                                          port=port,
+                                                          compression=compression))
+        try:
+            reset_latencies = []
+            for _ in range(max(num_resets, 1)):
+                start_time = time.perf_counter()
+                decoder.decode_dict(ude_env.reset()[0])
+                reset_latencies.append(time.perf_counter() - start_time)
+
+            action_space = ude_env.action_space[agent_name]
+            step_latencies = []
+            step_bytes = 0
+            for _ in range(num_steps):
+                action_dict = {agent_name: action_space.sample()}
+                start_time = time.perf_counter()
+                step_result = ude_env.step(action_dict)
+                decoder.decode_dict(step_result[0])
+                step_latencies.append(time.perf_counter() - start_time)
+                step_bytes += len(pickle.dumps(step_result, protocol=pickle.HIGHEST_PROTOCOL))
+                done_dict = step_result[2]
+                if done_dict.get(agent_name):
+                    start_time = time.perf_counter()
+                    decoder.decode_dict(ude_env.reset()[0])
+                    reset_latencies.append(time.perf_counter() - start_time)
+        finally:
+            ude_env.close()
+            decoder.close()
+    finally:
+        runner.stop()
+
+    total_time = sum(step_latencies)
+    result = {
+        "env_name": env_name,
+        "compression": compression.name,
+        "step_invoke_type": step_invoke_type.name,
+        "obs_encoding": obs_encoding or "none",
+        "num_steps": num_steps,
+        "num_resets": len(reset_latencies),
+        "steps_per_sec": num_steps / total_time if total_time > 0 else 0.0,
+        "bytes_per_step": step_bytes / num_steps if num_steps else 0.0,
+        "startup_times": runner.startup_times,
+    }
+    result.update(_latency_stats("step", step_latencies))
+    result.update(_latency_stats("reset", reset_latencies))
+    return result
+
+
+def run_benchmarks(env_names: Sequence[str],
+                   compressions: Sequence[Compression],
+                   step_invoke_types: Sequence[UDEStepInvokeType],
+                   obs_encodings: Sequence[Optional[str]] = (None,),
+                   **kwargs) -> List[Dict[str, Any]]:
+    """
+    Run benchmark for every combination of given environments, compressions,
+    step invoke types and observation encodings.
+
+    Args:
+        env_names (Sequence[str]): OpenAI Gym environment names.
+        compressions (Sequence[Compression]): channel compression types.
+        step_invoke_types (Sequence[UDEStepInvokeType]): step invoke types.
+        obs_encodings (Sequence[Optional[str]]): observation encodings.
+        kwargs: Arbitrary keyword arguments for run_benchmark.
+
+    Returns:
+        List[Dict[str, Any]]: the benchmark results.
+    """
+    results = []
+    for env_name in env_names:
+        for compression in compressions:
+            for step_invoke_type in step_invoke_types:
+                for obs_encoding in obs_encodings:
+                    results.append(run_benchmark(env_name=env_name,
+                                                 compression=compression,
+                                                 step_invoke_type=step_invoke_type,
+                                                 obs_encoding=obs_encoding,
+                                                 **kwargs))
+    return results
+
+
+def run_step_allocation_benchmark(env_name: str = "CartPole-v0",
+                                  num_envs: int = 8,
+                                  num_steps: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Measure the per-step allocation and time of GymEnvironmentAdapter.step in-process,
+    with per-agent action dict and with stacked action batch. The request of each step
+    is built inside the measured loop from the sampled actions, as a client builds it.
+
+    The allocation is measured with tracemalloc as the memory retained by keeping every
+    step result. The time is measured separately without tracemalloc.
+
+    Args:
+        env_name (str): OpenAI Gym environment name.
+        num_envs (int): the number of environment copies (agents) to host.
+        num_steps (int): the number of steps to measure.
+
+    Returns:
+        List[Dict[str, Any]]: the result of each mode.
+    """
+    results = []
+    for batched in [False, True]:
+        adapter = GymEnvironmentAdapter(env_name=env_name, num_envs=num_envs)
+        try:
+            adapter.reset()
+            action_space = adapter.action_space["agent0"]
+            agent_names = ["agent{}".format(idx) for idx in range(num_envs)]
+            samples = [[action_space.sample() for _ in range(num_envs)] for _ in range(num_steps)]
+
+            def make_request(actions: List[Any]) -> Dict[str, Any]:
+                if batched:
+                    return {BATCH_ACTION_KEY: np.stack(actions)}
+                return dict(zip(agent_names, actions))
+
+            start_time = time.perf_counter()
+            for actions in samples:
+                adapter.step(make_request(actions))
+            total_time = time.perf_counter() - start_time
+
+            retained = []
+            tracemalloc.start()
+            try:
+                start_size = tracemalloc.get_traced_memory()[0]
+                for actions in samples:
+                    retained.append(adapter.step(make_request(actions)))
+                retained_size = tracemalloc.get_traced_memory()[0] - start_size
+            finally:
+                tracemalloc.stop()
+        finally:
+            adapter.close()
+        results.append({"env_name": env_name,
+                        "num_envs": num_envs,
+                        "mode": "batched" if batched else "per_agent",
+                        "num_steps": num_steps,
+                        "steps_per_sec": num_steps / total_time if total_time > 0 else 0.0,
+                        "bytes_per_step": retained_size / num_steps if num_steps else 0.0})
+    return results
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    """
+    Returns the argument parser of benchmark CLI.
+
+    Returns:
+        argparse.ArgumentParser: the argument parser.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark UDE Gym Bridge throughput and latency.")
+    parser.add_argument("--env", dest="env_names", action="append",
+                        help="OpenAI Gym environment name (repeatable, default: CartPole-v0).")
+    parser.add_argument("--compression", dest="compressions", action="append",
+                        choices=[compression.name for compression in Compression],
+                        help="channel compression type (repeatable, default: NoCompression).")
+    parser.add_argument("--step-invoke-type", dest="step_invoke_types", action="append",
+                        choices=[step_invoke_type.name for step_invoke_type in UDEStepInvokeType],
+                        help="step invoke type (repeatable, default: WAIT_FOREVER).")
+    parser.add_argument("--obs-encoding", dest="obs_encodings", action="append",
+                        choices=["none", "raw", "shm", "delta"],
+                        help="observation encoding (repeatable, default: none).")
+    parser.add_argument("--step-invoke-period", type=float, default=120.0,
+                        help="step invoke period used with PERIODIC step invoke type.")
+    parser.add_argument("--steps", type=int, default=1000, help="the number of steps to measure.")
+    parser.add_argument("--resets", type=int, default=10, help="the number of resets to measure.")
+    parser.add_argument("--port", type=int, default=None, help="port to use for UDE Server.")
+    parser.add_argument("--alloc-steps", type=int, default=0,
+                        help="the number of steps of in-process step allocation benchmark (default: skip).")
+    parser.add_argument("--alloc-num-envs", type=int, default=8,
+                        help="the number of environment copies of step allocation benchmark.")
+    parser.add_argument("--output", default=None, help="JSON file path to write results (default: stdout).")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    args = _build_arg_parser().parse_args(argv)
+    results = run_benchmarks(env_names=args.env_names or ["CartPole-v0"],
+                             compressions=[Compression[name]
+                                           for name in args.compressions or ["NoCompression"]],
+                             step_invoke_types=[UDEStepInvokeType[name]
+                                                for name in args.step_invoke_types or ["WAIT_FOREVER"]],
+                             obs_encodings=args.obs_encodings or ["none"],
+                             num_steps=args.steps,
+                             num_resets=args.resets,
+                             step_invoke_period=args.step_invoke_period,
+                             port=args.port)
+    report = {
+        "timestamp": time.time(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.alloc_steps > 0:
+        report["step_allocation"] = [result
+                                     for env_name in args.env_names or ["CartPole-v0"]
+                                     for result in run_step_allocation_benchmark(env_name=env_name,
+                                                                                 num_envs=args.alloc_num_envs,
+                                                                                 num_steps=args.alloc_steps)]
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return results
+
+
+if __name__ == '__main__':
+    main()
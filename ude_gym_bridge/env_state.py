@@ -0,0 +1,133 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""Functions to snapshot and restore the state of OpenAI Gym environment.
+
+The snapshot covers the simulator state (MuJoCo sim state or qpos/qvel, Atari ALE state,
+or the state attribute of classic control environments), the random generator of the
+environment, and the episode state of wrappers (e.g. TimeLimit elapsed steps, frame stack).
+"""
+from typing import Any, Dict
+import copy
+
+import gym
+
+# Episode state kept by wrappers: TimeLimit, OrderEnforcing, and FrameStackWrapper.
+_WRAPPER_STATE_ATTRS = ("_elapsed_steps", "_has_reset", "_frames", "_pos")
+
+
+def _get_rng_state(rng: Any) -> Any:
+    """
+    Returns the state of numpy Generator or RandomState.
+
+    Args:
+        rng (Any): numpy Generator or RandomState.
+
+    Returns:
+        Any: the state of the random generator, or None if the type is not supported.
+    """
+    if hasattr(rng, "bit_generator"):
+        return copy.deepcopy(rng.bit_generator.state)
+    if hasattr(rng, "get_state"):
+        return rng.get_state()
+    return None
+
+
+def _set_rng_state(rng: Any, state: Any) -> None:
+    """
+    Restore numpy Generator or RandomState to given state.
+
+    Args:
+        rng (Any): numpy Generator or RandomState.
+        state (Any): the state of the random generator.
+    """
+    if hasattr(rng, "bit_generator"):
+        rng.bit_generator.state = copy.deepcopy(state)
+    else:
+        rng.set_state(state)
+
+
+def get_env_state(env: gym.Env) -> Dict[str, Any]:
+    """
+    Returns the snapshot of given environment state. The snapshot shares no mutable
+    data with the environment.
+
+    Args:
+        env (gym.Env): OpenAI Gym environment (optionally wrapped).
+
+    Returns:
+        Dict[str, Any]: the snapshot of the environment state.
+
+    Raises:
+        ValueError: if the simulator state of the environment is not supported.
+    """
+    wrappers = []
+    layer = env
+    while isinstance(layer, gym.Wrapper):
+        wrappers.append({attr: copy.deepcopy(getattr(layer, attr))
+                         for attr in _WRAPPER_STATE_ATTRS if hasattr(layer, attr)})
+        layer = layer.env
+
+    unwrapped = env.unwrapped
+    state = {"wrappers": wrappers}  # type: Dict[str, Any]
+    sim = getattr(unwrapped, "sim", None)
+    data = getattr(unwrapped, "data", None)
+    ale = getattr(unwrapped, "ale", None)
+    if sim is not None and hasattr(sim, "get_state"):
+        # mujoco-py based environments.
+        state["sim"] = sim.get_state()
+    elif data is not None and hasattr(data, "qpos") and hasattr(unwrapped, "set_state"):
+        # mujoco based environments.
+        state["qpos"] = data.qpos.copy()
+        state["qvel"] = data.qvel.copy()
+    elif ale is not None and hasattr(ale, "cloneState"):
+        state["ale"] = ale.cloneState()
+    elif hasattr(unwrapped, "state"):
+        state["state"] = copy.deepcopy(unwrapped.state)
+    else:
+        raise ValueError("Snapshot of {} state is not supported.".format(type(unwrapped).__name__))
+    rng_state = _get_rng_state(getattr(unwrapped, "np_random", None))
+    if rng_state is not None:
+        state["np_random"] = rng_state
+    return state
+
+
+def set_env_state(env: gym.Env, state: Dict[str, Any]) -> None:
+    """
+    Restore given environment to the snapshot. The snapshot is not modified,
+    so it can be restored repeatedly.
+
+    Args:
+        env (gym.Env): OpenAI Gym environment (optionally wrapped) the snapshot was taken from.
+        state (Dict[str, Any]): the snapshot of the environment state.
+    """
+    layer = env
+    for wrapper_state in state["wrappers"]:
+        for attr, value in wrapper_state.items():
+            setattr(layer, attr, copy.deepcopy(value))
+        layer = layer.env
+
+    unwrapped = env.unwrapped
+    if "sim" in state:
+        unwrapped.sim.set_state(state["sim"])
+        unwrapped.sim.forward()
+    elif "qpos" in state:
+        unwrapped.set_state(state["qpos"], state["qvel"])
+    elif "ale" in state:
+        unwrapped.ale.restoreState(state["ale"])
+    elif "state" in state:
+        unwrapped.state = copy.deepcopy(state["state"])
+    if "np_random" in state:
+        _set_rng_state(unwrapped.np_random, state["np_random"])
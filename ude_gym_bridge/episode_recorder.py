@@ -0,0 +1,379 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""Classes for recording transitions to chunked memory-mapped files and reading them back.
+
+A recording directory holds metadata.json and one directory per chunk with a .npy file
+per column (obs, action, reward, done, next_obs, episode_id). Row t of a chunk holds the
+observation the action was taken from, the action, and the resulting reward, done and
+observation. The next_obs of the last row of an automatically reset episode is its terminal
+observation. Chunks are preallocated to chunk_size rows, and metadata.json records the
+number of rows written.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from threading import Event, Lock, Thread
+import json
+import logging
+import os
+import queue
+
+import numpy as np
+
+from ude import AgentID
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("obs", "action", "reward", "done", "next_obs", "episode_id")
+METADATA_FILE = "metadata.json"
+
+_CLOSE = object()
+
+
+class EpisodeRecorder(object):
+    """
+    EpisodeRecorder class to append transitions to chunked memory-mapped columnar files.
+
+    record_reset and record_step only enqueue the transition, and a background thread
+    writes them to the files, so recording stays off the step path.
+    """
+    def __init__(self,
+                 directory: str,
+                 chunk_size: int = 4096,
+                 max_queue_size: int = 65536):
+        """
+        Initialize EpisodeRecorder
+
+        Args:
+            directory (str): the directory to write the recording to.
+            chunk_size (int): the number of rows per chunk.
+            max_queue_size (int): the maximum number of transitions waiting to be written.
+                Recording blocks when the writer falls behind by this many transitions.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1: {}".format(chunk_size))
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(maxsize=max_queue_size)
+
+        # Accessed by the recording threads.
+        self._lock = Lock()
+        self._current_obs = {}  # type: Dict[AgentID, Any]
+        self._episode_ids = {}  # type: Dict[AgentID, int]
+        self._next_episode_id = 0
+
+        # Accessed by the writer thread only.
+        self._chunks = []  # type: List[Dict[str, Any]]
+        self._columns = None  # type: Optional[Dict[str, np.ndarray]]
+        self._num_rows = 0
+        # The error that stopped the writer thread from writing, raised to the recording threads.
+        self._error = None  # type: Optional[Exception]
+
+        self._closed = False
+        self._writer = Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    @property
+    def directory(self) -> str:
+        """
+        Returns the directory the recording is written to.
+
+        Returns:
+            str: the directory of the recording.
+        """
+        return self._directory
+
+    def _start_episode(self, agent_name: AgentID, obs: Any) -> None:
+        """
+        Start new episode of given agent. Must be called with lock held.
+
+        Args:
+            agent_name (AgentID): the agent name.
+            obs (Any): the first observation of the episode.
+        """
+        self._current_obs[agent_name] = obs
+        self._episode_ids[agent_name] = self._next_episode_id
+        self._next_episode_id += 1
+
+    def record_reset(self, agent_name: AgentID, obs: Any) -> None:
+        """
+        Record the start of new episode.
+
+        Args:
+            agent_name (AgentID): the agent name.
+            obs (Any): the first observation of the episode.
+        """
+        with self._lock:
+            self._start_episode(agent_name, obs)
+
+    def record_step(self,
+                    agent_name: AgentID,
+                    action: Any,
+                    obs: Any,
+                    reward: float,
+                    done: bool,
+                    new_episode: bool = False,
+                    terminal_obs: Any = None) -> None:
+        """
+        Record the transition of a step.
+
+        Args:
+            agent_name (AgentID): the agent name.
+            action (Any): the action taken.
+            obs (Any): the observation returned by the step.
+            reward (float): the reward of the step.
+            done (bool): the flag whether the episode finished at the step.
+            new_episode (bool): the flag whether obs is the first observation of new episode
+                (the environment was automatically reset).
+            terminal_obs (Any): the last observation of the finished episode when the environment
+                was automatically reset, recorded as next_obs instead of obs.
+
+        Raises:
+            RuntimeError: if the writer thread failed to write the recorded transitions.
+        """
+        self._raise_error()
+        with self._lock:
+            if agent_name not in self._current_obs:
+                # The episode was not reset while recording, so there is no observation to start from.
+                self._start_episode(agent_name, obs)
+                return
+            next_obs = terminal_obs if new_episode and terminal_obs is not None else obs
+            row = (self._current_obs[agent_name], action, reward, done, next_obs, self._episode_ids[agent_name])
+            if new_episode:
+                self._start_episode(agent_name, obs)
+            else:
+                self._current_obs[agent_name] = obs
+        self._queue.put(row)
+
+    def flush(self) -> None:
+        """
+        Wait until all recorded transitions are written, flush the files, and update the metadata.
+
+        Raises:
+            RuntimeError: if the writer thread failed to write the recorded transitions.
+        """
+        if self._closed:
+            return
+        flushed = Event()
+        self._queue.put(flushed)
+        flushed.wait()
+        self._raise_error()
+
+    def close(self) -> None:
+        """
+        Write all recorded transitions, and stop the writer thread.
+
+        Raises:
+            RuntimeError: if the writer thread failed to write the recorded transitions.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._writer.join()
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        """
+        Raise the error that stopped the writer thread from writing, if there is any.
+        """
+        if self._error is not None:
+            raise RuntimeError("Episode recording failed: {}".format(self._error)) from self._error
+
+    def _write_loop(self) -> None:
+        # After an error, the queue is still drained, so neither recording nor flush blocks.
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _CLOSE:
+                    if self._error is None:
+                        self._finish_chunk()
+                    return
+                if isinstance(item, Event):
+                    if self._error is None:
+                        self._flush_chunk()
+                    continue
+                if self._error is None:
+                    self._write_row(item)
+            except Exception as ex:
+                logger.exception("Episode recording failed.")
+                self._error = ex
+            finally:
+                if isinstance(item, Event):
+                    item.set()
+
+    def _open_chunk(self, obs: np.ndarray, action: np.ndarray, next_obs: np.ndarray) -> None:
+        """
+        Create the files of new chunk shaped after given observations and action.
+
+        Args:
+            obs (np.ndarray): the observation of the first row.
+            action (np.ndarray): the action of the first row.
+            next_obs (np.ndarray): the next observation of the first row.
+        """
+        name = "chunk_{:06d}".format(len(self._chunks))
+        chunk_dir = os.path.join(self._directory, name)
+        os.makedirs(chunk_dir, exist_ok=True)
+        specs = {"obs": (obs.dtype, obs.shape),
+                 "action": (action.dtype, action.shape),
+                 "reward": (np.dtype(np.float64), ()),
+                 "done": (np.dtype(np.bool_), ()),
+                 "next_obs": (next_obs.dtype, next_obs.shape),
+                 "episode_id": (np.dtype(np.int64), ())}
+        self._columns = {column: np.lib.format.open_memmap(os.path.join(chunk_dir, column + ".npy"),
+                                                           mode="w+",
+                                                           dtype=dtype,
+                                                           shape=(self._chunk_size,) + shape)
+                         for column, (dtype, shape) in specs.items()}
+        self._num_rows = 0
+        self._chunks.append({"name": name, "size": 0})
+
+    def _write_row(self, row: tuple) -> None:
+        obs, action, reward, done, next_obs, episode_id = row
+        values = {"obs": np.asarray(obs), "action": np.asarray(action), "next_obs": np.asarray(next_obs)}
+        columns = self._columns
+        # A new chunk starts when the shapes change (e.g. the environment is switched).
+        if columns is None or any(columns[column].shape[1:] != value.shape or columns[column].dtype != value.dtype
+                                  for column, value in values.items()):
+            self._finish_chunk()
+            self._open_chunk(values["obs"], values["action"], values["next_obs"])
+            columns = self._columns
+        idx = self._num_rows
+        columns["obs"][idx] = obs
+        columns["action"][idx] = action
+        columns["reward"][idx] = reward
+        columns["done"][idx] = done
+        columns["next_obs"][idx] = next_obs
+        columns["episode_id"][idx] = episode_id
+        self._num_rows += 1
+        if self._num_rows == self._chunk_size:
+            self._finish_chunk()
+
+    def _flush_chunk(self) -> None:
+        """
+        Flush the current chunk files, and write the metadata.
+        """
+        if self._columns is not None:
+            for column in self._columns.values():
+                column.flush()
+            self._chunks[-1]["size"] = self._num_rows
+        self._write_metadata()
+
+    def _finish_chunk(self) -> None:
+        """
+        Flush and close the current chunk.
+        """
+        self._flush_chunk()
+        self._columns = None
+        self._num_rows = 0
+
+    def _write_metadata(self) -> None:
+        metadata = {"chunk_size": self._chunk_size,
+                    "columns": list(COLUMNS),
+                    "chunks": self._chunks}
+        path = os.path.join(self._directory, METADATA_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, path)
+
+
+class EpisodeReader(object):
+    """
+    EpisodeReader class to access a recording of EpisodeRecorder with random access.
+    The chunk files are memory-mapped, so only the rows accessed are read.
+    """
+    def __init__(self, directory: str):
+        """
+        Initialize EpisodeReader
+
+        Args:
+            directory (str): the directory of the recording.
+        """
+        self._directory = directory
+        self._chunks = []  # type: List[Dict[str, np.ndarray]]
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self.refresh()
+
+    def refresh(self) -> None:
+        """
+        Reload the metadata to access the rows written since the reader was opened.
+        """
+        with open(os.path.join(self._directory, METADATA_FILE)) as f:
+            metadata = json.load(f)
+        chunks = []
+        sizes = []
+        for chunk in metadata["chunks"]:
+            if not chunk["size"]:
+                continue
+            chunk_dir = os.path.join(self._directory, chunk["name"])
+            chunks.append({column: np.load(os.path.join(chunk_dir, column + ".npy"), mmap_mode="r")
+                           for column in COLUMNS})
+            sizes.append(chunk["size"])
+        self._chunks = chunks
+        self._offsets = np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)])
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("EpisodeReader index out of range: {}".format(idx))
+        chunk_idx = int(np.searchsorted(self._offsets, idx, side="right")) - 1
+        row = idx - int(self._offsets[chunk_idx])
+        return {column: np.array(values[row]) for column, values in self._chunks[chunk_idx].items()}
+
+    def get_batch(self, indices: Sequence[int]) -> Dict[str, np.ndarray]:
+        """
+        Returns the rows at given indices as a batch. The rows must share the observation
+        and action shapes (i.e. come from the same environment).
+
+        Args:
+            indices (Sequence[int]): the row indices.
+
+        Returns:
+            Dict[str, np.ndarray]: the batch of each column with column name as key.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if indices.size and (indices.min() < 0 or indices.max() >= len(self)):
+            raise IndexError("EpisodeReader index out of range.")
+        chunk_indices = np.searchsorted(self._offsets, indices, side="right") - 1
+        batch = {}
+        for column in COLUMNS:
+            first = self._chunks[int(chunk_indices[0])][column] if indices.size else np.empty(0)
+            values = np.empty((len(indices),) + first.shape[1:], dtype=first.dtype)
+            for chunk_idx in np.unique(chunk_indices):
+                mask = chunk_indices == chunk_idx
+                values[mask] = self._chunks[chunk_idx][column][indices[mask] - self._offsets[chunk_idx]]
+            batch[column] = values
+        return batch
+
+    def sample(self, batch_size: int, rng: Optional[np.random.Generator] = None) -> Dict[str, np.ndarray]:
+        """
+        Returns the rows sampled uniformly at random.
+
+        Args:
+            batch_size (int): the number of rows to sample.
+            rng (Optional[np.random.Generator]): the random generator to use.
+
+        Returns:
+            Dict[str, np.ndarray]: the batch of each column with column name as key.
+        """
+        if not len(self):
+            raise ValueError("Cannot sample from empty recording.")
+        rng = rng or np.random.default_rng()
+        return self.get_batch(rng.integers(0, len(self), size=batch_size))
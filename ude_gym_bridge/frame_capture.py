@@ -0,0 +1,226 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class for offscreen capture of rendered frames on a background thread."""
+from typing import Any, Dict, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+import logging
+import struct
+import time
+import zlib
+
+import numpy as np
+import gym
+
+logger = logging.getLogger(__name__)
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_PNG_COLOR_TYPES = {1: 0, 3: 2, 4: 6}  # grayscale, RGB, RGBA
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+
+def encode_png(frame: np.ndarray, compress_level: int = 1) -> bytes:
+    """
+    Encode the frame to PNG.
+
+    Args:
+        frame (np.ndarray): uint8 frame of (height, width), or (height, width, channels)
+            with 1 (grayscale), 3 (RGB) or 4 (RGBA) channels.
+        compress_level (int): zlib compression level.
+
+    Returns:
+        bytes: the PNG image.
+    """
+    frame = np.ascontiguousarray(frame, dtype=np.uint8)
+    if frame.ndim == 2:
+        frame = frame[:, :, np.newaxis]
+    height, width, channels = frame.shape
+    if channels not in _PNG_COLOR_TYPES:
+        raise ValueError("Unsupported number of channels: {}".format(channels))
+    # Each row starts with filter type 0 (None).
+    rows = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    rows[:, 1:] = frame.reshape(height, -1)
+    header = struct.pack(">IIBBBBB", width, height, 8, _PNG_COLOR_TYPES[channels], 0, 0, 0)
+    return (_PNG_SIGNATURE
+            + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", zlib.compress(rows.tobytes(), compress_level))
+            + _png_chunk(b"IEND", b""))
+
+
+def downscale_frame(frame: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Downscale the frame by averaging factor x factor blocks.
+    The edge rows and columns not filling a block are dropped.
+
+    Args:
+        frame (np.ndarray): the frame of (height, width) or (height, width, channels).
+        factor (int): the downscale factor.
+
+    Returns:
+        np.ndarray: the downscaled uint8 frame.
+    """
+    if factor <= 1:
+        return frame
+    height, width = frame.shape[0] // factor, frame.shape[1] // factor
+    blocks = frame[:height * factor, :width * factor].reshape((height, factor, width, factor) + frame.shape[2:])
+    return blocks.mean(axis=(1, 3)).astype(np.uint8)
+
+
+class FrameCapture(object):
+    """
+    FrameCapture class to capture rgb_array frames of the environment offscreen.
+
+    Captures are rate-limited to every k-th step and/or a target FPS. The render call
+    runs on a background thread, and the caller only needs to wait for the returned event
+    before accessing the environment again. Downscaling and PNG encoding run after the
+    environment is released, and a capture due while the previous one is still in
+    progress is dropped, so stepping never waits for encoding.
+    """
+    def __init__(self,
+                 every_n_steps: int = 1,
+                 target_fps: Optional[float] = None,
+                 downscale: int = 1,
+                 max_frames: int = 64,
+                 compress_level: int = 1):
+        """
+        Initialize FrameCapture
+
+        Args:
+            every_n_steps (int): the number of steps between captures.
+            target_fps (Optional[float]): the maximum number of captures per second.
+            downscale (int): the factor to downscale the frames by.
+            max_frames (int): the number of latest encoded frames to keep for the stream.
+            compress_level (int): zlib compression level of PNG encoding.
+        """
+        if every_n_steps < 1:
+            raise ValueError("every_n_steps must be at least 1: {}".format(every_n_steps))
+        if target_fps is not None and target_fps <= 0:
+            raise ValueError("target_fps must be positive: {}".format(target_fps))
+        self._every_n_steps = every_n_steps
+        self._min_interval = 1.0 / target_fps if target_fps else 0.0
+        self._downscale = downscale
+        self._compress_level = compress_level
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._lock = Lock()
+        self._frames = deque(maxlen=max_frames)  # type: deque
+        self._latest_frame = None  # type: Optional[np.ndarray]
+        self._seq = 0
+        self._step_count = 0
+        self._last_capture_time = -float("inf")
+        self._busy = False
+        self._captured = 0
+        self._dropped = 0
+
+    def on_step(self, env: gym.Env) -> Optional[Event]:
+        """
+        Start capture of the environment if it is due.
+
+        Args:
+            env (gym.Env): OpenAI Gym environment to capture.
+
+        Returns:
+            Optional[Event]: the event set when the environment is no longer accessed by
+                the capture, or None if no capture is started.
+        """
+        step_count = self._step_count
+        self._step_count += 1
+        if step_count % self._every_n_steps:
+            return None
+        now = time.monotonic()
+        if now - self._last_capture_time < self._min_interval:
+            return None
+        if self._busy:
+            self._dropped += 1
+            return None
+        self._busy = True
+        self._last_capture_time = now
+        released = Event()
+        self._executor.submit(self._capture, env, released)
+        return released
+
+    def _capture(self, env: gym.Env, released: Event) -> None:
+        try:
+            try:
+                frame = env.render(mode="rgb_array")
+            finally:
+                released.set()
+            if frame is None:
+                return
+            frame = downscale_frame(np.asarray(frame), self._downscale)
+            encoded = encode_png(frame, self._compress_level)
+            with self._lock:
+                self._seq += 1
+                self._frames.append((self._seq, encoded))
+                self._latest_frame = frame
+                self._captured += 1
+        except Exception:
+            logger.exception("Frame capture failed.")
+        finally:
+            self._busy = False
+
+    @property
+    def latest_frame(self) -> Optional[np.ndarray]:
+        """
+        Returns the latest captured frame after downscaling.
+
+        Returns:
+            Optional[np.ndarray]: the latest frame, or None if nothing is captured yet.
+        """
+        return self._latest_frame
+
+    def latest_png(self) -> Optional[bytes]:
+        """
+        Returns the latest captured frame in PNG.
+
+        Returns:
+            Optional[bytes]: the latest frame in PNG, or None if nothing is captured yet.
+        """
+        with self._lock:
+            return self._frames[-1][1] if self._frames else None
+
+    def frames_since(self, seq: int) -> Tuple[int, List[bytes]]:
+        """
+        Returns the kept frames captured after given sequence number.
+
+        Args:
+            seq (int): the sequence number of the last frame received.
+
+        Returns:
+            Tuple[int, List[bytes]]: the sequence number of the latest frame, and the frames in PNG
+                from the oldest.
+        """
+        with self._lock:
+            return self._seq, [encoded for frame_seq, encoded in self._frames if frame_seq > seq]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the capture stats.
+
+        Returns:
+            Dict[str, Any]: the number of frames captured and dropped, and the latest sequence number.
+        """
+        with self._lock:
+            return {"captured": self._captured, "dropped": self._dropped, "seq": self._seq}
+
+    def close(self) -> None:
+        """
+        Wait for the capture in progress, and stop the background thread.
+        """
+        self._executor.shutdown()
@@ -0,0 +1,210 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class for bounded pool of pre-constructed OpenAI Gym environments."""
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from threading import Event, Lock, Thread
+
+import gym
+
+
+class GymEnvPool(object):
+    """
+    GymEnvPool class to keep pre-constructed OpenAI Gym environments for reuse.
+
+    The pool holds at most max_size idle environments, and evicts (closes) the
+    environments of the least recently used name first when it is full.
+
+    Environments of the same name constructed differently (e.g. hosted in a worker
+    subprocess with wrappers) are kept apart by a variant key, and each variant is
+    created with the factory given along with it.
+    """
+    def __init__(self,
+                 max_size: int = 4,
+                 env_factory: Optional[Callable[[str], gym.Env]] = None):
+        """
+        Initialize GymEnvPool
+
+        Args:
+            max_size (int): the maximum number of idle environments to keep.
+            env_factory (Optional[Callable[[str], gym.Env]]): the function to create new
+                environment with given name (default: gym.make).
+        """
+        if max_size < 0:
+            raise ValueError("max_size must be non-negative: {}".format(max_size))
+        self._max_size = max_size
+        self._env_factory = env_factory
+        # Idle environments with (env_name, variant) as key.
+        self._idle_envs = OrderedDict()  # type: OrderedDict[Tuple[str, Hashable], List[gym.Env]]
+        self._size = 0
+        self._warming = {}  # type: Dict[Tuple[str, Hashable], Event]
+        self._lock = Lock()
+
+    @property
+    def max_size(self) -> int:
+        """
+        Returns the maximum number of idle environments to keep.
+
+        Returns:
+            int: the maximum number of idle environments to keep.
+        """
+        return self._max_size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size
+
+    def __contains__(self, env_name: str) -> bool:
+        with self._lock:
+            return any(name == env_name for name, _ in self._idle_envs)
+
+    def _make_env(self, env_name: str, env_factory: Optional[Callable[[str], gym.Env]] = None) -> gym.Env:
+        """
+        Create new environment with given name.
+
+        Args:
+            env_name (str): OpenAI Gym environment name.
+            env_factory (Optional[Callable[[str], gym.Env]]): the function to create the environment
+                (default: the factory of the pool).
+
+        Returns:
+            gym.Env: new OpenAI Gym environment.
+        """
+        env_factory = env_factory or self._env_factory
+        if env_factory:
+            return env_factory(env_name)
+        return gym.make(env_name)
+
+    def acquire(self,
+                env_name: str,
+                env_factory: Optional[Callable[[str], gym.Env]] = None,
+                variant: Hashable = None) -> gym.Env:
+        """
+        Returns an idle environment with given name and variant from the pool, or creates
+        new one if there is none. If the environment is being warmed in background,
+        waits for it instead of creating another one.
+
+        Args:
+            env_name (str): OpenAI Gym environment name.
+            env_factory (Optional[Callable[[str], gym.Env]]): the function to create the environment
+                of the variant (default: the factory of the pool).
+            variant (Hashable): the key of how the environment is constructed (default: the factory of the pool).
+
+        Returns:
+            gym.Env: OpenAI Gym environment with given name.
+        """
+        key = (env_name, variant)
+        while True:
+            with self._lock:
+                envs = self._idle_envs.get(key)
+                if envs:
+                    env = envs.pop()
+                    self._size -= 1
+                    if not envs:
+                        del self._idle_envs[key]
+                    return env
+                warming = self._warming.get(key)
+            if not warming:
+                return self._make_env(env_name, env_factory)
+            warming.wait()
+
+    def release(self, env_name: str, env: gym.Env, variant: Hashable = None) -> None:
+        """
+        Returns the environment to the pool for reuse.
+        Least recently used environments are closed if the pool exceeds max_size.
+
+        Args:
+            env_name (str): OpenAI Gym environment name.
+            env (gym.Env): OpenAI Gym environment to return.
+            variant (Hashable): the key of how the environment was constructed.
+        """
+        key = (env_name, variant)
+        with self._lock:
+            self._idle_envs.setdefault(key, []).append(env)
+            self._idle_envs.move_to_end(key)
+            self._size += 1
+            evicted_envs = self._evict()
+        for evicted_env in evicted_envs:
+            evicted_env.close()
+
+    def _evict(self) -> List[gym.Env]:
+        """
+        Remove least recently used environments until the pool fits in max_size.
+        Must be called with lock held.
+
+        Returns:
+            List[gym.Env]: the environments removed, to be closed outside of lock.
+        """
+        evicted_envs = []
+        while self._size > self._max_size:
+            key, envs = next(iter(self._idle_envs.items()))
+            evicted_envs.append(envs.pop(0))
+            self._size -= 1
+            if not envs:
+                del self._idle_envs[key]
+        return evicted_envs
+
+    def warm(self,
+             env_names: Iterable[str],
+             count: int = 1,
+             env_factory: Optional[Callable[[str], gym.Env]] = None,
+             variant: Hashable = None) -> Thread:
+        """
+        Pre-construct environments with given names in a background thread.
+
+        Args:
+            env_names (Iterable[str]): OpenAI Gym environment names to warm.
+            count (int): the number of environments to construct per name.
+            env_factory (Optional[Callable[[str], gym.Env]]): the function to create the environments
+                of the variant (default: the factory of the pool).
+            variant (Hashable): the key of how the environments are constructed.
+
+        Returns:
+            Thread: the background thread warming the environments.
+        """
+        keys = [(env_name, variant) for env_name in env_names]
+        with self._lock:
+            events = []
+            for key in keys:
+                if key not in self._warming:
+                    self._warming[key] = Event()
+                events.append(self._warming[key])
+
+        def warm_envs() -> None:
+            for key, event in zip(keys, events):
+                try:
+                    for _ in range(count):
+                        self.release(key[0], self._make_env(key[0], env_factory), variant=variant)
+                finally:
+                    with self._lock:
+                        if self._warming.get(key) is event:
+                            del self._warming[key]
+                    event.set()
+
+        thread = Thread(target=warm_envs, daemon=True)
+        thread.start()
+        return thread
+
+    def close(self) -> None:
+        """
+        Close all idle environments in the pool.
+        """
+        with self._lock:
+            envs = [env for env_list in self._idle_envs.values() for env in env_list]
+            self._idle_envs.clear()
+            self._size = 0
+        for env in envs:
+            env.close()
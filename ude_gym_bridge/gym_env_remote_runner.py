@@ -14,18 +14,38 @@
 #   limitations under the License.                                              #
 #################################################################################
 """A class for Gym Environment."""
-from typing import Optional, List, Tuple, Union, Any, Iterable
+from typing import Optional, List, Tuple, Union, Any, Iterable, Dict
+from enum import Enum
+import json
+import time
 
 from ude import (
     UDEEnvironment,
     UDEServer,
     UDEStepInvokeType,
-    Compression, ServerCredentials
+    Compression, ServerCredentials,
+    AbstractSideChannel, SideChannelData, SideChannelObserverInterface
 )
 from ude_gym_bridge.gym_environment_adapter import GymEnvironmentAdapter
+from ude_gym_bridge.gym_env_pool import GymEnvPool
+from ude_gym_bridge.observation_encoding import ObservationEncoder
+from ude_gym_bridge.episode_recorder import EpisodeRecorder
+from ude_gym_bridge.frame_capture import FrameCapture
+from ude_gym_bridge.adaptive_step_scheduler import AdaptiveStepScheduler
+from ude_gym_bridge.preprocessing import PreprocessingPipeline
 
 
-class GymEnvRemoteRunner(object):
+class RunnerState(Enum):
+    """
+    Lifecycle state of GymEnvRemoteRunner.
+    """
+    CREATED = "created"
+    SERVING = "serving"
+    DRAINING = "draining"
+    STOPPED = "stopped"
+
+
+class GymEnvRemoteRunner(SideChannelObserverInterface):
     """
     Gym Environment
     """
@@ -34,13 +54,39 @@ class GymEnvRemoteRunner(object):
                  agent_name: str = "agent0",
                  render: bool = True,
                  step_invoke_type: UDEStepInvokeType = UDEStepInvokeType.WAIT_FOREVER,
-                 step_invoke_period: Union[int, float] = 120.0,
+                 step_invoke_period: Optional[Union[int, float]] = None,
                  port: Optional[int] = None,
                  options: Optional[List[Tuple[str, Any]]] = None,
                  compression: Compression = Compression.NoCompression,
                  credentials: Optional[Union[ServerCredentials, Iterable[str], Iterable[bytes]]] = None,
                  auth_key: Optional[str] = None,
-                 timeout_wait: Union[int, float] = 60.0,
+                 timeout_wait: Optional[Union[int, float]] = None,
+                 num_envs: int = 1,
+                 use_subprocess: bool = False,
+                 async_render: bool = False,
+                 warm_env_names: Optional[List[str]] = None,
+                 env_pool_size: int = 0,
+                 lazy: bool = False,
+                 profile: bool = False,
+                 profile_dump_interval: Optional[float] = None,
+                 observation_encoder: Optional[ObservationEncoder] = None,
+                 frame_skip: int = 1,
+                 max_pool_frames: bool = False,
+                 frame_stack: int = 1,
+                 rollout_horizon: int = 0,
+                 record_dir: Optional[str] = None,
+                 record_chunk_size: int = 4096,
+                 capture_every_n_steps: int = 0,
+                 capture_fps: Optional[float] = None,
+                 capture_downscale: int = 1,
+                 adaptive_schedule: bool = False,
+                 step_invoke_period_bounds: Tuple[float, float] = (0.001, 1.0),
+                 timeout_wait_bounds: Tuple[float, float] = (1.0, 60.0),
+                 auto_reset: bool = False,
+                 preprocessing: Optional[Dict[str, Any]] = None,
+                 request_queue_size: int = 0,
+                 request_queue_timeout: float = 0.0,
+                 seed: Optional[int] = None,
                  **kwargs):
         """
 
@@ -49,7 +95,9 @@ class GymEnvRemoteRunner(object):
             agent_name (str): Name of agent to use.
             render (bool): the flag to render OpenAI Gym environment or not.
             step_invoke_type (const.UDEStepInvokeType):  step invoke type (WAIT_FOREVER vs PERIODIC)
-            step_invoke_period (Union[int, float]): step invoke period (used only with PERIODIC step_invoke_type)
+            step_invoke_period (Optional[Union[int, float]]): step invoke period (used only with PERIODIC
+                step_invoke_type) (default: 120.0, or the upper bound of step_invoke_period_bounds with
+                adaptive_schedule)
             port (Optional[int]): Port to use for UDE Server (default: 3003)
             options (Optional[List[Tuple[str, Any]]]): An optional list of key-value pairs
                                                         (:term:`channel_arguments` in gRPC runtime)
@@ -59,12 +107,110 @@ class GymEnvRemoteRunner(object):
                 the path to certificate private key and body/chain file, or bytes of the certificate private
                 key and body/chain to use with an SSL-enabled Channel.
             auth_key (Optional[str]): channel authentication key (only applied when credentials are provided).
-            timeout_wait (Union[int, float]): the maximum wait time to respond step request to UDE clients.
+            timeout_wait (Optional[Union[int, float]]): the maximum wait time to respond step request to
+                UDE clients (default: 60.0, or tuned with adaptive_schedule). With adaptive_schedule, a given
+                timeout_wait is kept fixed and overrides timeout_wait_bounds.
+            num_envs (int): the number of OpenAI Gym environment copies to host as agent0 ... agent{num_envs - 1}.
+            use_subprocess (bool): the flag to host each OpenAI Gym environment copy in a worker subprocess.
+            async_render (bool): the flag to render on a background thread while UDE Server responds.
+            warm_env_names (Optional[List[str]]): OpenAI Gym environment names to pre-construct in background,
+                                                  so switching to them through side channel is near-instant.
+            env_pool_size (int): the maximum number of idle environments to keep for reuse across switches
+                                 (default: enough to hold the copies of warm_env_names and env_name).
+            lazy (bool): the flag to construct and reset OpenAI Gym environment in background, so UDE Server
+                         can start serving immediately. The first client request waits for the environment.
+            profile (bool): the flag to record per-phase step timing and episode stats in the adapter,
+                            queryable through side channel with "stats" key.
+            profile_dump_interval (Optional[float]): the interval in seconds to log the stats periodically.
+            observation_encoder (Optional[ObservationEncoder]): the encoder applied to observations before
+                                                                UDE Server sends them (e.g. shared-memory handoff).
+            frame_skip (int): the number of frames to repeat each action on the server, summing rewards.
+            max_pool_frames (bool): the flag to max-pool the last two frames of repeated action.
+            frame_stack (int): the number of last observations to stack on the server.
+            rollout_horizon (int): the maximum number of steps executed per step request, returning
+                                   the trajectory as arrays (0 to disable).
+            record_dir (Optional[str]): the directory to record the transitions to as memory-mapped files,
+                                        readable with EpisodeReader (default: no recording).
+            record_chunk_size (int): the number of transitions per recorded chunk.
+            capture_every_n_steps (int): the number of steps between offscreen rgb_array frame captures,
+                                         queryable through side channel with "frame" and "frames" keys
+                                         (0 to disable). Use with render=False on headless servers.
+            capture_fps (Optional[float]): the maximum number of frame captures per second.
+            capture_downscale (int): the factor to downscale the captured frames by.
+            adaptive_schedule (bool): the flag to tune step_invoke_period and timeout_wait online from the
+                                      action arrivals and step cost (used only with PERIODIC step_invoke_type).
+                                      The chosen values are queryable through side channel with "schedule" key.
+            step_invoke_period_bounds (Tuple[float, float]): the bounds of the tuned step_invoke_period.
+            timeout_wait_bounds (Tuple[float, float]): the bounds of the tuned timeout_wait.
+            auto_reset (bool): the flag to reset a single hosted environment automatically on done.
+            preprocessing (Optional[Dict[str, Any]]): the config of PreprocessingPipeline applied to observations
+                                                      and rewards on the server (e.g. {"grayscale": True,
+                                                      "resize": [84, 84], "clip_reward": 1.0}).
+            request_queue_size (int): the maximum number of step and reset requests in flight before new
+                                      requests are rejected as backpressure (0 for unlimited).
+            request_queue_timeout (float): the maximum wait time in seconds for a place in the full request queue.
+            seed (Optional[int]): the root seed to derive the seed of each episode of each environment copy
+                                  from (None to leave the environments unseeded).
             kwargs: Arbitrary keyword arguments for grpc.server
         """
+        self._startup_times = {}  # type: Dict[str, float]
+        start_time = time.perf_counter()
+        self._env_pool = None
+        if warm_env_names or env_pool_size > 0:
+            warm_env_names = warm_env_names or []
+            env_pool_size = env_pool_size or (len(warm_env_names) + 1) * num_envs
+            self._env_pool = GymEnvPool(max_size=env_pool_size)
+        recorder = EpisodeRecorder(record_dir, chunk_size=record_chunk_size) if record_dir else None
+        frame_capture = None
+        if capture_every_n_steps > 0:
+            frame_capture = FrameCapture(every_n_steps=capture_every_n_steps,
+                                         target_fps=capture_fps,
+                                         downscale=capture_downscale)
+        self._step_scheduler = None
+        if adaptive_schedule and step_invoke_type == UDEStepInvokeType.PERIODIC:
+            if timeout_wait is not None:
+                timeout_wait_bounds = (timeout_wait, timeout_wait)
+            # Without a given step_invoke_period, the scheduler starts from the upper bound.
+            self._step_scheduler = AdaptiveStepScheduler(min_period=step_invoke_period_bounds[0],
+                                                         max_period=step_invoke_period_bounds[1],
+                                                         min_timeout=timeout_wait_bounds[0],
+                                                         max_timeout=timeout_wait_bounds[1],
+                                                         initial_period=step_invoke_period,
+                                                         on_update=self._apply_schedule)
+            step_invoke_period = self._step_scheduler.step_invoke_period
+            timeout_wait = self._step_scheduler.timeout_wait
+        step_invoke_period = 120.0 if step_invoke_period is None else step_invoke_period
+        timeout_wait = 60.0 if timeout_wait is None else timeout_wait
         self._adapter = GymEnvironmentAdapter(env_name=env_name,
                                               agent_name=agent_name,
-                                              render=render)
+                                              render=render,
+                                              num_envs=num_envs,
+                                              use_subprocess=use_subprocess,
+                                              async_render=async_render,
+                                              env_pool=self._env_pool,
+                                              lazy_init=lazy,
+                                              profile=profile,
+                                              profile_dump_interval=profile_dump_interval,
+                                              observation_encoder=observation_encoder,
+                                              frame_skip=frame_skip,
+                                              max_pool_frames=max_pool_frames,
+                                              frame_stack=frame_stack,
+                                              rollout_horizon=rollout_horizon,
+                                              recorder=recorder,
+                                              frame_capture=frame_capture,
+                                              step_scheduler=self._step_scheduler,
+                                              auto_reset=auto_reset,
+                                              preprocessing=PreprocessingPipeline.from_config(preprocessing)
+                                              if preprocessing else None,
+                                              request_queue_size=request_queue_size,
+                                              request_queue_timeout=request_queue_timeout,
+                                              seed=seed)
+        if warm_env_names:
+            self._adapter.warm_pool(warm_env_names)
+        self._state = RunnerState.CREATED
+        self._adapter.side_channel.register(self)
+        self._startup_times["adapter_init"] = time.perf_counter() - start_time
+        start_time = time.perf_counter()
         self._ude_env = UDEEnvironment(ude_env_adapter=self._adapter)
         self._ude_server = UDEServer(ude_env=self._ude_env,
                                      step_invoke_type=step_invoke_type,
@@ -76,18 +222,148 @@ class GymEnvRemoteRunner(object):
                                      auth_key=auth_key,
                                      timeout_wait=timeout_wait,
                                      **kwargs)
+        self._startup_times["ude_server_init"] = time.perf_counter() - start_time
+
+    def _apply_schedule(self, step_invoke_period: float, timeout_wait: float) -> None:
+        """
+        Apply the step invoke period and timeout chosen by the scheduler to UDE Server.
+
+        Args:
+            step_invoke_period (float): the step invoke period in seconds.
+            timeout_wait (float): the timeout in seconds to respond step request.
+        """
+        self._ude_server.step_invoke_period = step_invoke_period
+        self._ude_server.timeout_wait = timeout_wait
+
+    @property
+    def adapter(self) -> GymEnvironmentAdapter:
+        """
+        Returns the adapter of the hosted OpenAI Gym environment.
+
+        Returns:
+            GymEnvironmentAdapter: the adapter of the hosted environment.
+        """
+        return self._adapter
+
+    @property
+    def step_schedule(self) -> Optional[Dict[str, Any]]:
+        """
+        Returns the step invoke period and timeout chosen by the adaptive scheduler,
+        and the measurements they are based on.
+
+        Returns:
+            Optional[Dict[str, Any]]: the scheduler stats, or None if adaptive_schedule is disabled.
+        """
+        return self._step_scheduler.stats() if self._step_scheduler else None
+
+    @property
+    def state(self) -> RunnerState:
+        """
+        Returns the lifecycle state of the runner.
+
+        Returns:
+            RunnerState: the lifecycle state.
+        """
+        return self._state
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        Returns the flag whether OpenAI Gym environment is constructed and ready to serve
+        (readiness). The runner is not ready before start, while draining, and after stop.
+
+        Returns:
+            bool: True if OpenAI Gym environment is ready, False otherwise.
+        """
+        return self._state == RunnerState.SERVING and self._adapter.is_ready and self._adapter.init_error is None
+
+    @property
+    def is_alive(self) -> bool:
+        """
+        Returns the flag whether the runner is functional (liveness): not stopped, and
+        OpenAI Gym environment construction has not failed.
+
+        Returns:
+            bool: True if the runner is alive, False otherwise.
+        """
+        return self._state != RunnerState.STOPPED and self._adapter.init_error is None
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Returns the health of the runner: the state, readiness, liveness, the number of
+        unfinished episodes, and the request queue stats.
+
+        Returns:
+            Dict[str, Any]: the health of the runner.
+        """
+        return {"state": self._state.value,
+                "ready": self.is_ready,
+                "alive": self.is_alive,
+                "active_episodes": self._adapter.active_episodes,
+                "queue": self._adapter.queue_stats()}
+
+    def on_received(self, side_channel: AbstractSideChannel, key: str, value: SideChannelData) -> None:
+        """
+        Callback when side channel instance receives new message.
+        Replies the health of the runner to "health" key.
+
+        Args:
+            side_channel (AbstractSideChannel): side channel instance
+            key (str): The string identifier of message
+            value (SideChannelData): The data of the message.
+        """
+        if key == "health":
+            side_channel.send("health", json.dumps(self.health()))
+
+    @property
+    def startup_times(self) -> Dict[str, float]:
+        """
+        Returns the time taken in seconds by each startup phase:
+        adapter_init, ude_server_init, and ude_server_start measured by the runner,
+        and env_make and env_reset measured by the adapter (available once ready).
+
+        Returns:
+            Dict[str, float]: the time taken in seconds with phase name as key.
+        """
+        startup_times = dict(self._startup_times)
+        startup_times.update(self._adapter.startup_times)
+        return startup_times
 
     def start(self) -> None:
         """
         Start UDE Server.
         """
+        start_time = time.perf_counter()
         self._ude_server.start()
+        self._startup_times["ude_server_start"] = time.perf_counter() - start_time
+        self._state = RunnerState.SERVING
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop starting new episodes (reset is rejected), wait until every unfinished episode
+        is done, and then stop UDE Server.
+
+        Args:
+            timeout (Optional[float]): the maximum wait time in seconds for the episodes (default: no limit).
+
+        Returns:
+            bool: True if every episode finished before stopping, False on timeout.
+        """
+        self._state = RunnerState.DRAINING
+        self._adapter.set_draining(True)
+        drained = self._adapter.wait_drained(timeout)
+        self.stop()
+        return drained
 
     def stop(self) -> None:
         """
-        Stop UDE Server.
+        Stop UDE Server, and close the adapter with the environment copies.
         """
+        self._state = RunnerState.STOPPED
         self._ude_server.close()
+        self._adapter.close()
+        if self._env_pool is not None:
+            self._env_pool.close()
 
     def spin(self) -> None:
         """
@@ -96,10 +372,10 @@ class GymEnvRemoteRunner(object):
         self._ude_server.spin()
 
 
-def main():
-    gym_env = GymEnvRemoteRunner()
-    gym_env.start()
-    gym_env.spin()
+def main(argv: Optional[List[str]] = None) -> None:
+    # Imported here, as the launcher imports this module.
+    from ude_gym_bridge.launcher import main as launcher_main
+    launcher_main(argv)
 
 
 if __name__ == '__main__':
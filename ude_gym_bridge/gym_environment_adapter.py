@@ -14,8 +14,15 @@
 #   limitations under the License.                                              #
 #################################################################################
 """A class for Gym Environment Adapter to bridge OpenAI Gym environment to UDE."""
-from typing import Dict
-from threading import RLock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from threading import BoundedSemaphore, Condition, Lock, RLock, Event, Thread
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import copy
+import functools
+import json
+import logging
+import time
 
 from gym import Space
 
@@ -25,7 +32,39 @@ from ude import (
     AbstractSideChannel, SingleSideChannel, AgentID,
     SideChannelData, SideChannelObserverInterface
 )
+from ude_gym_bridge.subprocess_gym_env import SubprocessGymEnv
+from ude_gym_bridge.gym_env_pool import GymEnvPool
+from ude_gym_bridge.gym_registry_index import GymRegistryIndex
+from ude_gym_bridge.step_profiler import StepProfiler
+from ude_gym_bridge.observation_encoding import ObservationEncoder
+from ude_gym_bridge.episode_recorder import EpisodeRecorder
+from ude_gym_bridge.env_state import get_env_state, set_env_state
+from ude_gym_bridge.frame_capture import FrameCapture
+from ude_gym_bridge.adaptive_step_scheduler import AdaptiveStepScheduler
+from ude_gym_bridge.action_batch import ActionBatchDecoder, BATCH_ACTION_KEY
+from ude_gym_bridge.preprocessing import PreprocessingPipeline
+from ude_gym_bridge.seeding import SeedSchedule, reset_env
+from ude_gym_bridge.gym_wrappers import env_wrapper_key, make_env_wrapper, unwrap_env
+from ude_gym_bridge.space_snapshot import SpaceSnapshot
+from ude_gym_bridge.trajectory_buffer import TrajectoryBuffer, make_action_source
 import gym
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AdapterSaturatedError(RuntimeError):
+    """
+    Error raised when the request queue of the adapter is full (backpressure).
+    """
+    pass
+
+
+class AdapterDrainingError(RuntimeError):
+    """
+    Error raised when new episode is requested while the adapter is draining.
+    """
+    pass
 
 
 class GymEnvironmentAdapter(UDEEnvironmentAdapterInterface,
@@ -36,7 +75,28 @@ class GymEnvironmentAdapter(UDEEnvironmentAdapterInterface,
     def __init__(self,
                  env_name: str = "CartPole-v0",
                  agent_name: str = "agent0",
-                 render: bool = False):
+                 render: bool = False,
+                 num_envs: int = 1,
+                 use_subprocess: bool = False,
+                 async_render: bool = False,
+                 env_pool: Optional[GymEnvPool] = None,
+                 lazy_init: bool = False,
+                 profile: bool = False,
+                 profile_dump_interval: Optional[float] = None,
+                 observation_encoder: Optional[ObservationEncoder] = None,
+                 frame_skip: int = 1,
+                 max_pool_frames: bool = False,
+                 frame_stack: int = 1,
+                 rollout_horizon: int = 0,
+                 auto_reset: bool = False,
+                 recorder: Optional[EpisodeRecorder] = None,
+                 max_snapshots: int = 16,
+                 frame_capture: Optional[FrameCapture] = None,
+                 step_scheduler: Optional[AdaptiveStepScheduler] = None,
+                 preprocessing: Optional[PreprocessingPipeline] = None,
+                 request_queue_size: int = 0,
+                 request_queue_timeout: float = 0.0,
+                 seed: Optional[int] = None):
         """
         Initialize GymEnvironmentAdapter
 
@@ -44,34 +104,445 @@ class GymEnvironmentAdapter(UDEEnvironmentAdapterInterface,
             env_name (str): OpenAI Gym environment name.
             agent_name (str): Name of agent to use.
             render (bool): the flag to render OpenAI Gym environment or not.
+            num_envs (int): the number of OpenAI Gym environment copies to host.
+                When more than one copy is hosted, the copies are exposed as agents
+                agent0 ... agent{num_envs - 1} and agent_name is ignored.
+            use_subprocess (bool): the flag to host each OpenAI Gym environment copy in
+                a worker subprocess, so the copies are stepped in parallel.
+            async_render (bool): the flag to render on a background thread, so step and reset
+                return without waiting for render. The pending render is completed before
+                the environment is accessed again.
+            env_pool (Optional[GymEnvPool]): the pool of pre-constructed OpenAI Gym environments.
+                When given, environments are taken from the pool, and replaced environments
+                are returned to the pool instead of being closed.
+            lazy_init (bool): the flag to construct and reset OpenAI Gym environment in a
+                background thread, so the constructor returns immediately. Accessing the
+                environment waits until the construction is completed.
+            profile (bool): the flag to record timing histograms per step phase (lock_wait,
+                simulate, render, pack) and episode stats. The stats can be queried through
+                side channel with "stats" key.
+            profile_dump_interval (Optional[float]): the interval in seconds to log the stats
+                periodically (used only with profile).
+            observation_encoder (Optional[ObservationEncoder]): the encoder applied to the
+                observations returned by step and reset (e.g. shared-memory handoff).
+                UDE clients decode them with ObservationDecoder.
+            frame_skip (int): the number of frames to repeat each action on the server.
+                The rewards of repeated frames are summed.
+            max_pool_frames (bool): the flag to max-pool the last two frames of repeated action.
+            frame_stack (int): the number of last observations to stack on the server.
+                The observation space becomes (frame_stack, *original shape).
+            rollout_horizon (int): the maximum number of steps to execute per step request
+                (0 to disable). When enabled, the action of each agent is a sequence of actions
+                or a policy spec dict, and step returns the trajectory as arrays.
+                The horizon can be changed through side channel with "rollout_horizon" key.
+            auto_reset (bool): the flag to reset a single hosted environment automatically on done,
+                as the copies are when num_envs is more than one.
+            recorder (Optional[EpisodeRecorder]): the recorder to append the transitions of step and
+                reset to. The recorder is closed with the adapter.
+            max_snapshots (int): the maximum number of environment state snapshots to keep.
+                Snapshots are taken through side channel with "snapshot" key, and reset restores
+                the snapshot selected with "restore" key instead of resetting the environment.
+            frame_capture (Optional[FrameCapture]): the offscreen capture of rgb_array frames of the first
+                environment copy after step and reset, independent of render. The latest frame and the
+                frame stream can be queried through side channel with "frame" and "frames" keys.
+                The capture is closed with the adapter.
+            step_scheduler (Optional[AdaptiveStepScheduler]): the scheduler to report the number of actions
+                arrived and the cost of each step to. The chosen step invoke period and timeout can be
+                queried through side channel with "schedule" key.
+            preprocessing (Optional[PreprocessingPipeline]): the pipeline transforming the observations and
+                rewards of step and reset (e.g. grayscale, resize, normalization, reward clipping).
+                Each frame is transformed inside the wrapper chain after action repeat and before frame
+                stacking. Subprocess copies run their own copy of the pipeline in the worker subprocesses,
+                so the running statistics of normalization are kept per copy and not reported through
+                side channel. The observation space reports the transformed observations. The pipeline can
+                be replaced through side channel with "preprocess" key, taking effect at next reset (which
+                also drops the snapshots and rewraps the copies).
+            request_queue_size (int): the maximum number of step and reset requests in flight (waiting
+                for or holding the environment) before new requests are rejected with AdapterSaturatedError
+                (0 for unlimited).
+            request_queue_timeout (float): the maximum wait time in seconds for a place in the full
+                request queue before rejecting the request.
+            seed (Optional[int]): the root seed to derive the seed of each episode of each copy from
+                (None to leave the environments unseeded). The seeds of the episodes started by reset
+                are returned in the reset info, and the seed of an automatically started episode in the
+                step info. The episodes are counted from zero at the first reset, so the episodes match
+                the ones of the same seed set through side channel with "seed" key, which replaces the
+                root seed at next reset.
         """
         super().__init__()
+        if num_envs < 1:
+            raise ValueError("num_envs must be at least 1: {}".format(num_envs))
+        if rollout_horizon < 0:
+            raise ValueError("rollout_horizon must not be negative: {}".format(rollout_horizon))
+        self._num_envs = num_envs
+        self._rollout_horizon = rollout_horizon
+        self._auto_reset = auto_reset or num_envs > 1
+        self._use_subprocess = use_subprocess
+        self._env_pool = env_pool
+        self._frame_skip = frame_skip
+        self._max_pool_frames = max_pool_frames
+        self._frame_stack = frame_stack
+        self._preprocessing = None  # type: Optional[PreprocessingPipeline]
+        self._env_wrapper = None
+        self._pool_env_factory = None
+        self._pool_variant = None  # type: Optional[Tuple[str, Optional[str]]]
+        self._set_env_wrapper(preprocessing)
+        # Pending pipeline to replace the current one at next reset.
+        self._pending_preprocessing = None  # type: Optional[PreprocessingPipeline]
         self._env_name = env_name
-        self._env = gym.make(env_name)
-        self._env.reset()
-        self._new_env = None
-        self._new_env_name = None
+        self._envs = []  # type: List[gym.Env]
+        # Immutable snapshot of the spaces, replaced as a whole on swap.
+        self._spaces = SpaceSnapshot({}, {})
+        # Pending (env_name, envs) to replace the current ones at next reset.
+        self._pending_envs = None  # type: Optional[Tuple[str, List[gym.Env]]]
+        self._pending_lock = Lock()
 
         self._render = render
+        self._render_executor = ThreadPoolExecutor(max_workers=1) if render and async_render else None
+        self._render_future = None
+        self._frame_capture = frame_capture
+        # Set when the pending frame capture no longer accesses the environment.
+        self._capture_released = None  # type: Optional[Event]
+
+        self._registry_index = GymRegistryIndex.get_instance()
 
-        all_envs = gym.envs.registry.all()
-        self._env_ids = [env_spec.id for env_spec in all_envs]
+        self._observation_encoder = observation_encoder
+        self._recorder = recorder
+        self._step_scheduler = step_scheduler
+        # (space version, decoder) of the stacked actions of all agents.
+        self._action_batch_decoder = None  # type: Optional[Tuple[str, ActionBatchDecoder]]
+        self._seed_schedule = SeedSchedule(seed, num_envs) if seed is not None else None
+        # Pending schedule to replace the current one at next reset, valid when _seed_pending is set.
+        # With the seed given, the episodes are counted from zero again at the first reset after
+        # the construction resets, the same as with the seed set by set_seed.
+        self._pending_seed_schedule = SeedSchedule(seed, num_envs) if seed is not None else None
+        self._seed_pending = seed is not None
+
+        # Snapshots of (env_name, env states, observations) with snapshot name as key.
+        self._snapshots = OrderedDict()  # type: OrderedDict[str, Tuple[str, List[Dict[str, Any]], MultiAgentDict]]
+        self._max_snapshots = max_snapshots
+        self._restore_name = None  # type: Optional[str]
+        self._last_obs = {}  # type: MultiAgentDict
+
+        self._profiler = StepProfiler() if profile else None
+        self._episode_lengths = {}  # type: Dict[AgentID, int]
+        self._episode_rewards = {}  # type: Dict[AgentID, float]
+        if self._profiler and profile_dump_interval:
+            self._profiler.start_periodic_dump(profile_dump_interval)
 
         self._side_channel = SingleSideChannel()
         self._side_channel.register(self)
         self._agent_name = agent_name or "agent0"
+        if num_envs == 1:
+            self._agent_names = [self._agent_name]
+        else:
+            self._agent_names = ["agent{}".format(idx) for idx in range(num_envs)]
+        # Held only around accessing the simulators (step, reset, render, close).
         self._lock = RLock()
 
+        # Bounded request queue: requests in flight are counted, and rejected when the queue is full.
+        if request_queue_size < 0:
+            raise ValueError("request_queue_size must not be negative: {}".format(request_queue_size))
+        self._request_slots = BoundedSemaphore(request_queue_size) if request_queue_size > 0 else None
+        self._request_queue_size = request_queue_size
+        self._request_queue_timeout = request_queue_timeout
+        self._queue_lock = Lock()
+        self._queue_depth = 0
+        self._max_queue_depth = 0
+        self._rejected_requests = 0
+
+        # Agents in an unfinished episode, guarded by the lock, and notified when drained.
+        self._active_episodes = set()  # type: set
+        self._finished_while_draining = set()  # type: set
+        self._draining = False
+        self._drain_condition = Condition(self._lock)
+        self._closed = False
+        # Number of environment copy steps performed, including the steps of rollouts.
+        self._step_count = 0
+
+        self._ready = Event()
+        self._init_error = None
+        self._startup_times = {}  # type: Dict[str, float]
+        if lazy_init:
+            Thread(target=self._init_envs, daemon=True).start()
+        else:
+            self._init_envs()
+            self._wait_ready()
+
+    def _init_envs(self) -> None:
+        """
+        Construct and reset the OpenAI Gym environment copies, and record the time taken.
+        """
+        envs = []  # type: List[gym.Env]
+        try:
+            start_time = time.perf_counter()
+            envs = self._make_envs(self._env_name)
+            self._startup_times["env_make"] = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            for env_idx, env in enumerate(envs):
+                reset_env(env, self._next_seed(env_idx))
+            self._startup_times["env_reset"] = time.perf_counter() - start_time
+            self._spaces = self._snapshot_spaces(envs)
+            self._envs = envs
+        except Exception as ex:
+            self._init_error = ex
+            # The copies built before the error are not used, and their worker subprocesses are stopped.
+            self._close_envs(envs)
+        finally:
+            self._ready.set()
+
+    def _wait_ready(self) -> None:
+        """
+        Wait until the OpenAI Gym environment copies are constructed.
+        Raises the error occurred during the construction if there is any.
+        """
+        self._ready.wait()
+        if self._init_error:
+            raise self._init_error
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        Returns the flag whether the OpenAI Gym environment copies are constructed.
+
+        Returns:
+            bool: True if the OpenAI Gym environment copies are constructed, False otherwise.
+        """
+        return self._ready.is_set()
+
+    @property
+    def startup_times(self) -> Dict[str, float]:
+        """
+        Returns the time taken in seconds by each startup phase.
+
+        Returns:
+            Dict[str, float]: the time taken in seconds with phase name as key.
+        """
+        return dict(self._startup_times)
+
+    def _set_env_wrapper(self, preprocessing: Optional[PreprocessingPipeline]) -> None:
+        """
+        Set the preprocessing pipeline and the wrappers of the copies made from now on.
+        The pipeline transforms each frame inside the wrapper chain, before the frames are stacked.
+
+        Args:
+            preprocessing (Optional[PreprocessingPipeline]): the pipeline (None or identity pipeline to disable).
+        """
+        self._preprocessing = preprocessing if preprocessing and not preprocessing.is_identity else None
+        self._env_wrapper = make_env_wrapper(frame_skip=self._frame_skip,
+                                             max_pool=self._max_pool_frames,
+                                             frame_stack=self._frame_stack,
+                                             preprocessing=self._preprocessing)
+        # Pooled in-process copies are kept unwrapped and wrapped after being taken out, while
+        # subprocess copies run the wrappers in the worker, so they are pooled per wrapper config.
+        self._pool_env_factory = None
+        self._pool_variant = None
+        if self._use_subprocess:
+            self._pool_env_factory = functools.partial(SubprocessGymEnv, env_wrapper=self._env_wrapper)
+            self._pool_variant = ("subprocess", env_wrapper_key(self._env_wrapper))
+
+    def _is_stale(self, env: gym.Env) -> bool:
+        """
+        Returns the flag whether given subprocess copy runs other wrappers than the current ones.
+
+        Args:
+            env (gym.Env): the OpenAI Gym environment copy.
+
+        Returns:
+            bool: True if the copy is a subprocess copy wrapped differently, False otherwise.
+        """
+        return (isinstance(env, SubprocessGymEnv)
+                and env_wrapper_key(env.env_wrapper) != env_wrapper_key(self._env_wrapper))
+
+    def _make_env(self, env_name: str) -> gym.Env:
+        """
+        Create an OpenAI Gym environment copy to host.
+
+        Args:
+            env_name (str): OpenAI Gym environment name.
+
+        Returns:
+            gym.Env: newly created OpenAI Gym environment.
+        """
+        if self._env_pool is not None:
+            env = self._env_pool.acquire(env_name, env_factory=self._pool_env_factory, variant=self._pool_variant)
+        elif self._use_subprocess:
+            env = SubprocessGymEnv(env_name, env_wrapper=self._env_wrapper)
+        else:
+            env = gym.make(env_name)
+        # Wrappers of subprocess copies run inside the worker subprocesses, next to the simulator.
+        if self._env_wrapper and not isinstance(env, SubprocessGymEnv):
+            env = self._env_wrapper(env)
+        return env
+
+    def _make_envs(self, env_name: str) -> List[gym.Env]:
+        """
+        Create the OpenAI Gym environment copies to host.
+
+        Args:
+            env_name (str): OpenAI Gym environment name.
+
+        Returns:
+            List[gym.Env]: the list of newly created OpenAI Gym environments.
+        """
+        envs = []  # type: List[gym.Env]
+        try:
+            for _ in range(self._num_envs):
+                envs.append(self._make_env(env_name))
+        except Exception:
+            self._close_envs(envs)
+            raise
+        return envs
+
+    @staticmethod
+    def _close_envs(envs: List[gym.Env]) -> None:
+        """
+        Close the OpenAI Gym environment copies left unused by an error, logging the errors of closing.
+
+        Args:
+            envs (List[gym.Env]): the OpenAI Gym environment copies to close.
+        """
+        for env in envs:
+            try:
+                env.close()
+            except Exception:
+                logger.exception("Failed to close environment copy.")
+
+    def _rewrap_envs(self, env_name: str, envs: List[gym.Env]) -> List[gym.Env]:
+        """
+        Wrap the copies with the current wrappers in place of the ones they were made with.
+        Subprocess copies wrapped differently are closed and made again.
+
+        Args:
+            env_name (str): OpenAI Gym environment name of the copies.
+            envs (List[gym.Env]): the OpenAI Gym environment copies.
+
+        Returns:
+            List[gym.Env]: the copies with the current wrappers.
+        """
+        rewrapped = []
+        for env in envs:
+            if isinstance(env, SubprocessGymEnv):
+                if self._is_stale(env):
+                    env.close()
+                    env = self._make_env(env_name)
+            else:
+                env = unwrap_env(env)
+                if self._env_wrapper:
+                    env = self._env_wrapper(env)
+            rewrapped.append(env)
+        return rewrapped
+
+    def warm_pool(self, env_names: List[str]) -> None:
+        """
+        Pre-construct the copies of given environments in the pool in background,
+        constructed the way this adapter hosts them.
+
+        Args:
+            env_names (List[str]): OpenAI Gym environment names to warm.
+        """
+        if self._env_pool is not None and env_names:
+            self._env_pool.warm(env_names, count=self._num_envs,
+                                env_factory=self._pool_env_factory, variant=self._pool_variant)
+
+    def _discard_envs(self, env_name: str, envs: List[gym.Env]) -> None:
+        """
+        Return the OpenAI Gym environment copies no longer used to the pool,
+        or close them if there is no pool.
+
+        Args:
+            env_name (str): OpenAI Gym environment name of the copies.
+            envs (List[gym.Env]): the OpenAI Gym environment copies to discard.
+        """
+        for env in envs:
+            # Subprocess copies made with previous wrappers are not pooled under the current config.
+            if self._env_pool is not None and not self._is_stale(env):
+                self._env_pool.release(env_name, unwrap_env(env), variant=self._pool_variant)
+            else:
+                env.close()
+
+    def _set_new_envs(self, env_name: str) -> None:
+        """
+        Prepare the OpenAI Gym environment copies to replace the current ones at next reset.
+        The copies are constructed without holding the lock, so stepping is not blocked,
+        and then swapped in as pending atomically.
+
+        Args:
+            env_name (str): new OpenAI Gym environment name.
+        """
+        new_envs = self._make_envs(env_name)
+        with self._pending_lock:
+            prev_pending_envs = self._pending_envs
+            self._pending_envs = (env_name, new_envs)
+        if prev_pending_envs:
+            self._discard_envs(*prev_pending_envs)
+
+    def _snapshot_spaces(self, envs: List[gym.Env]) -> SpaceSnapshot:
+        """
+        Returns the snapshot of observation and action spaces of given copies.
+
+        Args:
+            envs (List[gym.Env]): the OpenAI Gym environment copies.
+
+        Returns:
+            SpaceSnapshot: the snapshot of the spaces with agent name as key.
+        """
+        return SpaceSnapshot({agent_name: env.observation_space for agent_name, env in zip(self._agent_names, envs)},
+                             {agent_name: env.action_space for agent_name, env in zip(self._agent_names, envs)})
+
     @property
     def env(self) -> gym.Env:
         """
         Returns the current OpenAI Gym environment.
+        In case multiple copies are hosted, the first copy is returned.
 
         Returns:
             gym.Env: the current OpenAI Gym environment.
         """
-        with self._lock:
-            return self._env
+        self._wait_ready()
+        return self._envs[0]
+
+    @property
+    def envs(self) -> List[gym.Env]:
+        """
+        Returns all OpenAI Gym environment copies hosted.
+
+        Returns:
+            List[gym.Env]: the current OpenAI Gym environment copies.
+        """
+        self._wait_ready()
+        return list(self._envs)
+
+    @property
+    def profiler(self) -> Optional[StepProfiler]:
+        """
+        Returns the step profiler if profiling is enabled.
+
+        Returns:
+            Optional[StepProfiler]: the step profiler, or None if profiling is disabled.
+        """
+        return self._profiler
+
+    @property
+    def step_count(self) -> int:
+        """
+        Returns the number of steps performed on the environment copies, counting each copy
+        stepped and each step of a rollout. The count is kept without profiling.
+
+        Returns:
+            int: the number of environment copy steps.
+        """
+        return self._step_count
+
+    @property
+    def num_envs(self) -> int:
+        """
+        Returns the number of OpenAI Gym environment copies hosted.
+
+        Returns:
+            int: the number of OpenAI Gym environment copies hosted.
+        """
+        return self._num_envs
 
     @property
     def env_name(self) -> str:
@@ -91,8 +562,7 @@ class GymEnvironmentAdapter(UDEEnvironmentAdapterInterface,
         Args:
             value (str): new OpenAI Gym environment name.
         """
-        self._new_env = gym.make(value)
-        self._new_env_name = value
+        self._set_new_envs(value)
 
     def step(self, action_dict: MultiAgentDict) -> UDEStepResult:
         """
@@ -100,48 +570,753 @@ class GymEnvironmentAdapter(UDEEnvironmentAdapterInterface,
         observation(s), reward(s), done(s), action(s) taken,
         and info (if there is any).
 
+        In case multiple copies are hosted, every copy with an action in action_dict
+        is advanced, and a copy that reaches done is automatically reset (so is a single
+        environment with auto_reset). Then the observation returned for the copy is the
+        first observation of the new episode, and the last observation of the finished
+        episode is stored in the copy's info with "terminal_observation" key.
+
+        With rollout_horizon, the action of each agent is a sequence of actions, a scalar
+        action repeated over the horizon, or a policy spec dict ({"policy": "random"} or
+        {"policy": "constant", "action": action}, optionally limited by "steps"). Up to
+        rollout_horizon steps are executed until the actions run out or the episode is done,
+        and the environment is automatically reset on done as above. Then observation, reward,
+        done and last_action of each agent are arrays with time as the first dimension, and
+        info is the list of step infos (with agent name as key in case multiple copies are hosted).
+
+        Args:
+            action_dict (MultiAgentDict): the action for the agent with agent_name as key.
+
+        Returns:
+            UDEStepResult: observation, reward, done, last_action, info
+
+        Raises:
+            AdapterSaturatedError: if the request queue is full.
+        """
+        self._wait_ready()
+        self._enter_queue()
+        try:
+            return self._step(action_dict)
+        finally:
+            self._leave_queue()
+
+    def _step(self, action_dict: MultiAgentDict) -> UDEStepResult:
+        """
+        Performs one step (or rollout) with given action under the lock.
+
         Args:
             action_dict (MultiAgentDict): the action for the agent with agent_name as key.
 
         Returns:
             UDEStepResult: observation, reward, done, last_action, info
         """
+        profiler = self._profiler
+        lap_time = time.perf_counter() if profiler else 0.0
         with self._lock:
-            action = action_dict[list(action_dict.keys())[0]]
-            obs, reward, done, info = self._env.step(action)
-            if self._render:
-                self._env.render()
-            return ({self._agent_name: obs}, {self._agent_name: reward}, {self._agent_name: done},
-                    {self._agent_name: action}, info)
+            if profiler:
+                lap_time = profiler.lap("lock_wait", lap_time)
+            step_start_time = time.perf_counter() if self._step_scheduler else 0.0
+            if self._render_future or self._capture_released:
+                self._wait_render()
+                if profiler:
+                    lap_time = profiler.lap("render_wait", lap_time)
+            rollout_horizon = self._rollout_horizon
+            rollout = rollout_horizon > 0
+            if not rollout and BATCH_ACTION_KEY in action_dict:
+                action_dict = self._decode_action_batch(action_dict[BATCH_ACTION_KEY])
+            if rollout:
+                step_result = self._rollout(action_dict, rollout_horizon)
+                if profiler:
+                    lap_time = profiler.lap("simulate", lap_time)
+                self._render_env()
+                if profiler:
+                    lap_time = profiler.lap("render", lap_time)
+            elif self._num_envs > 1:
+                if self._use_subprocess:
+                    results = self._step_subprocess_envs(action_dict)
+                else:
+                    results = self._step_envs(action_dict)
+                if profiler:
+                    lap_time = profiler.lap("simulate", lap_time)
+                self._render_env()
+                if profiler:
+                    lap_time = profiler.lap("render", lap_time)
+                self._step_count += len(results)
+                step_result = self._pack_step_results(results)
+            else:
+                env = self._envs[0]
+                action = next(iter(action_dict.values()))
+                obs, reward, done, info = env.step(action)
+                if done and self._auto_reset:
+                    info = dict(info)
+                    info["terminal_observation"] = obs
+                    seed = self._next_seed(0)
+                    if seed is not None:
+                        info["episode_seed"] = seed
+                    obs = reset_env(env, seed)
+                self._step_count += 1
+                if profiler:
+                    lap_time = profiler.lap("simulate", lap_time)
+                self._render_env()
+                if profiler:
+                    lap_time = profiler.lap("render", lap_time)
+                agent_name = self._agent_name
+                step_result = ({agent_name: obs}, {agent_name: reward}, {agent_name: done},
+                               {agent_name: action}, info)
+            self._track_episodes(step_result[2])
+            if not rollout:
+                self._last_obs.update(step_result[0])
+            if self._recorder and not rollout:
+                self._record_steps(step_result)
+            if self._observation_encoder:
+                # Each trajectory is encoded as a whole, so it starts a new encoding sequence.
+                done_dict = None if rollout else step_result[2]
+                step_result = (self._encode_observations(step_result[0], done_dict),) + step_result[1:]
+            if profiler:
+                profiler.lap("pack", lap_time)
+                if not rollout:
+                    self._record_episodes(step_result[1], step_result[2])
+            if self._step_scheduler:
+                self._step_scheduler.record_step(num_actions=len(action_dict),
+                                                 num_agents=len(self._agent_names),
+                                                 step_cost=time.perf_counter() - step_start_time)
+            return step_result
+
+    def _rollout(self, action_dict: MultiAgentDict, horizon: int) -> UDEStepResult:
+        """
+        Performs up to rollout_horizon steps on every hosted copy that has an action
+        sequence or policy spec in action_dict, and collects the trajectories.
+        Copies are stepped together at each step index, so subprocess copies are
+        simulated in parallel. A copy stops at done or when its actions run out.
+
+        Args:
+            action_dict (MultiAgentDict): the action sequences or policy specs with agent name as key.
+            horizon (int): the maximum number of steps to perform.
+
+        Returns:
+            UDEStepResult: the trajectories of observation, reward, done, last_action, info
+                with agent name as key. With a single environment, info is the list of step
+                infos as is.
+        """
+        if self._num_envs == 1:
+            action_dict = {self._agent_name: next(iter(action_dict.values()))}
+        sources = {agent_name: make_action_source(action_dict[agent_name], env.action_space, horizon)
+                   for agent_name, env in zip(self._agent_names, self._envs)
+                   if agent_name in action_dict}
+        buffers = {agent_name: TrajectoryBuffer(horizon) for agent_name in sources}
+        for idx in range(horizon):
+            step_actions = {}
+            for agent_name, source in list(sources.items()):
+                action = source(idx)
+                if action is None:
+                    del sources[agent_name]
+                else:
+                    step_actions[agent_name] = action
+            if not step_actions:
+                break
+            if self._use_subprocess:
+                results = self._step_subprocess_envs(step_actions)
+            else:
+                results = self._step_envs(step_actions)
+            self._step_count += len(results)
+            for agent_name, action, obs, reward, done, info in results:
+                buffers[agent_name].append(obs, action, reward, done, info)
+                self._last_obs[agent_name] = obs
+                if self._recorder:
+                    self._recorder.record_step(agent_name, action, obs, reward, done, new_episode=done,
+                                               terminal_obs=info.get("terminal_observation"))
+                if done:
+                    del sources[agent_name]
+                if self._profiler:
+                    self._record_episodes({agent_name: reward}, {agent_name: done})
+
+        obs_dict, reward_dict, done_dict, last_action_dict, info_dict = {}, {}, {}, {}, {}
+        for agent_name, buffer in buffers.items():
+            (obs_dict[agent_name], reward_dict[agent_name], done_dict[agent_name],
+             last_action_dict[agent_name], info_dict[agent_name]) = buffer.arrays()
+        if self._num_envs == 1:
+            # A single environment returns its info as is, as in a regular step.
+            return obs_dict, reward_dict, done_dict, last_action_dict, info_dict.get(self._agent_name, [])
+        return obs_dict, reward_dict, done_dict, last_action_dict, info_dict
+
+    def _step_envs(self, action_dict: MultiAgentDict) -> List[tuple]:
+        """
+        Performs one step on every hosted copy that has an action in action_dict.
+
+        Args:
+            action_dict (MultiAgentDict): the actions for the copies with agent name as key.
+
+        Returns:
+            List[tuple]: agent name, action, observation, reward, done, info of each copy stepped.
+        """
+        results = []
+        for env_idx, (agent_name, env) in enumerate(zip(self._agent_names, self._envs)):
+            if agent_name not in action_dict:
+                continue
+            action = action_dict[agent_name]
+            obs, reward, done, info = env.step(action)
+            if done:
+                info = dict(info)
+                info["terminal_observation"] = obs
+                seed = self._next_seed(env_idx)
+                if seed is not None:
+                    info["episode_seed"] = seed
+                obs = reset_env(env, seed)
+            results.append((agent_name, action, obs, reward, done, info))
+        return results
+
+    def _step_subprocess_envs(self, action_dict: MultiAgentDict) -> List[tuple]:
+        """
+        Performs one step on every hosted subprocess copy that has an action in action_dict.
+        The actions are sent to all worker subprocesses first, and then the results are
+        collected, so the copies are simulated in parallel.
+
+        Args:
+            action_dict (MultiAgentDict): the actions for the copies with agent name as key.
+
+        Returns:
+            List[tuple]: agent name, action, observation, reward, done, info of each copy stepped.
+        """
+        stepped = [(env_idx, agent_name, env)
+                   for env_idx, (agent_name, env) in enumerate(zip(self._agent_names, self._envs))
+                   if agent_name in action_dict]
+        for _, agent_name, env in stepped:
+            env.step_async(action_dict[agent_name])
+        step_results = self._wait_all([env.step_wait for _, _, env in stepped])
+
+        results = []
+        resetting = []
+        for (env_idx, agent_name, env), (obs, reward, done, info) in zip(stepped, step_results):
+            if done:
+                info = dict(info)
+                info["terminal_observation"] = obs
+                seed = self._next_seed(env_idx)
+                if seed is not None:
+                    info["episode_seed"] = seed
+                env.reset_async(seed)
+                resetting.append((len(results), env))
+            results.append((agent_name, action_dict[agent_name], obs, reward, done, info))
+        reset_obs = self._wait_all([env.reset_wait for _, env in resetting])
+        for (idx, _), obs in zip(resetting, reset_obs):
+            agent_name, action, _, reward, done, info = results[idx]
+            results[idx] = (agent_name, action, obs, reward, done, info)
+        return results
+
+    @staticmethod
+    def _wait_all(waits: List[Callable[[], Any]]) -> List[Any]:
+        """
+        Wait for the replies of the commands issued to the subprocess copies. Every reply is
+        received before an error is raised, so no reply is left in the pipe to be taken as
+        the reply of a later command.
+
+        Args:
+            waits (List[Callable[[], Any]]): the functions waiting for the reply of each copy.
+
+        Returns:
+            List[Any]: the reply of each copy.
+
+        Raises:
+            Exception: the first error raised by the copies.
+        """
+        replies = []
+        error = None
+        for wait in waits:
+            try:
+                replies.append(wait())
+            except Exception as ex:
+                replies.append(None)
+                if error is None:
+                    error = ex
+        if error is not None:
+            raise error
+        return replies
+
+    def _decode_action_batch(self, batch: Any) -> MultiAgentDict:
+        """
+        Split the stacked actions of all agents validated against the current action space.
+
+        Args:
+            batch (Any): the stacked actions with the agents as the first dimension.
+
+        Returns:
+            MultiAgentDict: the action for each agent with agent name as key.
+        """
+        spaces = self._spaces
+        if self._action_batch_decoder is None or self._action_batch_decoder[0] != spaces.version:
+            action_space = spaces.action_spaces[self._agent_names[0]]
+            self._action_batch_decoder = (spaces.version, ActionBatchDecoder(self._agent_names, action_space))
+        return self._action_batch_decoder[1].decode(batch)
+
+    def _pack_step_results(self, results: List[tuple]) -> UDEStepResult:
+        """
+        Pack the step results of hosted copies into UDEStepResult.
+        The result dicts are new per step, as the previous result may still be serialized.
+
+        Args:
+            results (List[tuple]): agent name, action, observation, reward, done, info of each copy stepped.
+
+        Returns:
+            UDEStepResult: observation, reward, done, last_action, info with agent name as key.
+        """
+        step_result = obs_dict, reward_dict, done_dict, last_action_dict, info_dict = {}, {}, {}, {}, {}
+        for agent_name, action, obs, reward, done, info in results:
+            obs_dict[agent_name] = obs
+            reward_dict[agent_name] = reward
+            done_dict[agent_name] = done
+            last_action_dict[agent_name] = action
+            info_dict[agent_name] = info
+        return step_result
+
+    def _encode_observations(self,
+                             obs_dict: MultiAgentDict,
+                             done_dict: Optional[MultiAgentDict] = None) -> MultiAgentDict:
+        """
+        Encode the observations with the observation encoder.
+
+        Args:
+            obs_dict (MultiAgentDict): the observations with agent name as key.
+            done_dict (Optional[MultiAgentDict]): the dones with agent name as key. An observation
+                of a copy that is done (automatically reset) or of reset (None) starts new episode.
+
+        Returns:
+            MultiAgentDict: the encoded observations with agent name as key.
+        """
+        encoder = self._observation_encoder
+        if done_dict is None:
+            return {agent_name: encoder.encode(agent_name, obs, new_episode=True)
+                    for agent_name, obs in obs_dict.items()}
+        auto_reset = self._auto_reset
+        return {agent_name: encoder.encode(agent_name, obs,
+                                           new_episode=auto_reset and bool(done_dict.get(agent_name)))
+                for agent_name, obs in obs_dict.items()}
+
+    def _record_steps(self, step_result: UDEStepResult) -> None:
+        """
+        Append the transitions of the step to the recorder.
+
+        Args:
+            step_result (UDEStepResult): observation, reward, done, last_action, info of the step.
+        """
+        obs_dict, reward_dict, done_dict, last_action_dict, info = step_result
+        for agent_name, obs in obs_dict.items():
+            done = done_dict[agent_name]
+            agent_info = info if self._num_envs == 1 else info.get(agent_name, {})
+            self._recorder.record_step(agent_name, last_action_dict[agent_name], obs,
+                                       reward_dict[agent_name], done,
+                                       new_episode=self._auto_reset and bool(done),
+                                       terminal_obs=agent_info.get("terminal_observation"))
+
+    def _record_episodes(self, reward_dict: MultiAgentDict, done_dict: MultiAgentDict) -> None:
+        """
+        Accumulate episode length and reward per agent, and record finished episodes to profiler.
+
+        Args:
+            reward_dict (MultiAgentDict): the rewards with agent name as key.
+            done_dict (MultiAgentDict): the dones with agent name as key.
+        """
+        for agent_name, reward in reward_dict.items():
+            self._episode_lengths[agent_name] = self._episode_lengths.get(agent_name, 0) + 1
+            self._episode_rewards[agent_name] = self._episode_rewards.get(agent_name, 0.0) + reward
+            if done_dict.get(agent_name):
+                self._profiler.record_episode(self._episode_lengths.pop(agent_name),
+                                              self._episode_rewards.pop(agent_name))
 
     def reset(self) -> UDEResetResult:
         """
         Reset the environment and start new episode.
         Also, returns the first observation for new episode started.
 
+        Returns:
+            UDEResetResult: first observation and info in new episode.
+
+        Raises:
+            AdapterDrainingError: if the adapter is draining.
+            AdapterSaturatedError: if the request queue is full.
+        """
+        self._wait_ready()
+        if self._draining:
+            raise AdapterDrainingError("The environment is draining, and no new episode is started.")
+        self._enter_queue()
+        try:
+            return self._reset()
+        finally:
+            self._leave_queue()
+
+    def _reset(self) -> UDEResetResult:
+        """
+        Reset the environment under the lock.
+
         Returns:
             UDEResetResult: first observation and info in new episode.
         """
+        profiler = self._profiler
+        lap_time = time.perf_counter() if profiler else 0.0
         with self._lock:
+            if profiler:
+                lap_time = profiler.lap("reset_lock_wait", lap_time)
+            self._wait_render()
             # If there is new environment to replace, replace it during reset.
-            if self._new_env:
-                if self._env:
-                    self._env.close()
-                self._env = self._new_env
-                self._env_name = self._new_env_name
-                self._new_env = None
-                self._new_env_name = None
-            obs = self._env.reset()
-            if self._render:
-                self._env.render()
-            return {self._agent_name: obs}, {}
+            with self._pending_lock:
+                pending_envs, self._pending_envs = self._pending_envs, None
+                pending_preprocessing, self._pending_preprocessing = self._pending_preprocessing, None
+                if self._seed_pending:
+                    self._seed_schedule, self._pending_seed_schedule = self._pending_seed_schedule, None
+                    self._seed_pending = False
+            prev_envs = None
+            if pending_envs:
+                prev_envs = (self._env_name, self._envs)
+                self._env_name, self._envs = pending_envs
+            if pending_preprocessing:
+                self._set_env_wrapper(pending_preprocessing)
+                # The observations kept in the snapshots are of the previous pipeline.
+                self._snapshots.clear()
+            if pending_envs or pending_preprocessing:
+                # The new copies may be made while the previous pipeline was in effect.
+                self._envs = self._rewrap_envs(self._env_name, self._envs)
+                self._spaces = self._snapshot_spaces(self._envs)
+            snapshot = self._snapshots.get(self._restore_name) if self._restore_name else None
+            info = {}  # type: Dict[str, Any]
+            if snapshot and snapshot[0] == self._env_name:
+                _, states, snapshot_obs = snapshot
+                for env, state in zip(self._envs, states):
+                    self._set_env_state(env, state)
+                obs_dict = copy.deepcopy(snapshot_obs)
+            else:
+                obs_dict = {}
+                episode_seeds = {}
+                for env_idx, (agent_name, env) in enumerate(zip(self._agent_names, self._envs)):
+                    seed = self._next_seed(env_idx)
+                    obs_dict[agent_name] = reset_env(env, seed)
+                    episode_seeds[agent_name] = seed
+                if self._seed_schedule:
+                    info = {"seed": self._seed_schedule.seed, "episode_seeds": episode_seeds}
+            self._last_obs = dict(obs_dict)
+            self._active_episodes = set(obs_dict)
+            self._render_env()
+            if self._recorder:
+                for agent_name, obs in obs_dict.items():
+                    self._recorder.record_reset(agent_name, obs)
+            if self._observation_encoder:
+                obs_dict = self._encode_observations(obs_dict)
+            if profiler:
+                profiler.lap("reset", lap_time)
+                self._episode_lengths.clear()
+                self._episode_rewards.clear()
+        # Replaced copies are returned to the pool or closed without holding the lock.
+        if prev_envs:
+            self._discard_envs(*prev_envs)
+        return obs_dict, info
+
+    def _next_seed(self, env_idx: int) -> Optional[int]:
+        """
+        Returns the seed of the next episode of given copy. Must be called with lock held
+        (or before the copies are shared).
+
+        Args:
+            env_idx (int): the index of the hosted copy.
+
+        Returns:
+            Optional[int]: the seed of the episode, or None if the environments are unseeded.
+        """
+        seed_schedule = self._seed_schedule
+        return seed_schedule.next_seed(env_idx) if seed_schedule else None
+
+    @property
+    def seed_schedule(self) -> Optional[SeedSchedule]:
+        """
+        Returns the schedule of the episode seeds in use.
+
+        Returns:
+            Optional[SeedSchedule]: the schedule of the episode seeds, or None if unseeded.
+        """
+        return self._seed_schedule
+
+    def set_seed(self, seed: Optional[int]) -> None:
+        """
+        Set the root seed to derive the episode seeds from at next reset.
+        The episodes of every copy are counted from zero again, so the episodes
+        from the reset are reproduced by setting the same seed.
+
+        Args:
+            seed (Optional[int]): the root seed, or None to stop seeding.
+        """
+        seed_schedule = SeedSchedule(seed, self._num_envs) if seed is not None else None
+        with self._pending_lock:
+            self._pending_seed_schedule = seed_schedule
+            self._seed_pending = True
+
+    def _enter_queue(self) -> None:
+        """
+        Take a place in the request queue.
+
+        Raises:
+            AdapterSaturatedError: if the request queue stays full for request_queue_timeout.
+        """
+        request_slots = self._request_slots
+        if request_slots is not None and not request_slots.acquire(timeout=self._request_queue_timeout):
+            with self._queue_lock:
+                self._rejected_requests += 1
+            raise AdapterSaturatedError("The request queue is full ({} requests in flight)."
+                                        .format(self._request_queue_size))
+        with self._queue_lock:
+            self._queue_depth += 1
+            if self._queue_depth > self._max_queue_depth:
+                self._max_queue_depth = self._queue_depth
+
+    def _leave_queue(self) -> None:
+        """
+        Leave the request queue.
+        """
+        with self._queue_lock:
+            self._queue_depth -= 1
+        if self._request_slots is not None:
+            self._request_slots.release()
+
+    def queue_stats(self) -> Dict[str, int]:
+        """
+        Returns the stats of the request queue.
+
+        Returns:
+            Dict[str, int]: the current and maximum number of requests in flight, the queue size
+                (0 for unlimited), and the number of requests rejected.
+        """
+        with self._queue_lock:
+            return {"depth": self._queue_depth,
+                    "max_depth": self._max_queue_depth,
+                    "size": self._request_queue_size,
+                    "rejected": self._rejected_requests}
+
+    def _track_episodes(self, done_dict: MultiAgentDict) -> None:
+        """
+        Update the agents in an unfinished episode with the dones of the step.
+        Must be called with lock held.
+
+        Args:
+            done_dict (MultiAgentDict): the dones (or arrays of dones of rollout) with agent name as key.
+        """
+        active = self._active_episodes
+        for agent_name, done in done_dict.items():
+            if (done if isinstance(done, bool) else np.any(done)):
+                # An automatically reset copy continues with new episode unless draining.
+                if self._draining:
+                    self._finished_while_draining.add(agent_name)
+                    active.discard(agent_name)
+                elif not self._auto_reset:
+                    active.discard(agent_name)
+            elif agent_name not in self._finished_while_draining:
+                active.add(agent_name)
+        if self._draining and not active:
+            self._drain_condition.notify_all()
+
+    @property
+    def active_episodes(self) -> int:
+        """
+        Returns the number of agents in an unfinished episode.
+
+        Returns:
+            int: the number of unfinished episodes.
+        """
+        return len(self._active_episodes)
+
+    @property
+    def is_draining(self) -> bool:
+        """
+        Returns the flag whether the adapter is draining.
+
+        Returns:
+            bool: True if draining, False otherwise.
+        """
+        return self._draining
+
+    def set_draining(self, draining: bool) -> None:
+        """
+        Start or stop draining. While draining, reset is rejected with AdapterDrainingError,
+        and the steps continue until every unfinished episode is done.
+
+        Args:
+            draining (bool): the flag to drain.
+        """
+        with self._lock:
+            self._draining = draining
+            self._finished_while_draining.clear()
+            if draining and not self._active_episodes:
+                self._drain_condition.notify_all()
+
+    def wait_drained(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every unfinished episode is done while draining.
+
+        Args:
+            timeout (Optional[float]): the maximum wait time in seconds (default: no limit).
+
+        Returns:
+            bool: True if every episode is done, False on timeout.
+        """
+        with self._drain_condition:
+            return self._drain_condition.wait_for(lambda: not self._active_episodes, timeout)
+
+    @property
+    def init_error(self) -> Optional[Exception]:
+        """
+        Returns the error occurred during the construction of OpenAI Gym environment, if any.
+
+        Returns:
+            Optional[Exception]: the construction error, or None.
+        """
+        return self._init_error
+
+    @staticmethod
+    def _get_env_state(env: gym.Env) -> Dict[str, Any]:
+        if isinstance(env, SubprocessGymEnv):
+            return env.get_state()
+        return get_env_state(env)
+
+    @staticmethod
+    def _set_env_state(env: gym.Env, state: Dict[str, Any]) -> None:
+        if isinstance(env, SubprocessGymEnv):
+            env.set_state(state)
+        else:
+            set_env_state(env, state)
+
+    def snapshot(self, name: str) -> None:
+        """
+        Snapshot the state of the hosted copies and their last observations with given name.
+        The oldest snapshot is dropped when there are more than max_snapshots snapshots.
+
+        Args:
+            name (str): the snapshot name.
+        """
+        self._wait_ready()
+        with self._lock:
+            self._wait_render()
+            states = [self._get_env_state(env) for env in self._envs]
+            self._snapshots[name] = (self._env_name, states, copy.deepcopy(self._last_obs))
+            self._snapshots.move_to_end(name)
+            while len(self._snapshots) > self._max_snapshots:
+                self._snapshots.popitem(last=False)
+
+    @property
+    def snapshot_names(self) -> List[str]:
+        """
+        Returns the names of the snapshots kept.
+
+        Returns:
+            List[str]: the snapshot names from the oldest.
+        """
+        with self._lock:
+            return list(self._snapshots)
+
+    def set_restore_snapshot(self, name: Optional[str]) -> None:
+        """
+        Select the snapshot that reset restores instead of resetting the environment.
+        The snapshot is ignored after the environment is switched to a different one.
+
+        Args:
+            name (Optional[str]): the snapshot name, or None to reset the environment as usual.
+        """
+        if name and name not in self._snapshots:
+            raise KeyError("Unknown snapshot: {}".format(name))
+        self._restore_name = name or None
+
+    def set_preprocessing(self, preprocessing: PreprocessingPipeline) -> None:
+        """
+        Set the preprocessing pipeline to replace the current one at next reset.
+
+        Args:
+            preprocessing (PreprocessingPipeline): the new pipeline (identity pipeline to disable).
+
+        Raises:
+            ValueError: if the pipeline does not support the observation space of the environment.
+        """
+        self._wait_ready()
+        # Validate the pipeline against the observation space of the unwrapped frames before accepting it.
+        env = self._envs[0]
+        preprocessing.observation_space(env.base_observation_space if isinstance(env, SubprocessGymEnv)
+                                        else unwrap_env(env).observation_space)
+        with self._pending_lock:
+            self._pending_preprocessing = preprocessing
 
     def close(self) -> None:
         """
         Close the environment, and environment will be no longer available to be used.
+        Closing again has no effect. The error of construction is not raised, as there is
+        nothing left to close then.
         """
+        self._ready.wait()
         with self._lock:
-            self._env.close()
+            if self._closed:
+                return
+            self._closed = True
+            self._wait_render()
+            if self._render_executor:
+                self._render_executor.shutdown()
+            if self._frame_capture:
+                self._frame_capture.close()
+            if self._profiler:
+                self._profiler.stop_periodic_dump()
+            if self._observation_encoder:
+                self._observation_encoder.close()
+            if self._recorder:
+                try:
+                    self._recorder.close()
+                except RuntimeError as ex:
+                    # The environment copies are closed regardless.
+                    logger.warning("Episode recording was not completed: %s", ex)
+            for env in self._envs:
+                env.close()
+        with self._pending_lock:
+            pending_envs, self._pending_envs = self._pending_envs, None
+        if pending_envs:
+            for env in pending_envs[1]:
+                env.close()
+
+    def _render_env(self) -> None:
+        """
+        Render the first OpenAI Gym environment copy if rendering is enabled.
+        With async_render, the render is submitted to the background thread.
+        The frame capture is started on its own background thread when due.
+        """
+        env = self._envs[0]
+        released = None
+        if self._frame_capture:
+            released = self._frame_capture.on_step(env)
+            if released:
+                self._capture_released = released
+        if not self._render:
+            return
+        if self._render_executor:
+            self._render_future = self._render_executor.submit(self._render_after_capture, env, released)
+        else:
+            self._render_after_capture(env, released)
+
+    @staticmethod
+    def _render_after_capture(env: gym.Env, released: Optional[Event]) -> None:
+        """
+        Render the environment once the frame capture started on the same step no longer accesses it,
+        as the environment (and the pipe of a subprocess copy) must not be used by two threads at once.
+
+        Args:
+            env (gym.Env): OpenAI Gym environment to render.
+            released (Optional[Event]): the event set when the capture releases the environment,
+                or None if no capture is started.
+        """
+        if released:
+            released.wait()
+        env.render()
+
+    def _wait_render(self) -> None:
+        """
+        Wait for the pending background render to complete, and the pending frame capture
+        to release the environment.
+        """
+        if self._capture_released:
+            capture_released = self._capture_released
+            self._capture_released = None
+            capture_released.wait()
+        if self._render_future:
+            render_future = self._render_future
+            self._render_future = None
+            render_future.result()
 
     @property
     def observation_space(self) -> Dict[AgentID, Space]:
@@ -151,9 +1326,8 @@ class GymEnvironmentAdapter(UDEEnvironmentAdapterInterface,
         Returns:
             Dict[AgentID, Space]: the observation spaces of agents in env.
         """
-        with self._lock:
-            observation_space = self._env.observation_space
-            return {self._agent_name: observation_space}
+        self._wait_ready()
+        return self._spaces.observation_spaces
 
     @property
     def action_space(self) -> Dict[AgentID, Space]:
@@ -163,9 +1337,32 @@ class GymEnvironmentAdapter(UDEEnvironmentAdapterInterface,
         Returns:
             Dict[AgentID, Space]: the action spaces of agents in env.
         """
-        with self._lock:
-            action_space = self._env.action_space
-            return {self._agent_name: action_space}
+        self._wait_ready()
+        return self._spaces.action_spaces
+
+    @property
+    def space_version(self) -> str:
+        """
+        Returns the version hash of the observation and action spaces.
+        The hash changes only when the spaces change (e.g. on environment switch).
+
+        Returns:
+            str: the version hash of the spaces.
+        """
+        self._wait_ready()
+        return self._spaces.version
+
+    @property
+    def space_descriptors(self) -> Dict[str, Dict[AgentID, Dict[str, Any]]]:
+        """
+        Returns the JSON-serializable descriptors of the observation and action spaces.
+
+        Returns:
+            Dict[str, Dict[AgentID, Dict[str, Any]]]: the space descriptors with agent name as key
+                under "observation_space" and "action_space" keys.
+        """
+        self._wait_ready()
+        return self._spaces.descriptors
 
     @property
     def side_channel(self) -> AbstractSideChannel:
@@ -186,9 +1383,88 @@ class GymEnvironmentAdapter(UDEEnvironmentAdapterInterface,
             key (str): The string identifier of message
             value (SideChannelData): The data of the message.
         """
-        print("key: ", key, " value: ", value)
+        logger.debug("Side channel message: %s = %s", key, value)
         if key == "env":
-            if value in self._env_ids:
-                new_env = gym.make(value)
-                self._new_env_name = value
-                self._new_env = new_env
+            env_id = self._registry_index.resolve(value)
+            if env_id:
+                self._set_new_envs(env_id)
+        elif key == "stats":
+            if self._profiler:
+                side_channel.send("stats", self._profiler.to_json())
+        elif key == "stats_clear":
+            if self._profiler:
+                self._profiler.clear()
+        elif key == "spaces":
+            # The value is the space version known to the client, if any.
+            spaces = self._spaces
+            if value == spaces.version:
+                side_channel.send("spaces", json.dumps({"version": spaces.version, "unchanged": True}))
+            else:
+                side_channel.send("spaces", spaces.to_json())
+        elif key == "snapshot":
+            try:
+                self.snapshot(value)
+                side_channel.send("snapshot", json.dumps({"name": value}))
+            except Exception as ex:
+                side_channel.send("snapshot", json.dumps({"name": value, "error": str(ex)}))
+        elif key == "restore":
+            try:
+                self.set_restore_snapshot(value)
+                side_channel.send("restore", json.dumps({"name": value}))
+            except KeyError as ex:
+                side_channel.send("restore", json.dumps({"name": value, "error": str(ex)}))
+        elif key == "frame":
+            frame = self._frame_capture.latest_png() if self._frame_capture else None
+            if frame is not None:
+                side_channel.send("frame", frame)
+        elif key == "frames":
+            # The value is the sequence number of the last frame received by the client, if any.
+            if self._frame_capture:
+                try:
+                    last_seq = int(value or 0)
+                    if last_seq < 0:
+                        raise ValueError("frame sequence number must not be negative: {}".format(last_seq))
+                except (TypeError, ValueError) as ex:
+                    # The error is sent as JSON string, while the frames are sent as bytes.
+                    side_channel.send("frames", json.dumps({"error": str(ex)}))
+                else:
+                    seq, frames = self._frame_capture.frames_since(last_seq)
+                    # The PNG frames are self-delimiting, so the stream is their concatenation.
+                    side_channel.send("frames", b"".join(frames))
+                    side_channel.send("frames_seq", seq)
+        elif key == "frame_stats":
+            if self._frame_capture:
+                side_channel.send("frame_stats", json.dumps(self._frame_capture.stats()))
+        elif key == "schedule":
+            if self._step_scheduler:
+                side_channel.send("schedule", self._step_scheduler.to_json())
+        elif key == "preprocess":
+            # The value is the config of PreprocessingPipeline in JSON ("{}" to disable).
+            try:
+                preprocessing = PreprocessingPipeline.from_config(json.loads(value) if value else {})
+                self.set_preprocessing(preprocessing)
+                side_channel.send("preprocess", json.dumps({"config": preprocessing.to_config(), "pending": True}))
+            except (TypeError, ValueError) as ex:
+                side_channel.send("preprocess", json.dumps({"error": str(ex)}))
+        elif key == "preprocess_stats":
+            preprocessing = self._preprocessing
+            stats = {"config": preprocessing.to_config(), "stats": preprocessing.stats()} if preprocessing else {}
+            side_channel.send("preprocess_stats", json.dumps(stats))
+        elif key == "seed":
+            # The value is the root seed ("" or None to stop seeding).
+            try:
+                seed = int(value) if value not in (None, "") else None
+                self.set_seed(seed)
+                side_channel.send("seed", json.dumps({"seed": seed, "pending": True}))
+            except (TypeError, ValueError) as ex:
+                side_channel.send("seed", json.dumps({"error": str(ex)}))
+        elif key == "rollout_horizon":
+            # The value is the number of steps per action of a rollout request (0 to disable).
+            try:
+                rollout_horizon = int(value)
+                if rollout_horizon < 0:
+                    raise ValueError("rollout_horizon must not be negative: {}".format(rollout_horizon))
+                self._rollout_horizon = rollout_horizon
+                side_channel.send("rollout_horizon", json.dumps({"rollout_horizon": rollout_horizon}))
+            except (TypeError, ValueError) as ex:
+                side_channel.send("rollout_horizon", json.dumps({"error": str(ex)}))
@@ -0,0 +1,142 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class for process-wide index of OpenAI Gym registry."""
+from typing import Dict, FrozenSet, Optional, Tuple
+from threading import Lock
+import re
+
+import gym
+
+_VERSIONED_ENV_ID_PATTERN = re.compile(r"^(?P<name>.+)-v(?P<version>\d+)$")
+
+
+class GymRegistryIndex(object):
+    """
+    GymRegistryIndex class to look up OpenAI Gym environment ids in O(1).
+
+    The index is built lazily from the Gym registry on first use, and rebuilt
+    when new environments are registered at runtime. Use get_instance to share
+    a single index across all adapters in the process.
+    """
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self):
+        """
+        Initialize GymRegistryIndex
+        """
+        self._registry_size = -1
+        self._env_ids = frozenset()  # type: FrozenSet[str]
+        self._lower_env_ids = {}  # type: Dict[str, str]
+        self._latest_env_ids = {}  # type: Dict[str, str]
+        self._lock = Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'GymRegistryIndex':
+        """
+        Returns the process-wide GymRegistryIndex instance.
+
+        Returns:
+            GymRegistryIndex: the process-wide GymRegistryIndex instance.
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = GymRegistryIndex()
+        return cls._instance
+
+    @staticmethod
+    def _get_env_specs() -> Dict[str, gym.envs.registration.EnvSpec]:
+        """
+        Returns the environment specs registered in Gym with environment id as key.
+
+        Returns:
+            Dict[str, gym.envs.registration.EnvSpec]: the environment specs registered.
+        """
+        registry = gym.envs.registry
+        # Older Gym versions keep the specs in EnvRegistry.env_specs,
+        # and newer versions use the registry dict itself.
+        return getattr(registry, "env_specs", registry)
+
+    def _refresh(self) -> FrozenSet[str]:
+        """
+        Rebuild the index if the number of registered environments changed.
+
+        Returns:
+            FrozenSet[str]: the environment ids registered.
+        """
+        env_specs = self._get_env_specs()
+        if len(env_specs) == self._registry_size:
+            return self._env_ids
+        with self._lock:
+            if len(env_specs) != self._registry_size:
+                self._build(frozenset(env_specs.keys()))
+            return self._env_ids
+
+    def _build(self, env_ids: FrozenSet[str]) -> None:
+        """
+        Build the index from given environment ids. Must be called with lock held.
+
+        Args:
+            env_ids (FrozenSet[str]): the environment ids registered.
+        """
+        latest_versions = {}  # type: Dict[str, Tuple[int, str]]
+        for env_id in env_ids:
+            match = _VERSIONED_ENV_ID_PATTERN.match(env_id)
+            if match:
+                name = match.group("name").lower()
+                version = int(match.group("version"))
+                if name not in latest_versions or latest_versions[name][0] < version:
+                    latest_versions[name] = (version, env_id)
+        self._lower_env_ids = {env_id.lower(): env_id for env_id in env_ids}
+        self._latest_env_ids = {name: env_id for name, (_, env_id) in latest_versions.items()}
+        self._env_ids = env_ids
+        self._registry_size = len(env_ids)
+
+    @property
+    def env_ids(self) -> FrozenSet[str]:
+        """
+        Returns all environment ids registered.
+
+        Returns:
+            FrozenSet[str]: all environment ids registered.
+        """
+        return self._refresh()
+
+    def __contains__(self, env_id: str) -> bool:
+        return env_id in self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._refresh())
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        Resolve given name to registered environment id.
+        Exact id is returned as is. Otherwise, the name is matched case-insensitively,
+        and an unversioned name (e.g. "CartPole") resolves to its latest version.
+
+        Args:
+            name (str): OpenAI Gym environment id or name.
+
+        Returns:
+            Optional[str]: the registered environment id, or None if there is no match.
+        """
+        if not isinstance(name, str):
+            return None
+        if name in self._refresh():
+            return name
+        lower_name = name.lower()
+        return self._lower_env_ids.get(lower_name) or self._latest_env_ids.get(lower_name)
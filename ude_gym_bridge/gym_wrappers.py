@@ -0,0 +1,227 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""Classes for OpenAI Gym wrappers applied on the server next to the simulator."""
+from typing import Any, Callable, Optional, Tuple
+import functools
+import json
+
+import numpy as np
+import gym
+from gym.spaces import Box
+
+from ude_gym_bridge.preprocessing import PreprocessingPipeline
+
+
+class ActionRepeatWrapper(gym.Wrapper):
+    """
+    ActionRepeatWrapper class to repeat each action for given number of frames,
+    and return the sum of rewards. With max_pool, the observation is the
+    element-wise maximum of the last two frames (Atari flicker removal).
+    """
+    def __init__(self, env: gym.Env, repeat: int, max_pool: bool = False):
+        """
+        Initialize ActionRepeatWrapper
+
+        Args:
+            env (gym.Env): OpenAI Gym environment to wrap.
+            repeat (int): the number of frames to repeat each action.
+            max_pool (bool): the flag to max-pool the last two frames.
+        """
+        super().__init__(env)
+        if repeat < 1:
+            raise ValueError("repeat must be at least 1: {}".format(repeat))
+        self._repeat = repeat
+        self._max_pool = max_pool
+
+    def step(self, action: Any) -> Tuple[Any, float, bool, dict]:
+        total_reward = 0.0
+        prev_obs = None
+        obs, done, info = None, False, {}
+        for idx in range(self._repeat):
+            if self._max_pool and idx == self._repeat - 1:
+                prev_obs = obs
+            obs, reward, done, info = self.env.step(action)
+            total_reward += reward
+            if done:
+                break
+        if self._max_pool and prev_obs is not None:
+            obs = np.maximum(obs, prev_obs)
+        return obs, total_reward, done, info
+
+
+class PreprocessingWrapper(gym.Wrapper):
+    """
+    PreprocessingWrapper class to transform each observation and reward with
+    PreprocessingPipeline, so the frames are transformed before they are stacked.
+    """
+    def __init__(self, env: gym.Env, preprocessing: PreprocessingPipeline):
+        """
+        Initialize PreprocessingWrapper
+
+        Args:
+            env (gym.Env): OpenAI Gym environment to wrap.
+            preprocessing (PreprocessingPipeline): the pipeline to transform the observations
+                and rewards with. The pipeline may be shared by several wrapped copies.
+        """
+        super().__init__(env)
+        self.preprocessing = preprocessing
+        self.observation_space = preprocessing.observation_space(env.observation_space)
+
+    def reset(self, **kwargs) -> Any:
+        return self.preprocessing.process_obs(self.env.reset(**kwargs))
+
+    def step(self, action: Any) -> Tuple[Any, float, bool, dict]:
+        obs, reward, done, info = self.env.step(action)
+        return self.preprocessing.process_obs(obs), self.preprocessing.process_reward(reward), done, info
+
+
+class FrameStackWrapper(gym.Wrapper):
+    """
+    FrameStackWrapper class to stack the last num_stack observations along a new
+    leading axis (oldest first). Frames are kept in a preallocated ring buffer
+    written twice, so the stacked output is always a contiguous slice.
+    """
+    def __init__(self, env: gym.Env, num_stack: int):
+        """
+        Initialize FrameStackWrapper
+
+        Args:
+            env (gym.Env): OpenAI Gym environment to wrap. The observation space must be Box.
+            num_stack (int): the number of observations to stack.
+        """
+        super().__init__(env)
+        if num_stack < 1:
+            raise ValueError("num_stack must be at least 1: {}".format(num_stack))
+        space = env.observation_space
+        if not isinstance(space, Box):
+            raise ValueError("FrameStackWrapper requires Box observation space: {}".format(space))
+        self._num_stack = num_stack
+        self.observation_space = Box(low=np.repeat(space.low[np.newaxis], num_stack, axis=0),
+                                     high=np.repeat(space.high[np.newaxis], num_stack, axis=0),
+                                     dtype=space.dtype)
+        self._frames = np.zeros((2 * num_stack,) + space.shape, dtype=space.dtype)
+        self._pos = 0
+
+    def _push(self, obs: Any) -> np.ndarray:
+        """
+        Push the observation into the ring buffer, and returns the stacked observation.
+
+        Args:
+            obs (Any): the newest observation.
+
+        Returns:
+            np.ndarray: the stacked observation with the oldest observation first.
+        """
+        self._pos = (self._pos + 1) % self._num_stack
+        self._frames[self._pos] = obs
+        self._frames[self._pos + self._num_stack] = obs
+        return self._frames[self._pos + 1:self._pos + 1 + self._num_stack].copy()
+
+    def reset(self, **kwargs) -> np.ndarray:
+        obs = self.env.reset(**kwargs)
+        self._frames[:] = obs
+        return self._push(obs)
+
+    def step(self, action: Any) -> Tuple[np.ndarray, float, bool, dict]:
+        obs, reward, done, info = self.env.step(action)
+        return self._push(obs), reward, done, info
+
+
+def wrap_env(env: gym.Env,
+             frame_skip: int = 1,
+             max_pool: bool = False,
+             frame_stack: int = 1,
+             preprocessing: Optional[PreprocessingPipeline] = None) -> gym.Env:
+    """
+    Wrap the environment with action repeat, preprocessing and frame stacking as configured,
+    in this order.
+
+    Args:
+        env (gym.Env): OpenAI Gym environment to wrap.
+        frame_skip (int): the number of frames to repeat each action.
+        max_pool (bool): the flag to max-pool the last two frames of action repeat.
+        frame_stack (int): the number of observations to stack.
+        preprocessing (Optional[PreprocessingPipeline]): the pipeline to transform each frame with.
+
+    Returns:
+        gym.Env: the wrapped environment.
+    """
+    if frame_skip > 1:
+        env = ActionRepeatWrapper(env, repeat=frame_skip, max_pool=max_pool)
+    if preprocessing is not None and not preprocessing.is_identity:
+        env = PreprocessingWrapper(env, preprocessing)
+    if frame_stack > 1:
+        env = FrameStackWrapper(env, num_stack=frame_stack)
+    return env
+
+
+def make_env_wrapper(frame_skip: int = 1,
+                     max_pool: bool = False,
+                     frame_stack: int = 1,
+                     preprocessing: Optional[PreprocessingPipeline] = None) -> Optional[Callable[[gym.Env], gym.Env]]:
+    """
+    Returns the picklable function applying wrap_env with given configuration,
+    or None if no wrapper is needed.
+
+    Args:
+        frame_skip (int): the number of frames to repeat each action.
+        max_pool (bool): the flag to max-pool the last two frames of action repeat.
+        frame_stack (int): the number of observations to stack.
+        preprocessing (Optional[PreprocessingPipeline]): the pipeline to transform each frame with.
+
+    Returns:
+        Optional[Callable[[gym.Env], gym.Env]]: the function wrapping the environment.
+    """
+    if preprocessing is not None and preprocessing.is_identity:
+        preprocessing = None
+    if frame_skip <= 1 and frame_stack <= 1 and preprocessing is None:
+        return None
+    return functools.partial(wrap_env, frame_skip=frame_skip, max_pool=max_pool, frame_stack=frame_stack,
+                             preprocessing=preprocessing)
+
+
+def env_wrapper_key(env_wrapper: Optional[Callable[[gym.Env], gym.Env]]) -> Optional[str]:
+    """
+    Returns the key identifying the configuration of the function returned by make_env_wrapper,
+    equal for the functions wrapping the environments the same way.
+
+    Args:
+        env_wrapper (Optional[Callable[[gym.Env], gym.Env]]): the function returned by make_env_wrapper.
+
+    Returns:
+        Optional[str]: the key of the configuration, None if there is no wrapper.
+    """
+    if env_wrapper is None:
+        return None
+    config = dict(env_wrapper.keywords)
+    preprocessing = config.pop("preprocessing")
+    config["preprocessing"] = preprocessing.to_config() if preprocessing else None
+    return json.dumps(config, sort_keys=True)
+
+
+def unwrap_env(env: gym.Env) -> gym.Env:
+    """
+    Remove the wrappers added by wrap_env.
+
+    Args:
+        env (gym.Env): the wrapped environment.
+
+    Returns:
+        gym.Env: the environment under the wrappers added by wrap_env.
+    """
+    while isinstance(env, (ActionRepeatWrapper, PreprocessingWrapper, FrameStackWrapper)):
+        env = env.env
+    return env
@@ -0,0 +1,491 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class launching and supervising GymEnvRemoteRunner processes pinned to CPU cores.
+
+Usage:
+    python -m ude_gym_bridge.launcher --env CartPole-v0 --num-processes 4 --ports 3003-3010 \
+        --pin --cpus-per-process 1 --compression NoCompression --step-invoke-type WAIT_FOREVER
+
+Each runner process serves its own port from the port range. With --pin, each process is
+pinned to its own CPU cores (Linux only), so the environment copies it hosts in worker
+subprocesses share the cores. Crashed runner processes are restarted on the same port, and the aggregate
+step throughput of all runners is printed as a JSON line per report interval.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import json
+import logging
+import multiprocessing
+from multiprocessing.connection import Connection
+import os
+import time
+
+import numpy as np
+
+from ude import UDEStepInvokeType, Compression
+from ude_gym_bridge.gym_env_remote_runner import GymEnvRemoteRunner
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 3003
+
+
+def available_cpus() -> List[int]:
+    """
+    Returns the CPU cores this process may run on.
+
+    Returns:
+        List[int]: the CPU core ids.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def assign_cpus(num_processes: int,
+                cpus_per_process: int = 1,
+                cpus: Optional[Sequence[int]] = None) -> List[List[int]]:
+    """
+    Assign CPU cores to each process in turn. Cores are shared when there are
+    fewer cores than num_processes * cpus_per_process.
+
+    Args:
+        num_processes (int): the number of processes.
+        cpus_per_process (int): the number of cores per process.
+        cpus (Optional[Sequence[int]]): the CPU core ids to assign (default: the cores available).
+
+    Returns:
+        List[List[int]]: the CPU core ids with process index as index.
+    """
+    if cpus_per_process < 1:
+        raise ValueError("cpus_per_process must be at least 1: {}".format(cpus_per_process))
+    cpus = list(cpus) if cpus is not None else available_cpus()
+    if num_processes * cpus_per_process > len(cpus):
+        logger.warning("%d processes x %d cores oversubscribe %d cores.",
+                       num_processes, cpus_per_process, len(cpus))
+    return [sorted({cpus[(idx * cpus_per_process + offset) % len(cpus)] for offset in range(cpus_per_process)})
+            for idx in range(num_processes)]
+
+
+def parse_port_range(ports: str) -> Tuple[int, int]:
+    """
+    Parse the port range of "START-END" (inclusive) or "START".
+
+    Args:
+        ports (str): the port range.
+
+    Returns:
+        Tuple[int, int]: the first and the last port.
+    """
+    start, _, end = ports.partition("-")
+    first_port = int(start)
+    last_port = int(end) if end else None
+    if last_port is not None and last_port < first_port:
+        raise ValueError("Invalid port range: {}".format(ports))
+    return first_port, last_port if last_port is not None else first_port
+
+
+def _worker_main(runner_kwargs: Dict[str, Any],
+                 cpus: Optional[List[int]],
+                 report_interval: float,
+                 stop_event: Any,
+                 conn: Connection) -> None:
+    """
+    Entry point of a runner process: pin to the CPU cores, serve until the stop event
+    is set, and report the number of steps served per report interval and on exit.
+
+    Args:
+        runner_kwargs (Dict[str, Any]): the keyword arguments for GymEnvRemoteRunner.
+        cpus (Optional[List[int]]): the CPU core ids to pin to (None to not pin).
+        report_interval (float): the interval in seconds between reports.
+        stop_event (Any): the event set when the runner should stop.
+        conn (Connection): the write end of the pipe to send the reports to.
+    """
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    runner = GymEnvRemoteRunner(**runner_kwargs)
+
+    def report() -> None:
+        # Episodes are counted by the profiler only, when profiling is on.
+        adapter = runner.adapter
+        profiler = adapter.profiler
+        stats = profiler.stats() if profiler else {}
+        conn.send((adapter.step_count, stats.get("episodes", {}).get("count", 0)))
+
+    runner.start()
+    try:
+        while not stop_event.wait(report_interval):
+            report()
+    finally:
+        report()
+        runner.stop()
+        conn.close()
+
+
+class RunnerLauncher(object):
+    """
+    RunnerLauncher class to launch GymEnvRemoteRunner processes on consecutive ports,
+    restart the processes that exit unexpectedly, and aggregate their step throughput.
+
+    Each process gets its own stop event and report pipe, as a process killed while
+    holding the lock of a shared event or queue would block the others.
+    """
+    def __init__(self,
+                 num_processes: int = 1,
+                 port_range: Tuple[int, int] = (DEFAULT_PORT, DEFAULT_PORT),
+                 cpus_per_process: Optional[int] = None,
+                 pin_cpus: bool = False,
+                 max_restarts: int = 5,
+                 restart_delay: float = 1.0,
+                 report_interval: float = 5.0,
+                 seed: Optional[int] = None,
+                 start_method: str = "spawn",
+                 **runner_kwargs):
+        """
+        Initialize RunnerLauncher
+
+        Args:
+            num_processes (int): the number of runner processes.
+            port_range (Tuple[int, int]): the first and the last port (inclusive) to serve on.
+                The processes serve on consecutive ports from the first port.
+            cpus_per_process (Optional[int]): the number of CPU cores to pin each process to
+                (default: the cores available divided evenly among the processes).
+            pin_cpus (bool): the flag to pin the processes to CPU cores (default: not pinned).
+            max_restarts (int): the maximum number of restarts per process before giving up on it.
+            restart_delay (float): the wait time in seconds before restarting a process.
+            report_interval (float): the interval in seconds between throughput reports.
+            seed (Optional[int]): the root seed to derive the seed of each process from
+                (None to leave the environments unseeded).
+            start_method (str): multiprocessing start method for the runner processes.
+            runner_kwargs: Arbitrary keyword arguments for GymEnvRemoteRunner.
+        """
+        if num_processes < 1:
+            raise ValueError("num_processes must be at least 1: {}".format(num_processes))
+        first_port, last_port = port_range
+        if last_port - first_port + 1 < num_processes:
+            raise ValueError("Port range {}-{} is too small for {} processes."
+                             .format(first_port, last_port, num_processes))
+        self._num_processes = num_processes
+        self._ports = [first_port + idx for idx in range(num_processes)]
+        self._cpus = [None] * num_processes  # type: List[Optional[List[int]]]
+        if pin_cpus:
+            if cpus_per_process is None:
+                cpus_per_process = max(len(available_cpus()) // num_processes, 1)
+            self._cpus = assign_cpus(num_processes, cpus_per_process)
+        self._max_restarts = max_restarts
+        self._restart_delay = restart_delay
+        self._report_interval = report_interval
+        self._seeds = [int(np.random.SeedSequence(seed, spawn_key=(idx,)).generate_state(1, dtype=np.uint32)[0])
+                       if seed is not None else None
+                       for idx in range(num_processes)]
+        self._runner_kwargs = runner_kwargs
+
+        self._context = multiprocessing.get_context(start_method)
+        self._processes = [None] * num_processes  # type: List[Any]
+        self._stop_events = [None] * num_processes  # type: List[Any]
+        self._conns = [None] * num_processes  # type: List[Optional[Connection]]
+        self._restarts = [0] * num_processes
+        self._restart_times = [None] * num_processes  # type: List[Optional[float]]
+        self._failed = [False] * num_processes
+        # (steps, episodes) last reported by the current process of each index.
+        self._reports = [(0, 0)] * num_processes  # type: List[Tuple[int, int]]
+        # Steps and episodes served by the exited processes.
+        self._retired_steps = 0
+        self._retired_episodes = 0
+        self._last_total = 0
+        self._last_time = None  # type: Optional[float]
+
+    @property
+    def ports(self) -> List[int]:
+        """
+        Returns the port of each runner process.
+
+        Returns:
+            List[int]: the ports with process index as index.
+        """
+        return list(self._ports)
+
+    @property
+    def cpus(self) -> List[Optional[List[int]]]:
+        """
+        Returns the CPU cores each runner process is pinned to.
+
+        Returns:
+            List[Optional[List[int]]]: the CPU core ids (None if not pinned) with process index as index.
+        """
+        return list(self._cpus)
+
+    def _spawn(self, idx: int) -> None:
+        """
+        Start the runner process of given index.
+
+        Args:
+            idx (int): the index of the runner process.
+        """
+        runner_kwargs = dict(self._runner_kwargs)
+        runner_kwargs["port"] = self._ports[idx]
+        runner_kwargs["seed"] = self._seeds[idx]
+        stop_event = self._context.Event()
+        conn, worker_conn = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=_worker_main,
+                                        args=(runner_kwargs, self._cpus[idx], self._report_interval,
+                                              stop_event, worker_conn),
+                                        daemon=True)
+        process.start()
+        worker_conn.close()
+        self._processes[idx] = process
+        self._stop_events[idx] = stop_event
+        self._conns[idx] = conn
+        self._reports[idx] = (0, 0)
+        self._restart_times[idx] = None
+
+    def start(self) -> None:
+        """
+        Start all runner processes.
+        """
+        for idx in range(self._num_processes):
+            self._spawn(idx)
+        self._last_time = time.monotonic()
+
+    def supervise(self) -> None:
+        """
+        Collect the reports of the runner processes, and restart the processes that exited.
+        """
+        self._collect_reports()
+        now = time.monotonic()
+        for idx, process in enumerate(self._processes):
+            if self._failed[idx] or process is None or process.is_alive():
+                continue
+            if self._restart_times[idx] is None:
+                logger.warning("Runner process %d (pid %s, port %d) exited with code %s.",
+                               idx, process.pid, self._ports[idx], process.exitcode)
+                self._receive_reports(idx)
+                self._close_conn(idx)
+                steps, episodes = self._reports[idx]
+                self._retired_steps += steps
+                self._retired_episodes += episodes
+                self._reports[idx] = (0, 0)
+                if self._restarts[idx] >= self._max_restarts:
+                    logger.error("Runner process %d exceeded %d restarts, and is not restarted.",
+                                 idx, self._max_restarts)
+                    self._failed[idx] = True
+                    continue
+                self._restart_times[idx] = now + self._restart_delay
+            if now >= self._restart_times[idx]:
+                self._restarts[idx] += 1
+                self._spawn(idx)
+
+    def _collect_reports(self) -> None:
+        """
+        Receive the reports sent by the runner processes.
+        """
+        for idx in range(self._num_processes):
+            self._receive_reports(idx)
+
+    def _receive_reports(self, idx: int) -> None:
+        """
+        Receive the reports sent by the runner process of given index.
+
+        Args:
+            idx (int): the index of the runner process.
+        """
+        conn = self._conns[idx]
+        try:
+            while conn is not None and conn.poll():
+                self._reports[idx] = conn.recv()
+        except (EOFError, OSError):
+            # The process exited, and the last report is kept.
+            self._close_conn(idx)
+
+    def _close_conn(self, idx: int) -> None:
+        """
+        Close the report pipe of the runner process of given index.
+
+        Args:
+            idx (int): the index of the runner process.
+        """
+        conn = self._conns[idx]
+        if conn is not None:
+            conn.close()
+            self._conns[idx] = None
+
+    def throughput(self) -> Dict[str, Any]:
+        """
+        Returns the aggregate throughput of the runner processes since the last call.
+
+        Returns:
+            Dict[str, Any]: the number of processes alive, restarted and given up on, the total
+                number of steps and episodes served, the steps per second, and the steps per process.
+        """
+        now = time.monotonic()
+        worker_steps = [steps for steps, _ in self._reports]
+        total_steps = self._retired_steps + sum(worker_steps)
+        elapsed = now - self._last_time if self._last_time is not None else 0.0
+        steps_per_sec = (total_steps - self._last_total) / elapsed if elapsed > 0 else 0.0
+        self._last_total = total_steps
+        self._last_time = now
+        return {"alive": sum(1 for process in self._processes if process is not None and process.is_alive()),
+                "restarts": sum(self._restarts),
+                "failed": sum(self._failed),
+                "steps": total_steps,
+                "episodes": self._retired_episodes + sum(episodes for _, episodes in self._reports),
+                "steps_per_sec": steps_per_sec,
+                "worker_steps": worker_steps}
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Returns the flag whether any runner process is running or to be restarted.
+
+        Returns:
+            bool: True if any runner process is not given up on, False otherwise.
+        """
+        return not all(self._failed)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stop all runner processes, terminating the ones not stopped within the timeout.
+
+        Args:
+            timeout (float): the maximum wait time in seconds per process.
+        """
+        for stop_event in self._stop_events:
+            if stop_event is not None:
+                stop_event.set()
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=timeout)
+        self._collect_reports()
+        for idx in range(self._num_processes):
+            self._close_conn(idx)
+
+    def run(self, duration: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Start the runner processes, supervise them and print the throughput per report interval
+        until the duration elapses, every process is given up on, or interrupted.
+
+        Args:
+            duration (Optional[float]): the time in seconds to run for (default: no limit).
+
+        Returns:
+            Dict[str, Any]: the aggregate throughput over the whole run.
+        """
+        self.start()
+        start_time = time.monotonic()
+        deadline = start_time + duration if duration is not None else None
+        try:
+            while self.is_running:
+                wait_time = self._report_interval
+                if deadline is not None:
+                    wait_time = min(wait_time, deadline - time.monotonic())
+                    if wait_time <= 0:
+                        break
+                time.sleep(wait_time)
+                self.supervise()
+                print(json.dumps(self.throughput()), flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+        summary = self.throughput()
+        elapsed = time.monotonic() - start_time
+        summary["steps_per_sec"] = summary["steps"] / elapsed if elapsed > 0 else 0.0
+        summary["duration"] = elapsed
+        return summary
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    """
+    Returns the argument parser of launcher CLI.
+
+    Returns:
+        argparse.ArgumentParser: the argument parser.
+    """
+    parser = argparse.ArgumentParser(description="Serve OpenAI Gym environments over UDE from multiple processes.")
+    parser.add_argument("--env", default="CartPole-v0", help="OpenAI Gym environment name.")
+    parser.add_argument("--agent-name", default="agent0", help="the agent name of a single environment copy.")
+    parser.add_argument("--num-processes", type=int, default=1, help="the number of runner processes.")
+    parser.add_argument("--ports", default=None,
+                        help="the port range START-END (inclusive) to serve on, one port per process "
+                             "(default: consecutive ports from {}).".format(DEFAULT_PORT))
+    parser.add_argument("--pin", dest="pin_cpus", action="store_true",
+                        help="pin each runner process to its own CPU cores (Linux only).")
+    parser.add_argument("--cpus-per-process", type=int, default=None,
+                        help="the number of CPU cores to pin each runner process to with --pin "
+                             "(default: the cores available divided evenly among the processes).")
+    parser.add_argument("--compression", default="NoCompression",
+                        choices=[compression.name for compression in Compression],
+                        help="channel compression type.")
+    parser.add_argument("--step-invoke-type", default="WAIT_FOREVER",
+                        choices=[step_invoke_type.name for step_invoke_type in UDEStepInvokeType],
+                        help="step invoke type.")
+    parser.add_argument("--step-invoke-period", type=float, default=120.0,
+                        help="step invoke period used with PERIODIC step invoke type.")
+    parser.add_argument("--timeout-wait", type=float, default=60.0,
+                        help="the maximum wait time in seconds to respond step request.")
+    parser.add_argument("--render", action="store_true", help="render the environments.")
+    parser.add_argument("--num-envs", type=int, default=1, help="the number of environment copies per process.")
+    parser.add_argument("--use-subprocess", action="store_true",
+                        help="host each environment copy in a worker subprocess.")
+    parser.add_argument("--auto-reset", action="store_true",
+                        help="reset a single environment copy automatically on done.")
+    parser.add_argument("--seed", type=int, default=None, help="the root seed of the episodes.")
+    parser.add_argument("--max-restarts", type=int, default=5,
+                        help="the maximum number of restarts per runner process.")
+    parser.add_argument("--restart-delay", type=float, default=1.0,
+                        help="the wait time in seconds before restarting a runner process.")
+    parser.add_argument("--report-interval", type=float, default=5.0,
+                        help="the interval in seconds between throughput reports.")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="the time in seconds to run for (default: until interrupted).")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    args = _build_arg_parser().parse_args(argv)
+    if args.ports:
+        port_range = parse_port_range(args.ports)
+    else:
+        port_range = (DEFAULT_PORT, DEFAULT_PORT + args.num_processes - 1)
+    launcher = RunnerLauncher(num_processes=args.num_processes,
+                              port_range=port_range,
+                              cpus_per_process=args.cpus_per_process,
+                              pin_cpus=args.pin_cpus,
+                              max_restarts=args.max_restarts,
+                              restart_delay=args.restart_delay,
+                              report_interval=args.report_interval,
+                              seed=args.seed,
+                              env_name=args.env,
+                              agent_name=args.agent_name,
+                              render=args.render,
+                              compression=Compression[args.compression],
+                              step_invoke_type=UDEStepInvokeType[args.step_invoke_type],
+                              step_invoke_period=args.step_invoke_period,
+                              timeout_wait=args.timeout_wait,
+                              num_envs=args.num_envs,
+                              use_subprocess=args.use_subprocess,
+                              auto_reset=args.auto_reset)
+    summary = launcher.run(duration=args.duration)
+    print(json.dumps(summary), flush=True)
+    return summary
+
+
+if __name__ == '__main__':
+    main()
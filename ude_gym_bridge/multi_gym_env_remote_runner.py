@@ -0,0 +1,149 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class for UDE Server hosting several Gym Environments on one port."""
+from typing import Optional, List, Tuple, Union, Any, Iterable, Dict
+
+from ude import (
+    UDEEnvironment,
+    UDEServer,
+    UDEStepInvokeType,
+    Compression, ServerCredentials
+)
+from ude_gym_bridge.gym_environment_adapter import GymEnvironmentAdapter
+from ude_gym_bridge.multi_gym_environment_adapter import MultiGymEnvironmentAdapter
+from ude_gym_bridge.gym_env_pool import GymEnvPool
+
+
+class MultiGymEnvRemoteRunner(object):
+    """
+    Multi-tenant Gym Environment runner hosting several named Gym environments
+    in one process behind one UDE Server. Agents are exposed as "<tenant>/<agent>".
+    """
+    def __init__(self,
+                 tenants: Union[List[str], Dict[str, Dict[str, Any]]],
+                 step_invoke_type: UDEStepInvokeType = UDEStepInvokeType.WAIT_FOREVER,
+                 step_invoke_period: Union[int, float] = 120.0,
+                 port: Optional[int] = None,
+                 options: Optional[List[Tuple[str, Any]]] = None,
+                 compression: Compression = Compression.NoCompression,
+                 credentials: Optional[Union[ServerCredentials, Iterable[str], Iterable[bytes]]] = None,
+                 auth_key: Optional[str] = None,
+                 timeout_wait: Union[int, float] = 60.0,
+                 admission_limit: int = 0,
+                 admission_limits: Optional[Dict[str, int]] = None,
+                 admission_timeout: Optional[float] = None,
+                 max_workers: Optional[int] = None,
+                 env_pool_size: int = 0,
+                 **kwargs):
+        """
+
+        Args:
+            tenants (Union[List[str], Dict[str, Dict[str, Any]]]): OpenAI Gym environment names to host
+                (the tenant name is the environment name), or the keyword arguments for GymEnvironmentAdapter
+                with tenant name as key (env_name defaults to the tenant name).
+                Tenants are created without rendering and with auto_reset unless given otherwise.
+            step_invoke_type (const.UDEStepInvokeType):  step invoke type (WAIT_FOREVER vs PERIODIC)
+            step_invoke_period (Union[int, float]): step invoke period (used only with PERIODIC step_invoke_type)
+            port (Optional[int]): Port to use for UDE Server (default: 3003)
+            options (Optional[List[Tuple[str, Any]]]): An optional list of key-value pairs
+                                                        (:term:`channel_arguments` in gRPC runtime)
+                                                        to configure the channel.
+            compression (Compression) = channel compression type (default: NoCompression)
+            credentials (Optional[Union[ServerCredentials, Iterable[str], Iterable[bytes]]]): grpc.ServerCredentials,
+                the path to certificate private key and body/chain file, or bytes of the certificate private
+                key and body/chain to use with an SSL-enabled Channel.
+            auth_key (Optional[str]): channel authentication key (only applied when credentials are provided).
+            timeout_wait (Union[int, float]): the maximum wait time to respond step request to UDE clients.
+            admission_limit (int): the maximum number of in-flight requests per tenant (0 for unlimited).
+            admission_limits (Optional[Dict[str, int]]): the admission limit overrides with tenant name as key.
+            admission_timeout (Optional[float]): the maximum wait time in seconds for admission to a tenant.
+            max_workers (Optional[int]): the number of worker threads shared by all tenants.
+            env_pool_size (int): the maximum number of idle environments kept in the pool shared by all
+                                 tenants for reuse across environment switches (0 for no pool).
+                                 Each tenant pools its copies by how it constructs them
+                                 (in-process or subprocess with its wrappers).
+            kwargs: Arbitrary keyword arguments for grpc.server
+        """
+        if not isinstance(tenants, dict):
+            tenants = {env_name: {} for env_name in tenants}
+        self._env_pool = GymEnvPool(max_size=env_pool_size) if env_pool_size > 0 else None
+        adapters = {}
+        for tenant_name, tenant_kwargs in tenants.items():
+            tenant_kwargs = dict(tenant_kwargs)
+            tenant_kwargs.setdefault("env_name", tenant_name)
+            tenant_kwargs.setdefault("render", False)
+            tenant_kwargs.setdefault("auto_reset", True)
+            tenant_kwargs.setdefault("env_pool", self._env_pool)
+            adapters[tenant_name] = GymEnvironmentAdapter(**tenant_kwargs)
+
+        limits = {tenant_name: admission_limit for tenant_name in adapters} if admission_limit > 0 else {}
+        limits.update(admission_limits or {})
+        self._adapter = MultiGymEnvironmentAdapter(adapters=adapters,
+                                                   admission_limits=limits,
+                                                   admission_timeout=admission_timeout,
+                                                   max_workers=max_workers)
+        self._ude_env = UDEEnvironment(ude_env_adapter=self._adapter)
+        self._ude_server = UDEServer(ude_env=self._ude_env,
+                                     step_invoke_type=step_invoke_type,
+                                     step_invoke_period=step_invoke_period,
+                                     port=port,
+                                     options=options,
+                                     compression=compression,
+                                     credentials=credentials,
+                                     auth_key=auth_key,
+                                     timeout_wait=timeout_wait,
+                                     **kwargs)
+
+    @property
+    def adapter(self) -> MultiGymEnvironmentAdapter:
+        """
+        Returns the multi-tenant adapter.
+
+        Returns:
+            MultiGymEnvironmentAdapter: the multi-tenant adapter.
+        """
+        return self._adapter
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        Returns the flag whether OpenAI Gym environments of every tenant are ready to serve.
+
+        Returns:
+            bool: True if every tenant is ready, False otherwise.
+        """
+        return self._adapter.is_ready
+
+    def start(self) -> None:
+        """
+        Start UDE Server.
+        """
+        self._ude_server.start()
+
+    def stop(self) -> None:
+        """
+        Stop UDE Server, and close the tenant adapters with their environment copies.
+        """
+        self._ude_server.close()
+        self._adapter.close()
+        if self._env_pool is not None:
+            self._env_pool.close()
+
+    def spin(self) -> None:
+        """
+        Spin till UDE Server terminates.
+        """
+        self._ude_server.spin()
@@ -0,0 +1,343 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class for UDE Environment Adapter hosting several named Gym Environment Adapters."""
+from typing import Dict, List, Optional, Tuple
+from threading import BoundedSemaphore
+from concurrent.futures import ThreadPoolExecutor
+
+from gym import Space
+
+from ude import (
+    UDEEnvironmentAdapterInterface,
+    MultiAgentDict, UDEStepResult, UDEResetResult,
+    AbstractSideChannel, SingleSideChannel, AgentID,
+    SideChannelData, SideChannelObserverInterface
+)
+from ude_gym_bridge.gym_environment_adapter import GymEnvironmentAdapter
+
+TENANT_SEPARATOR = "/"
+
+
+class TenantAdmissionError(RuntimeError):
+    """
+    Error raised when a tenant has reached its admission limit of in-flight requests.
+    """
+    pass
+
+
+def split_agent_id(agent_id: AgentID) -> Tuple[str, AgentID]:
+    """
+    Split the routed agent id "<tenant>/<agent>" into tenant name and agent name.
+    The agent name is the part after the last separator, so tenant names may contain
+    the separator (e.g. "ALE/Pong-v5/agent0").
+
+    Args:
+        agent_id (AgentID): the routed agent id.
+
+    Returns:
+        Tuple[str, AgentID]: the tenant name and the agent name.
+    """
+    tenant_name, separator, agent_name = agent_id.rpartition(TENANT_SEPARATOR)
+    if not separator:
+        raise KeyError("Agent id must be in <tenant>{}<agent> form: {}".format(TENANT_SEPARATOR, agent_id))
+    return tenant_name, agent_name
+
+
+def join_agent_id(tenant_name: str, agent_name: AgentID) -> AgentID:
+    """
+    Returns the routed agent id "<tenant>/<agent>".
+
+    Args:
+        tenant_name (str): the tenant name.
+        agent_name (AgentID): the agent name within the tenant.
+
+    Returns:
+        AgentID: the routed agent id.
+    """
+    return "{}{}{}".format(tenant_name, TENANT_SEPARATOR, agent_name)
+
+
+class _TenantSideChannel(object):
+    """
+    Side channel proxy prefixing the keys sent by a tenant adapter with the tenant name.
+    """
+    def __init__(self, side_channel: AbstractSideChannel, tenant_name: str):
+        self._side_channel = side_channel
+        self._tenant_name = tenant_name
+
+    def send(self, key: str, value: SideChannelData) -> None:
+        self._side_channel.send(join_agent_id(self._tenant_name, key), value)
+
+
+class MultiGymEnvironmentAdapter(UDEEnvironmentAdapterInterface,
+                                 SideChannelObserverInterface):
+    """
+    MultiGymEnvironmentAdapter class to host several named GymEnvironmentAdapters (tenants)
+    behind one UDE Environment.
+
+    Agents are exposed as "<tenant>/<agent>", and each request is routed to the tenants
+    of the agents in it. The tenants in a request are stepped in parallel on a shared
+    worker pool, and each tenant admits a limited number of in-flight requests.
+    Side channel messages with "<tenant>/<key>" key are forwarded to the tenant, and
+    its replies are sent back with the same prefix.
+
+    As the tenants are independent, each tenant should reset automatically on done
+    (auto_reset or num_envs > 1). reset() resets every tenant, and returns the reset info
+    of each tenant with tenant name as key.
+    """
+    def __init__(self,
+                 adapters: Dict[str, GymEnvironmentAdapter],
+                 admission_limits: Optional[Dict[str, int]] = None,
+                 admission_timeout: Optional[float] = None,
+                 max_workers: Optional[int] = None):
+        """
+        Initialize MultiGymEnvironmentAdapter
+
+        Args:
+            adapters (Dict[str, GymEnvironmentAdapter]): the adapters to host with tenant name as key.
+            admission_limits (Optional[Dict[str, int]]): the maximum number of in-flight requests
+                per tenant with tenant name as key (tenants not in the dict are unlimited).
+            admission_timeout (Optional[float]): the maximum wait time in seconds for admission
+                (default: wait forever). TenantAdmissionError is raised on timeout.
+            max_workers (Optional[int]): the number of worker threads shared by all tenants
+                (default: the number of tenants).
+        """
+        super().__init__()
+        if not adapters:
+            raise ValueError("At least one adapter is required.")
+        for tenant_name in adapters:
+            if not tenant_name:
+                raise ValueError("Tenant name must not be empty.")
+        self._adapters = dict(adapters)
+        self._admission = {}  # type: Dict[str, BoundedSemaphore]
+        for tenant_name, limit in (admission_limits or {}).items():
+            if tenant_name not in self._adapters:
+                raise ValueError("Unknown tenant in admission_limits: {}".format(tenant_name))
+            if limit < 1:
+                raise ValueError("Admission limit must be at least 1: {}".format(limit))
+            self._admission[tenant_name] = BoundedSemaphore(limit)
+        self._admission_timeout = admission_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or len(self._adapters))
+
+        self._side_channel = SingleSideChannel()
+        self._side_channel.register(self)
+
+    @property
+    def adapters(self) -> Dict[str, GymEnvironmentAdapter]:
+        """
+        Returns the hosted adapters.
+
+        Returns:
+            Dict[str, GymEnvironmentAdapter]: the hosted adapters with tenant name as key.
+        """
+        return dict(self._adapters)
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        Returns the flag whether the environments of every tenant are constructed.
+
+        Returns:
+            bool: True if every tenant is ready, False otherwise.
+        """
+        return all(adapter.is_ready for adapter in self._adapters.values())
+
+    def _admit(self, tenant_name: str) -> Optional[BoundedSemaphore]:
+        """
+        Wait for admission of a request to given tenant.
+
+        Args:
+            tenant_name (str): the tenant name.
+
+        Returns:
+            Optional[BoundedSemaphore]: the admission semaphore to release after the request,
+                or None if the tenant is unlimited.
+        """
+        admission = self._admission.get(tenant_name)
+        if admission is None:
+            return None
+        if self._admission_timeout is None:
+            admission.acquire()
+        elif not admission.acquire(timeout=self._admission_timeout):
+            raise TenantAdmissionError("Tenant {} is at its admission limit.".format(tenant_name))
+        return admission
+
+    def _step_tenant(self, tenant_name: str, action_dict: MultiAgentDict) -> UDEStepResult:
+        """
+        Performs step on given tenant with admission.
+
+        Args:
+            tenant_name (str): the tenant name.
+            action_dict (MultiAgentDict): the actions with the tenant's agent name as key.
+
+        Returns:
+            UDEStepResult: the step result of the tenant.
+        """
+        admission = self._admit(tenant_name)
+        try:
+            return self._adapters[tenant_name].step(action_dict)
+        finally:
+            if admission:
+                admission.release()
+
+    def _route_actions(self, action_dict: MultiAgentDict) -> Dict[str, MultiAgentDict]:
+        """
+        Group the actions by tenant.
+
+        Args:
+            action_dict (MultiAgentDict): the actions with routed agent id as key.
+
+        Returns:
+            Dict[str, MultiAgentDict]: the actions with the tenant's agent name as key per tenant.
+        """
+        tenant_actions = {}  # type: Dict[str, MultiAgentDict]
+        for agent_id, action in action_dict.items():
+            tenant_name, agent_name = split_agent_id(agent_id)
+            if tenant_name not in self._adapters:
+                raise KeyError("Unknown tenant: {}".format(tenant_name))
+            tenant_actions.setdefault(tenant_name, {})[agent_name] = action
+        return tenant_actions
+
+    def step(self, action_dict: MultiAgentDict) -> UDEStepResult:
+        """
+        Performs step on the tenants of the agents in action_dict, and merge the results
+        with routed agent id as key.
+
+        Args:
+            action_dict (MultiAgentDict): the action for the agent with "<tenant>/<agent>" as key.
+
+        Returns:
+            UDEStepResult: observation, reward, done, last_action, info
+        """
+        tenant_actions = self._route_actions(action_dict)
+        if len(tenant_actions) == 1:
+            tenant_name, actions = next(iter(tenant_actions.items()))
+            tenant_results = [(tenant_name, self._step_tenant(tenant_name, actions))]
+        else:
+            futures = [(tenant_name, self._executor.submit(self._step_tenant, tenant_name, actions))
+                       for tenant_name, actions in tenant_actions.items()]
+            tenant_results = [(tenant_name, future.result()) for tenant_name, future in futures]
+
+        obs_dict, reward_dict, done_dict, last_action_dict, info_dict = {}, {}, {}, {}, {}
+        for tenant_name, (obs, reward, done, last_action, info) in tenant_results:
+            agent_names = list(obs.keys())
+            for agent_name in agent_names:
+                agent_id = join_agent_id(tenant_name, agent_name)
+                obs_dict[agent_id] = obs[agent_name]
+                reward_dict[agent_id] = reward[agent_name]
+                done_dict[agent_id] = done[agent_name]
+                last_action_dict[agent_id] = last_action[agent_name]
+            # A tenant hosting a single environment returns its info as is, otherwise info is per agent.
+            if self._adapters[tenant_name].num_envs == 1:
+                if agent_names:
+                    info_dict[join_agent_id(tenant_name, agent_names[0])] = info
+            else:
+                for agent_name in agent_names:
+                    info_dict[join_agent_id(tenant_name, agent_name)] = info.get(agent_name, {})
+        return obs_dict, reward_dict, done_dict, last_action_dict, info_dict
+
+    def reset(self) -> UDEResetResult:
+        """
+        Reset every tenant, and returns the first observations with routed agent id as key,
+        and the reset info of the tenants (e.g. the episode seeds) with tenant name as key.
+
+        Returns:
+            UDEResetResult: first observation and info in new episode.
+        """
+        futures = [(tenant_name, self._executor.submit(adapter.reset))
+                   for tenant_name, adapter in self._adapters.items()]
+        obs_dict = {}
+        info_dict = {}
+        for tenant_name, future in futures:
+            obs, info = future.result()
+            for agent_name, agent_obs in obs.items():
+                obs_dict[join_agent_id(tenant_name, agent_name)] = agent_obs
+            if info:
+                info_dict[tenant_name] = info
+        return obs_dict, info_dict
+
+    def close(self) -> None:
+        """
+        Close every tenant, and the environment will be no longer available to be used.
+        """
+        for adapter in self._adapters.values():
+            adapter.close()
+        self._executor.shutdown()
+
+    @staticmethod
+    def _merge_spaces(spaces: List[Tuple[str, Dict[AgentID, Space]]]) -> Dict[AgentID, Space]:
+        """
+        Merge the spaces of tenants with routed agent id as key.
+
+        Args:
+            spaces (List[Tuple[str, Dict[AgentID, Space]]]): tenant name and its spaces with agent name as key.
+
+        Returns:
+            Dict[AgentID, Space]: the spaces with routed agent id as key.
+        """
+        return {join_agent_id(tenant_name, agent_name): space
+                for tenant_name, tenant_spaces in spaces
+                for agent_name, space in tenant_spaces.items()}
+
+    @property
+    def observation_space(self) -> Dict[AgentID, Space]:
+        """
+        Returns the observation spaces of agents in every tenant.
+
+        Returns:
+            Dict[AgentID, Space]: the observation spaces with routed agent id as key.
+        """
+        return self._merge_spaces([(tenant_name, adapter.observation_space)
+                                   for tenant_name, adapter in self._adapters.items()])
+
+    @property
+    def action_space(self) -> Dict[AgentID, Space]:
+        """
+        Returns the action spaces of agents in every tenant.
+
+        Returns:
+            Dict[AgentID, Space]: the action spaces with routed agent id as key.
+        """
+        return self._merge_spaces([(tenant_name, adapter.action_space)
+                                   for tenant_name, adapter in self._adapters.items()])
+
+    @property
+    def side_channel(self) -> AbstractSideChannel:
+        """
+        Returns side channel to send and receive data from UDE Server
+
+        Returns:
+            AbstractSideChannel: the instance of side channel.
+        """
+        return self._side_channel
+
+    def on_received(self, side_channel: AbstractSideChannel, key: str, value: SideChannelData) -> None:
+        """
+        Callback when side channel instance receives new message.
+        The message with "<tenant>/<key>" key is forwarded to the tenant.
+
+        Args:
+            side_channel (AbstractSideChannel): side channel instance
+            key (str): The string identifier of message
+            value (SideChannelData): The data of the message.
+        """
+        tenant_name, separator, tenant_key = key.rpartition(TENANT_SEPARATOR)
+        adapter = self._adapters.get(tenant_name) if separator else None
+        if adapter is None:
+            return
+        adapter.on_received(side_channel=_TenantSideChannel(side_channel, tenant_name),
+                            key=tenant_key,
+                            value=value)
@@ -0,0 +1,419 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""Classes for encoding observations on the server and decoding them on the client.
+
+An encoded observation is a plain dict with ENCODING_KEY, so it passes through
+UDE serialization as is. Observations that are not numpy arrays are not encoded.
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+from threading import Lock
+import zlib
+
+import numpy as np
+
+from ude import AgentID
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:  # pragma: no cover - Python < 3.8
+    shared_memory = None
+    resource_tracker = None
+
+ENCODING_KEY = "ude_obs_encoding"
+
+# Names of shared-memory segments created by encoders in this process.
+_OWNED_SEGMENTS = set()  # type: Set[str]
+
+
+class ObservationEncoder(object):
+    """
+    ObservationEncoder base class. The base encoder returns observations as is.
+    """
+    def encode(self, agent_name: AgentID, obs: Any, new_episode: bool = False) -> Any:
+        """
+        Encode the observation of given agent.
+
+        Args:
+            agent_name (AgentID): the agent the observation belongs to.
+            obs (Any): the observation.
+            new_episode (bool): the flag whether the observation is the first one of an episode.
+
+        Returns:
+            Any: the encoded observation.
+        """
+        return obs
+
+    def close(self) -> None:
+        """
+        Release the resources held by the encoder.
+        """
+        pass
+
+
+class RawBufferObservationEncoder(ObservationEncoder):
+    """
+    RawBufferObservationEncoder class to send observation as raw contiguous bytes
+    with dtype and shape, so the transport carries a single flat buffer instead of
+    a pickled numpy array.
+
+    Encoding copies the observation once into the bytes handed to the transport
+    (twice if the observation is not contiguous). Decoding does not copy, and
+    returns a read-only array over the received bytes.
+    """
+    def encode(self, agent_name: AgentID, obs: Any, new_episode: bool = False) -> Any:
+        if not isinstance(obs, np.ndarray):
+            return obs
+        obs = np.ascontiguousarray(obs)
+        return {ENCODING_KEY: "raw",
+                "dtype": obs.dtype.str,
+                "shape": obs.shape,
+                "data": obs.tobytes()}
+
+
+class SharedMemoryObservationEncoder(ObservationEncoder):
+    """
+    SharedMemoryObservationEncoder class to hand observation over through shared
+    memory when UDE client and server share a host. Only a small descriptor
+    (segment name, dtype, shape) is sent through the transport.
+
+    Each agent has a ring of num_slots segments, and a slot is overwritten
+    num_slots steps later, so the client must decode the observation before that.
+    Encoding copies the observation once into the slot, and decoding copies it once
+    more out of the slot unless the decoder is created with copy=False.
+    Requires Python 3.8+.
+    """
+    def __init__(self, num_slots: int = 4):
+        """
+        Initialize SharedMemoryObservationEncoder
+
+        Args:
+            num_slots (int): the number of shared-memory slots per agent.
+        """
+        if shared_memory is None:
+            raise RuntimeError("SharedMemoryObservationEncoder requires Python 3.8 or above.")
+        if num_slots < 1:
+            raise ValueError("num_slots must be at least 1: {}".format(num_slots))
+        self._num_slots = num_slots
+        self._slots = {}  # type: Dict[AgentID, List[shared_memory.SharedMemory]]
+        self._slot_idx = {}  # type: Dict[AgentID, int]
+        self._lock = Lock()
+
+    def _next_slot(self, agent_name: AgentID, nbytes: int) -> 'shared_memory.SharedMemory':
+        """
+        Returns the next shared-memory slot of given agent that fits nbytes.
+
+        Args:
+            agent_name (AgentID): the agent name.
+            nbytes (int): the number of bytes required.
+
+        Returns:
+            shared_memory.SharedMemory: the shared-memory slot to write.
+        """
+        slots = self._slots.setdefault(agent_name, [])
+        idx = self._slot_idx.get(agent_name, 0)
+        self._slot_idx[agent_name] = (idx + 1) % self._num_slots
+        if idx < len(slots) and slots[idx].size >= nbytes:
+            return slots[idx]
+        slot = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        _OWNED_SEGMENTS.add(slot.name)
+        if idx < len(slots):
+            self._release(slots[idx])
+            slots[idx] = slot
+        else:
+            slots.append(slot)
+        return slot
+
+    @staticmethod
+    def _release(slot: 'shared_memory.SharedMemory') -> None:
+        """
+        Close and unlink given shared-memory slot.
+
+        Args:
+            slot (shared_memory.SharedMemory): the shared-memory slot to release.
+        """
+        _OWNED_SEGMENTS.discard(slot.name)
+        slot.close()
+        slot.unlink()
+
+    def encode(self, agent_name: AgentID, obs: Any, new_episode: bool = False) -> Any:
+        if not isinstance(obs, np.ndarray):
+            return obs
+        with self._lock:
+            slot_idx = self._slot_idx.get(agent_name, 0)
+            slot = self._next_slot(agent_name, obs.nbytes)
+            np.copyto(np.ndarray(obs.shape, dtype=obs.dtype, buffer=slot.buf), obs)
+            return {ENCODING_KEY: "shm",
+                    "name": slot.name,
+                    "slot": slot_idx,
+                    "dtype": obs.dtype.str,
+                    "shape": obs.shape}
+
+    def close(self) -> None:
+        with self._lock:
+            for slots in self._slots.values():
+                for slot in slots:
+                    self._release(slot)
+            self._slots.clear()
+            self._slot_idx.clear()
+
+
+class DeltaObservationEncoder(ObservationEncoder):
+    """
+    DeltaObservationEncoder class to exploit temporal redundancy between consecutive
+    frames. A keyframe carries the whole frame, and the frames in between carry the
+    XOR against the previous frame, which is mostly zeros and compresses well.
+    Both are zlib-compressed.
+
+    Every frame carries a per-agent sequence number, so the decoder detects a missing
+    frame instead of applying a delta against the wrong reference frame.
+
+    Float observations can be quantized to uint8 over quantize_range before encoding.
+    The decoder then returns the dequantized float observations.
+    """
+    def __init__(self,
+                 keyframe_interval: int = 30,
+                 quantize_range: Optional[Tuple[float, float]] = None,
+                 compress_level: int = 1):
+        """
+        Initialize DeltaObservationEncoder
+
+        Args:
+            keyframe_interval (int): the maximum number of frames between keyframes.
+                The first frame of every episode is always a keyframe.
+            quantize_range (Optional[Tuple[float, float]]): the (low, high) range to quantize
+                float observations into uint8, or None to keep the original dtype.
+            compress_level (int): zlib compression level (0-9).
+        """
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval must be at least 1: {}".format(keyframe_interval))
+        if quantize_range is not None and not quantize_range[0] < quantize_range[1]:
+            raise ValueError("quantize_range must be (low, high) with low < high: {}".format(quantize_range))
+        self._keyframe_interval = keyframe_interval
+        self._quantize_range = quantize_range
+        self._compress_level = compress_level
+        self._prev_frames = {}  # type: Dict[AgentID, np.ndarray]
+        self._frame_counts = {}  # type: Dict[AgentID, int]
+        self._seqs = {}  # type: Dict[AgentID, int]
+        self._lock = Lock()
+
+    def _quantize(self, obs: np.ndarray) -> np.ndarray:
+        """
+        Quantize float observation into uint8 over quantize_range.
+
+        Args:
+            obs (np.ndarray): the float observation.
+
+        Returns:
+            np.ndarray: the quantized observation.
+        """
+        low, high = self._quantize_range
+        scaled = (obs - low) * (255.0 / (high - low))
+        return np.clip(np.rint(scaled), 0, 255).astype(np.uint8)
+
+    def encode(self, agent_name: AgentID, obs: Any, new_episode: bool = False) -> Any:
+        if not isinstance(obs, np.ndarray):
+            return obs
+        quantized = self._quantize_range is not None and np.issubdtype(obs.dtype, np.floating)
+        frame = self._quantize(obs) if quantized else np.ascontiguousarray(obs)
+        with self._lock:
+            prev_frame = self._prev_frames.get(agent_name)
+            frame_count = self._frame_counts.get(agent_name, 0)
+            seq = self._seqs.get(agent_name, -1) + 1
+            self._seqs[agent_name] = seq
+            same_layout = prev_frame is not None and prev_frame.shape == frame.shape and prev_frame.dtype == frame.dtype
+            is_keyframe = new_episode or not same_layout or frame_count >= self._keyframe_interval
+            if is_keyframe:
+                payload = frame.tobytes()
+                self._frame_counts[agent_name] = 1
+            else:
+                payload = np.bitwise_xor(frame.reshape(-1).view(np.uint8),
+                                         prev_frame.reshape(-1).view(np.uint8)).tobytes()
+                self._frame_counts[agent_name] = frame_count + 1
+            # The environment may reuse its observation buffer, so the previous frame is kept
+            # in a buffer owned by the encoder.
+            if same_layout:
+                np.copyto(prev_frame, frame)
+            else:
+                self._prev_frames[agent_name] = frame if quantized else frame.copy()
+        return {ENCODING_KEY: "delta",
+                "keyframe": is_keyframe,
+                "seq": seq,
+                "dtype": frame.dtype.str,
+                "shape": frame.shape,
+                "quantize": (obs.dtype.str, self._quantize_range) if quantized else None,
+                "data": zlib.compress(payload, self._compress_level)}
+
+
+class ObservationDecoder(object):
+    """
+    ObservationDecoder class to reconstruct observations encoded by ObservationEncoder
+    on the UDE client side.
+    """
+    def __init__(self, copy: bool = True):
+        """
+        Initialize ObservationDecoder
+
+        Args:
+            copy (bool): the flag to copy observation out of shared memory. Without copy,
+                the returned array is a view that is overwritten when the slot is reused.
+        """
+        self._copy = copy
+        # Attached shared-memory segments with (agent name, slot index) as key.
+        self._segments = {}  # type: Dict[Tuple[Optional[AgentID], Any], Any]
+        self._prev_frames = {}  # type: Dict[Optional[AgentID], np.ndarray]
+        self._prev_seqs = {}  # type: Dict[Optional[AgentID], int]
+
+    def decode(self, obs: Any, agent_name: Optional[AgentID] = None) -> Any:
+        """
+        Decode the observation.
+
+        Args:
+            obs (Any): the observation received from UDE server.
+            agent_name (Optional[AgentID]): the agent the observation belongs to.
+
+        Returns:
+            Any: the decoded observation.
+        """
+        if not isinstance(obs, dict) or ENCODING_KEY not in obs:
+            return obs
+        encoding = obs[ENCODING_KEY]
+        if encoding == "raw":
+            return np.frombuffer(obs["data"], dtype=np.dtype(obs["dtype"])).reshape(obs["shape"])
+        if encoding == "shm":
+            segment = self._attach(obs["name"], (agent_name, obs.get("slot", obs["name"])))
+            view = np.ndarray(obs["shape"], dtype=np.dtype(obs["dtype"]), buffer=segment.buf)
+            return view.copy() if self._copy else view
+        if encoding == "delta":
+            return self._decode_delta(obs, agent_name)
+        raise ValueError("Unknown observation encoding: {}".format(encoding))
+
+    def _decode_delta(self, obs: Dict[str, Any], agent_name: Optional[AgentID]) -> np.ndarray:
+        """
+        Reconstruct the frame encoded by DeltaObservationEncoder.
+
+        Args:
+            obs (Dict[str, Any]): the encoded observation.
+            agent_name (Optional[AgentID]): the agent the observation belongs to.
+
+        Returns:
+            np.ndarray: the reconstructed observation.
+
+        Raises:
+            ValueError: if the delta frame does not follow the previously decoded frame.
+                The decoder then waits for the next keyframe of the agent.
+        """
+        frame = np.frombuffer(zlib.decompress(obs["data"]), dtype=np.dtype(obs["dtype"])).reshape(obs["shape"])
+        seq = obs["seq"]
+        if not obs["keyframe"]:
+            prev_frame = self._prev_frames.get(agent_name)
+            if prev_frame is None:
+                raise ValueError("Delta frame received before keyframe for agent: {}".format(agent_name))
+            prev_seq = self._prev_seqs[agent_name]
+            if seq != prev_seq + 1:
+                # The reference frame is lost, so no delta can be applied until the next keyframe.
+                del self._prev_frames[agent_name]
+                raise ValueError("Delta frame {} does not follow frame {} for agent: {}".format(seq,
+                                                                                                prev_seq,
+                                                                                                agent_name))
+            frame = np.bitwise_xor(frame.reshape(-1).view(np.uint8),
+                                   prev_frame.reshape(-1).view(np.uint8)).view(frame.dtype).reshape(obs["shape"])
+        self._prev_frames[agent_name] = frame
+        self._prev_seqs[agent_name] = seq
+        if obs["quantize"]:
+            orig_dtype, (low, high) = obs["quantize"]
+            return (frame.astype(np.dtype(orig_dtype)) * ((high - low) / 255.0) + low).astype(np.dtype(orig_dtype))
+        return frame.copy() if self._copy else frame
+
+    def decode_dict(self, obs_dict: Dict[AgentID, Any]) -> Dict[AgentID, Any]:
+        """
+        Decode the observations of all agents.
+
+        Args:
+            obs_dict (Dict[AgentID, Any]): the observations with agent name as key.
+
+        Returns:
+            Dict[AgentID, Any]: the decoded observations with agent name as key.
+        """
+        return {agent_name: self.decode(obs, agent_name) for agent_name, obs in obs_dict.items()}
+
+    def _attach(self, name: str, key: Tuple[Optional[AgentID], Any]) -> Any:
+        """
+        Returns the shared-memory segment with given name for the slot, attaching it on first use.
+        The segment previously attached for the slot is detached when the server replaced it.
+
+        Args:
+            name (str): the shared-memory segment name.
+            key (Tuple[Optional[AgentID], Any]): the agent name and slot index of the segment.
+
+        Returns:
+            shared_memory.SharedMemory: the shared-memory segment.
+        """
+        segment = self._segments.get(key)
+        if segment is not None and segment.name != name:
+            self._detach(segment)
+            segment = None
+        if segment is None:
+            segment = shared_memory.SharedMemory(name=name)
+            if name not in _OWNED_SEGMENTS:
+                # The server owns the segment, so the client must not unlink it at exit.
+                resource_tracker.unregister(segment._name, "shared_memory")
+            self._segments[key] = segment
+        return segment
+
+    @staticmethod
+    def _detach(segment: Any) -> None:
+        """
+        Detach given shared-memory segment.
+
+        Args:
+            segment (shared_memory.SharedMemory): the shared-memory segment to detach.
+        """
+        try:
+            segment.close()
+        except BufferError:
+            # Views decoded without copy still use the mapping, which is unmapped along with them.
+            pass
+
+    def close(self) -> None:
+        """
+        Detach all shared-memory segments, and drop the previous frames of delta decoding.
+        """
+        for segment in self._segments.values():
+            self._detach(segment)
+        self._segments.clear()
+        self._prev_frames.clear()
+
+
+def create_observation_encoder(encoding: Optional[str], **kwargs) -> Optional[ObservationEncoder]:
+    """
+    Create observation encoder with given encoding name.
+
+    Args:
+        encoding (Optional[str]): the encoding name ("raw", "shm" or "delta"), or None for no encoding.
+        kwargs: Arbitrary keyword arguments for the encoder.
+
+    Returns:
+        Optional[ObservationEncoder]: the observation encoder, or None for no encoding.
+    """
+    if not encoding or encoding == "none":
+        return None
+    if encoding == "raw":
+        return RawBufferObservationEncoder(**kwargs)
+    if encoding == "shm":
+        return SharedMemoryObservationEncoder(**kwargs)
+    if encoding == "delta":
+        return DeltaObservationEncoder(**kwargs)
+    raise ValueError("Unknown observation encoding: {}".format(encoding))
@@ -0,0 +1,281 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class for the observation and reward preprocessing pipeline applied on the server."""
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from gym.spaces import Box
+from gym.spaces.space import Space
+
+_GRAYSCALE_WEIGHTS = np.array([0.299, 0.587, 0.114])
+
+
+class _RunningMeanStd(object):
+    """
+    Running mean and variance of observations updated one sample at a time (Welford).
+    """
+    def __init__(self, shape: Tuple[int, ...], epsilon: float):
+        self.count = 0
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.std = np.ones(shape, dtype=np.float64)
+        self._m2 = np.zeros(shape, dtype=np.float64)
+        self._delta = np.empty(shape, dtype=np.float64)
+        self._delta2 = np.empty(shape, dtype=np.float64)
+        self._epsilon = epsilon
+
+    def update(self, x: np.ndarray) -> None:
+        self.count += 1
+        np.subtract(x, self.mean, out=self._delta)
+        self.mean += self._delta / self.count
+        np.subtract(x, self.mean, out=self._delta2)
+        np.multiply(self._delta, self._delta2, out=self._delta2)
+        self._m2 += self._delta2
+        np.divide(self._m2, self.count, out=self.std)
+        self.std += self._epsilon
+        np.sqrt(self.std, out=self.std)
+
+
+class PreprocessingPipeline(object):
+    """
+    PreprocessingPipeline class to transform the observations and rewards of the environment
+    on the server: grayscale, resize (nearest neighbor), normalization with running mean/std,
+    and reward clipping.
+
+    The intermediate results are written into buffers preallocated for the observation shape,
+    so each observation allocates only its output array. The running mean/std is shared by
+    the copies of the environment, and restarts when the observation shape changes.
+    """
+    def __init__(self,
+                 grayscale: bool = False,
+                 resize: Optional[Sequence[int]] = None,
+                 normalize: bool = False,
+                 clip_obs: float = 10.0,
+                 clip_reward: Optional[float] = None,
+                 update_stats: bool = True,
+                 epsilon: float = 1e-8):
+        """
+        Initialize PreprocessingPipeline
+
+        Args:
+            grayscale (bool): the flag to convert (height, width, 3 or 4) RGB(A) observations to (height, width).
+            resize (Optional[Sequence[int]]): the (height, width) to resize the observations to.
+            normalize (bool): the flag to normalize the observations with running mean/std to float32.
+            clip_obs (float): the absolute bound to clip the normalized observations to.
+            clip_reward (Optional[float]): the absolute bound to clip the rewards to (default: no clipping).
+            update_stats (bool): the flag to update the running mean/std with the observations of step and reset.
+            epsilon (float): the value added to the variance for numerical stability.
+        """
+        if resize is not None and (len(resize) != 2 or min(resize) < 1):
+            raise ValueError("resize must be (height, width): {}".format(resize))
+        if clip_obs <= 0:
+            raise ValueError("clip_obs must be positive: {}".format(clip_obs))
+        if clip_reward is not None and clip_reward <= 0:
+            raise ValueError("clip_reward must be positive: {}".format(clip_reward))
+        self._grayscale = grayscale
+        self._resize = tuple(int(size) for size in resize) if resize is not None else None
+        self._normalize = normalize
+        self._clip_obs = float(clip_obs)
+        self._clip_reward = float(clip_reward) if clip_reward is not None else None
+        self.update_stats = update_stats
+        self._epsilon = epsilon
+
+        # Buffers allocated for the input shape and dtype.
+        self._input_key = None  # type: Optional[Tuple[Tuple[int, ...], np.dtype]]
+        self._gray_buffer = None  # type: Optional[np.ndarray]
+        self._resize_indices = None  # type: Optional[Tuple[np.ndarray, np.ndarray]]
+        self._row_buffer = None  # type: Optional[np.ndarray]
+        self._resize_buffer = None  # type: Optional[np.ndarray]
+        self._norm_buffer = None  # type: Optional[np.ndarray]
+        self._stats = None  # type: Optional[_RunningMeanStd]
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "PreprocessingPipeline":
+        """
+        Returns the pipeline created from the config dict (e.g. received through side channel).
+
+        Args:
+            config (Dict[str, Any]): the keyword arguments of PreprocessingPipeline.
+
+        Returns:
+            PreprocessingPipeline: the pipeline.
+        """
+        return cls(**config)
+
+    def to_config(self) -> Dict[str, Any]:
+        """
+        Returns the config dict of the pipeline.
+
+        Returns:
+            Dict[str, Any]: the keyword arguments of PreprocessingPipeline.
+        """
+        return {"grayscale": self._grayscale,
+                "resize": list(self._resize) if self._resize else None,
+                "normalize": self._normalize,
+                "clip_obs": self._clip_obs,
+                "clip_reward": self._clip_reward,
+                "update_stats": self.update_stats}
+
+    @property
+    def transforms_obs(self) -> bool:
+        """
+        Returns the flag whether the pipeline transforms observations.
+
+        Returns:
+            bool: True if any observation transform is enabled, False otherwise.
+        """
+        return self._grayscale or self._resize is not None or self._normalize
+
+    @property
+    def is_identity(self) -> bool:
+        """
+        Returns the flag whether the pipeline leaves the observations and rewards unchanged.
+
+        Returns:
+            bool: True if no transform is enabled, False otherwise.
+        """
+        return not self.transforms_obs and self._clip_reward is None
+
+    def _check_input(self, shape: Tuple[int, ...]) -> None:
+        if self._grayscale and (len(shape) != 3 or shape[-1] not in (3, 4)):
+            raise ValueError("grayscale requires (height, width, 3 or 4) observation: {}".format(shape))
+        if self._resize is not None and len(shape) < 2:
+            raise ValueError("resize requires (height, width, ...) observation: {}".format(shape))
+
+    def _resize_index(self, shape: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+        height, width = self._resize
+        rows = (np.arange(height) * shape[0] // height).astype(np.intp)
+        cols = (np.arange(width) * shape[1] // width).astype(np.intp)
+        return rows, cols
+
+    def observation_space(self, space: Space) -> Space:
+        """
+        Returns the observation space transformed by the pipeline.
+
+        Args:
+            space (Space): the observation space of the environment.
+
+        Returns:
+            Space: the transformed observation space.
+
+        Raises:
+            ValueError: if the pipeline does not support the observation space.
+        """
+        if not self.transforms_obs:
+            return space
+        if not isinstance(space, Box):
+            raise ValueError("Observation preprocessing requires Box observation space: {}".format(space))
+        self._check_input(space.shape)
+        low, high = space.low, space.high
+        if self._grayscale:
+            low, high = low[..., :3].min(axis=-1), high[..., :3].max(axis=-1)
+        if self._resize is not None:
+            rows, cols = self._resize_index(low.shape)
+            low, high = low[rows][:, cols], high[rows][:, cols]
+        if self._normalize:
+            return Box(low=-self._clip_obs, high=self._clip_obs, shape=low.shape, dtype=np.float32)
+        return Box(low=low.astype(space.dtype), high=high.astype(space.dtype), dtype=space.dtype)
+
+    def _allocate(self, obs: np.ndarray) -> None:
+        """
+        Allocate the buffers for the shape and dtype of given observation.
+
+        Args:
+            obs (np.ndarray): the observation.
+        """
+        self._check_input(obs.shape)
+        self._input_key = (obs.shape, obs.dtype)
+        shape = obs.shape
+        self._gray_buffer = None
+        if self._grayscale:
+            shape = shape[:2]
+            self._gray_buffer = np.empty(shape, dtype=np.float64)
+        self._resize_indices = None
+        if self._resize is not None:
+            rows, cols = self._resize_index(shape)
+            self._resize_indices = (rows, cols)
+            dtype = np.float64 if self._grayscale else obs.dtype
+            self._row_buffer = np.empty((len(rows),) + shape[1:], dtype=dtype)
+            shape = (len(rows), len(cols)) + shape[2:]
+            self._resize_buffer = np.empty(shape, dtype=dtype)
+        self._norm_buffer = None
+        if self._normalize:
+            self._norm_buffer = np.empty(shape, dtype=np.float64)
+            if self._stats is None or self._stats.mean.shape != shape:
+                self._stats = _RunningMeanStd(shape, self._epsilon)
+
+    def process_obs(self, obs: Any) -> Any:
+        """
+        Transform the observation, and update the running mean/std with it if enabled.
+
+        Args:
+            obs (Any): the observation of the environment.
+
+        Returns:
+            Any: the transformed observation in a new array.
+        """
+        if not self.transforms_obs:
+            return obs
+        obs = np.asarray(obs)
+        if self._input_key != (obs.shape, obs.dtype):
+            self._allocate(obs)
+        value = obs
+        if self._grayscale:
+            np.dot(value[..., :3], _GRAYSCALE_WEIGHTS, out=self._gray_buffer)
+            value = self._gray_buffer
+        if self._resize_indices is not None:
+            rows, cols = self._resize_indices
+            np.take(value, rows, axis=0, out=self._row_buffer)
+            np.take(self._row_buffer, cols, axis=1, out=self._resize_buffer)
+            value = self._resize_buffer
+        if self._normalize:
+            stats = self._stats
+            if self.update_stats:
+                stats.update(value)
+            norm = self._norm_buffer
+            np.subtract(value, stats.mean, out=norm)
+            np.divide(norm, stats.std, out=norm)
+            np.clip(norm, -self._clip_obs, self._clip_obs, out=norm)
+            return norm.astype(np.float32)
+        if value.dtype != obs.dtype and np.issubdtype(obs.dtype, np.integer):
+            np.rint(value, out=value)
+        return value.astype(obs.dtype)
+
+    def process_reward(self, reward: Any) -> Any:
+        """
+        Clip the reward.
+
+        Args:
+            reward (Any): the reward of the environment.
+
+        Returns:
+            Any: the clipped reward.
+        """
+        if self._clip_reward is None:
+            return reward
+        return min(max(reward, -self._clip_reward), self._clip_reward)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the summary of the running mean/std of the observations.
+
+        Returns:
+            Dict[str, Any]: the number of observations counted, and the mean of the running mean and std.
+        """
+        if self._stats is None:
+            return {"count": 0}
+        return {"count": self._stats.count,
+                "mean": float(self._stats.mean.mean()),
+                "std": float(self._stats.std.mean())}
@@ -0,0 +1,125 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class deriving reproducible seeds per hosted environment copy and per episode."""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import gym
+
+
+def reset_env(env: gym.Env, seed: Optional[int] = None) -> Any:
+    """
+    Reset the environment, seeding the environment and its action space first if seed is given.
+
+    Args:
+        env (gym.Env): OpenAI Gym environment (optionally wrapped).
+        seed (Optional[int]): the seed of new episode, or None to reset without seeding.
+
+    Returns:
+        Any: the first observation of new episode.
+    """
+    if seed is None:
+        return env.reset()
+    # Seeded for the sampling of the random rollout policy.
+    env.action_space.seed(seed)
+    try:
+        return env.reset(seed=seed)
+    except TypeError:
+        # gym < 0.22 takes no seed in reset.
+        env.seed(seed)
+        return env.reset()
+
+
+class SeedSchedule(object):
+    """
+    SeedSchedule class to derive an independent seed for each episode of each hosted copy.
+
+    The seed of episode k of copy i is drawn from SeedSequence(seed, spawn_key=(i, k)),
+    the same stream as SeedSequence(seed).spawn(...)[i].spawn(...)[k], so it depends only
+    on the root seed, the copy index and the episode index. Replaying with the same root
+    seed reproduces every episode regardless of the order the copies are reset in.
+    """
+    def __init__(self, seed: int, num_envs: int = 1):
+        """
+        Initialize SeedSchedule
+
+        Args:
+            seed (int): the root seed.
+            num_envs (int): the number of hosted copies.
+        """
+        if seed < 0:
+            raise ValueError("seed must not be negative: {}".format(seed))
+        if num_envs < 1:
+            raise ValueError("num_envs must be at least 1: {}".format(num_envs))
+        self._seed = int(seed)
+        self._episodes = [0] * num_envs
+
+    @property
+    def seed(self) -> int:
+        """
+        Returns the root seed.
+
+        Returns:
+            int: the root seed.
+        """
+        return self._seed
+
+    def episode_seed(self, env_idx: int, episode_idx: int) -> int:
+        """
+        Returns the seed of given episode of given copy.
+
+        Args:
+            env_idx (int): the index of the hosted copy.
+            episode_idx (int): the index of the episode of the copy.
+
+        Returns:
+            int: the 32-bit seed of the episode.
+        """
+        seed_seq = np.random.SeedSequence(self._seed, spawn_key=(env_idx, episode_idx))
+        return int(seed_seq.generate_state(1, dtype=np.uint32)[0])
+
+    def next_seed(self, env_idx: int) -> int:
+        """
+        Returns the seed of the next episode of given copy, and advances the episode index.
+
+        Args:
+            env_idx (int): the index of the hosted copy.
+
+        Returns:
+            int: the 32-bit seed of the episode.
+        """
+        episode_idx = self._episodes[env_idx]
+        self._episodes[env_idx] = episode_idx + 1
+        return self.episode_seed(env_idx, episode_idx)
+
+    @property
+    def episodes(self) -> List[int]:
+        """
+        Returns the number of episodes seeded per copy.
+
+        Returns:
+            List[int]: the number of episodes seeded with copy index as index.
+        """
+        return list(self._episodes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the root seed and the number of episodes seeded per copy.
+
+        Returns:
+            Dict[str, Any]: the root seed and the episode counts.
+        """
+        return {"seed": self._seed, "episodes": self.episodes}
@@ -0,0 +1,443 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""Load and soak test of GymEnvRemoteRunner with concurrent UDE client processes over localhost.
+
+Usage:
+    python -m ude_gym_bridge.soak --clients 1 --clients 8 --clients 64 --duration 60 \
+        --env CartPole-v0 --switch-env CartPole-v1 --switch-interval 5 --output report.json
+
+The runner is hosted in this process, and each client is a separate process stepping
+as fast as the server responds. The runner process RSS, CPU time, thread and open file
+counts are sampled from /proc (Linux only), and the environment is switched periodically
+through the "env" side channel message to detect resources leaked across switches.
+A switch takes effect at the next reset, so the clients reset after each switch.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from threading import Event, Thread
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import sys
+import time
+
+import numpy as np
+
+from ude import (
+    UDEEnvironment,
+    RemoteEnvironmentAdapter,
+    UDEStepInvokeType,
+    Compression
+)
+from ude_gym_bridge.benchmark import _find_free_port, _latency_stats
+from ude_gym_bridge.gym_env_remote_runner import GymEnvRemoteRunner
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def read_process_stats(pid: Optional[int] = None) -> Dict[str, float]:
+    """
+    Returns the resource usage of given process read from /proc.
+
+    Args:
+        pid (Optional[int]): the process id (default: this process).
+
+    Returns:
+        Dict[str, float]: rss_kb, cpu_sec (user + system), num_threads and num_fds,
+            or empty dict if /proc is not available.
+    """
+    proc_dir = "/proc/{}".format(pid or "self")
+    try:
+        stats = {}  # type: Dict[str, float]
+        with open(os.path.join(proc_dir, "status")) as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    stats["rss_kb"] = float(line.split()[1])
+                elif line.startswith("Threads:"):
+                    stats["num_threads"] = float(line.split()[1])
+        with open(os.path.join(proc_dir, "stat")) as f:
+            # The fields after the command name, which may contain spaces, start from the state.
+            fields = f.read().rsplit(")", 1)[1].split()
+        stats["cpu_sec"] = (float(fields[11]) + float(fields[12])) / _CLOCK_TICKS
+        stats["num_fds"] = float(len(os.listdir(os.path.join(proc_dir, "fd"))))
+        return stats
+    except OSError:
+        return {}
+
+
+class _ResourceSampler(object):
+    """
+    Background sampler of the resource usage of this process.
+    """
+    def __init__(self, interval: float):
+        self._interval = interval
+        self._samples = []  # type: List[Dict[str, float]]
+        self._stop = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._sample()
+        self._thread.start()
+
+    def stop(self) -> List[Dict[str, float]]:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return self._samples
+
+    def _sample(self) -> None:
+        stats = read_process_stats()
+        if stats:
+            stats["time"] = time.monotonic()
+            self._samples.append(stats)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self._sample()
+
+
+def _client_main(port: int,
+                 agent_name: str,
+                 compression: Compression,
+                 duration: float,
+                 start_event: Any,
+                 switch_count: Any,
+                 result_queue: Any) -> None:
+    """
+    Entry point of a client process: connect to UDE Server on localhost, and step
+    until the duration elapses. The runner resets environments automatically on done,
+    so the client resets only at start and after each environment switch, which the
+    runner swaps in at reset.
+
+    Args:
+        port (int): the port of UDE Server.
+        agent_name (str): the agent name to act as.
+        compression (Compression): channel compression type.
+        duration (float): the time in seconds to step for once started.
+        start_event (Any): the event set when every client should start stepping.
+        switch_count (Any): the shared counter of environment switches made.
+        result_queue (Any): the queue to put the client result to.
+    """
+    step_latencies = []
+    num_resets = 0
+    errors = {}  # type: Dict[str, int]
+    try:
+        ude_env = UDEEnvironment(RemoteEnvironmentAdapter("localhost", port=port, compression=compression))
+        try:
+            start_event.wait()
+            seen_switch_count = None
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                if switch_count.value != seen_switch_count:
+                    seen_switch_count = switch_count.value
+                    ude_env.reset()
+                    num_resets += 1
+                    # The switched environment may have another action space.
+                    action_space = ude_env.action_space[agent_name]
+                action_dict = {agent_name: action_space.sample()}
+                start_time = time.perf_counter()
+                try:
+                    ude_env.step(action_dict)
+                except Exception as ex:
+                    name = type(ex).__name__
+                    errors[name] = errors.get(name, 0) + 1
+                    continue
+                step_latencies.append(time.perf_counter() - start_time)
+        finally:
+            ude_env.close()
+    except Exception as ex:
+        name = type(ex).__name__
+        errors[name] = errors.get(name, 0) + 1
+    result_queue.put({"num_steps": len(step_latencies),
+                      "num_resets": num_resets,
+                      "step_latencies": step_latencies,
+                      "errors": errors})
+
+
+def _resource_report(samples: List[Dict[str, float]],
+                     switch_samples: List[Dict[str, float]],
+                     warmup_switches: int,
+                     leak_threshold_kb: float) -> Dict[str, Any]:
+    """
+    Returns the resource usage report of the soak run.
+
+    The leak check fits the RSS sampled after each environment switch (past the warmup
+    switches, which fill caches and pools) with a line. RSS growing by more than
+    leak_threshold_kb per switch, or threads or open files growing across switches,
+    is reported as a suspected leak.
+
+    Args:
+        samples (List[Dict[str, float]]): the periodic resource samples.
+        switch_samples (List[Dict[str, float]]): the resource samples after each environment switch.
+        warmup_switches (int): the number of first switches to exclude from the leak check.
+        leak_threshold_kb (float): the RSS growth per switch in KB to suspect a leak.
+
+    Returns:
+        Dict[str, Any]: the resource usage report.
+    """
+    report = {}  # type: Dict[str, Any]
+    if len(samples) >= 2:
+        first, last = samples[0], samples[-1]
+        wall_time = last["time"] - first["time"]
+        rss = [sample["rss_kb"] for sample in samples]
+        report.update({"rss_start_kb": first["rss_kb"],
+                       "rss_end_kb": last["rss_kb"],
+                       "rss_max_kb": max(rss),
+                       "rss_growth_kb_per_min": (last["rss_kb"] - first["rss_kb"]) / wall_time * 60.0
+                       if wall_time > 0 else 0.0,
+                       "cpu_percent": (last["cpu_sec"] - first["cpu_sec"]) / wall_time * 100.0
+                       if wall_time > 0 else 0.0,
+                       "num_threads_max": max(sample["num_threads"] for sample in samples),
+                       "num_fds_max": max(sample["num_fds"] for sample in samples)})
+    checked = switch_samples[warmup_switches:]
+    leak = {"num_switches": len(switch_samples), "checked_switches": len(checked)}  # type: Dict[str, Any]
+    if len(checked) >= 2:
+        rss_slope = float(np.polyfit(np.arange(len(checked)), [sample["rss_kb"] for sample in checked], 1)[0])
+        thread_growth = checked[-1]["num_threads"] - checked[0]["num_threads"]
+        fd_growth = checked[-1]["num_fds"] - checked[0]["num_fds"]
+        leak.update({"rss_growth_kb_per_switch": rss_slope,
+                     "thread_growth": thread_growth,
+                     "fd_growth": fd_growth,
+                     "leak_suspected": rss_slope > leak_threshold_kb or thread_growth > 0 or fd_growth > 0})
+    report["env_switch"] = leak
+    return report
+
+
+def run_soak(env_name: str = "CartPole-v0",
+             num_clients: int = 1,
+             duration: float = 60.0,
+             switch_env_names: Sequence[str] = (),
+             switch_interval: float = 0.0,
+             sample_interval: float = 1.0,
+             warmup_switches: int = 2,
+             leak_threshold_kb: float = 256.0,
+             compression: Compression = Compression.NoCompression,
+             step_invoke_type: UDEStepInvokeType = UDEStepInvokeType.WAIT_FOREVER,
+             step_invoke_period: float = 120.0,
+             port: Optional[int] = None,
+             num_envs: int = 1,
+             **runner_kwargs) -> Dict[str, Any]:
+    """
+    Start GymEnvRemoteRunner on localhost, drive it with concurrent client processes for
+    the duration, and measure throughput, latency, lock contention and resource usage.
+
+    Args:
+        env_name (str): OpenAI Gym environment name.
+        num_clients (int): the number of client processes.
+        duration (float): the time in seconds to step for.
+        switch_env_names (Sequence[str]): OpenAI Gym environment names to switch to in turn with
+            env_name through "env" side channel message (default: no switch).
+        switch_interval (float): the interval in seconds between environment switches.
+        sample_interval (float): the interval in seconds between resource samples.
+        warmup_switches (int): the number of first switches to exclude from the leak check.
+        leak_threshold_kb (float): the RSS growth per switch in KB to suspect a leak.
+        compression (Compression): channel compression type.
+        step_invoke_type (UDEStepInvokeType): step invoke type.
+        step_invoke_period (float): step invoke period (used only with PERIODIC step_invoke_type).
+        port (Optional[int]): port to use for UDE Server (default: a free port).
+        num_envs (int): the number of environment copies to host. The clients act as
+            agent0 ... agent{num_envs - 1} in turn.
+        runner_kwargs: Arbitrary keyword arguments for GymEnvRemoteRunner.
+
+    Returns:
+        Dict[str, Any]: the soak result.
+    """
+    if num_clients < 1:
+        raise ValueError("num_clients must be at least 1: {}".format(num_clients))
+    port = port or _find_free_port()
+    runner = GymEnvRemoteRunner(env_name=env_name,
+                                render=False,
+                                step_invoke_type=step_invoke_type,
+                                step_invoke_period=step_invoke_period,
+                                port=port,
+                                compression=compression,
+                                num_envs=num_envs,
+                                profile=True,
+                                auto_reset=True,
+                                **runner_kwargs)
+    runner.start()
+    context = multiprocessing.get_context("spawn")
+    start_event = context.Event()
+    switch_count = context.Value("i", 0)
+    result_queue = context.Queue()
+    sampler = _ResourceSampler(sample_interval)
+    switch_samples = []  # type: List[Dict[str, float]]
+    client_results = []
+    hung_clients = 0
+    try:
+        clients = []
+        for idx in range(num_clients):
+            agent_name = "agent{}".format(idx % num_envs)
+            client = context.Process(target=_client_main,
+                                     args=(port, agent_name, compression, duration, start_event,
+                                           switch_count, result_queue),
+                                     daemon=True)
+            client.start()
+            clients.append(client)
+
+        sampler.start()
+        start_time = time.monotonic()
+        start_event.set()
+        env_cycle = [env_name] + list(switch_env_names)
+        deadline = start_time + duration
+        if switch_env_names and switch_interval > 0:
+            adapter = runner.adapter
+            next_switch_time = start_time + switch_interval
+            while next_switch_time < deadline:
+                time.sleep(max(next_switch_time - time.monotonic(), 0.0))
+                if switch_count.value:
+                    # Sampled after the clients reset into the previous switch.
+                    switch_samples.append(read_process_stats())
+                adapter.on_received(adapter.side_channel, "env", env_cycle[(switch_count.value + 1) % len(env_cycle)])
+                with switch_count.get_lock():
+                    switch_count.value += 1
+                next_switch_time += switch_interval
+            if switch_count.value:
+                time.sleep(max(min(next_switch_time, deadline) - time.monotonic(), 0.0))
+                switch_samples.append(read_process_stats())
+
+        # Clients connect and reset before their own deadline starts, so allow a grace period.
+        join_deadline = deadline + max(duration, 30.0)
+        for _ in clients:
+            try:
+                client_results.append(result_queue.get(timeout=max(join_deadline - time.monotonic(), 0.1)))
+            except queue.Empty:
+                break
+        for client in clients:
+            client.join(timeout=1.0)
+            if client.is_alive():
+                hung_clients += 1
+                client.terminate()
+        total_time = time.monotonic() - start_time
+    finally:
+        samples = sampler.stop()
+        profile_stats = runner.adapter.profiler.stats() if runner.adapter.profiler else {}
+        runner.stop()
+
+    step_latencies = [latency for result in client_results for latency in result["step_latencies"]]
+    errors = {}  # type: Dict[str, int]
+    for result in client_results:
+        for name, count in result["errors"].items():
+            errors[name] = errors.get(name, 0) + count
+    num_steps = sum(result["num_steps"] for result in client_results)
+    num_resets = sum(result["num_resets"] for result in client_results)
+    phases = profile_stats.get("phases", {})
+    result = {
+        "env_name": env_name,
+        "switch_env_names": list(switch_env_names),
+        "num_clients": num_clients,
+        "num_envs": num_envs,
+        "compression": compression.name,
+        "step_invoke_type": step_invoke_type.name,
+        "duration": duration,
+        "num_steps": num_steps,
+        "num_resets": num_resets,
+        "steps_per_sec": num_steps / duration if duration > 0 else 0.0,
+        "wall_time": total_time,
+        "errors": errors,
+        "completed_clients": len(client_results),
+        "hung_clients": hung_clients,
+        "lock_wait": phases.get("lock_wait", {"count": 0}),
+        "server_phases": phases,
+    }
+    if step_latencies:
+        result["step_latency_p999_ms"] = float(np.percentile(np.asarray(step_latencies) * 1000.0, 99.9))
+    result.update(_latency_stats("step", step_latencies))
+    result.update(_resource_report(samples, switch_samples, warmup_switches, leak_threshold_kb))
+    return result
+
+
+def run_soaks(client_counts: Sequence[int], **kwargs) -> List[Dict[str, Any]]:
+    """
+    Run soak test for each given number of concurrent clients.
+
+    Args:
+        client_counts (Sequence[int]): the numbers of concurrent clients.
+        kwargs: Arbitrary keyword arguments for run_soak.
+
+    Returns:
+        List[Dict[str, Any]]: the soak results.
+    """
+    return [run_soak(num_clients=num_clients, **kwargs) for num_clients in client_counts]
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    """
+    Returns the argument parser of soak CLI.
+
+    Returns:
+        argparse.ArgumentParser: the argument parser.
+    """
+    parser = argparse.ArgumentParser(description="Load and soak test UDE Gym Bridge with concurrent clients.")
+    parser.add_argument("--env", default="CartPole-v0", help="OpenAI Gym environment name.")
+    parser.add_argument("--clients", dest="client_counts", type=int, action="append",
+                        help="the number of concurrent client processes (repeatable, default: 1, 8 and 64).")
+    parser.add_argument("--duration", type=float, default=60.0, help="the time in seconds to step per run.")
+    parser.add_argument("--switch-env", dest="switch_env_names", action="append", default=[],
+                        help="OpenAI Gym environment name to switch to in turn with --env (repeatable).")
+    parser.add_argument("--switch-interval", type=float, default=5.0,
+                        help="the interval in seconds between environment switches.")
+    parser.add_argument("--sample-interval", type=float, default=1.0,
+                        help="the interval in seconds between resource samples.")
+    parser.add_argument("--num-envs", type=int, default=1, help="the number of environment copies to host.")
+    parser.add_argument("--use-subprocess", action="store_true",
+                        help="host each environment copy in a worker subprocess.")
+    parser.add_argument("--compression", default="NoCompression",
+                        choices=[compression.name for compression in Compression],
+                        help="channel compression type.")
+    parser.add_argument("--step-invoke-type", default="WAIT_FOREVER",
+                        choices=[step_invoke_type.name for step_invoke_type in UDEStepInvokeType],
+                        help="step invoke type.")
+    parser.add_argument("--step-invoke-period", type=float, default=120.0,
+                        help="step invoke period used with PERIODIC step invoke type.")
+    parser.add_argument("--port", type=int, default=None, help="port to use for UDE Server.")
+    parser.add_argument("--output", default=None, help="JSON file path to write the report (default: stdout).")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    args = _build_arg_parser().parse_args(argv)
+    results = run_soaks(client_counts=args.client_counts or [1, 8, 64],
+                        env_name=args.env,
+                        duration=args.duration,
+                        switch_env_names=args.switch_env_names,
+                        switch_interval=args.switch_interval,
+                        sample_interval=args.sample_interval,
+                        num_envs=args.num_envs,
+                        use_subprocess=args.use_subprocess,
+                        compression=Compression[args.compression],
+                        step_invoke_type=UDEStepInvokeType[args.step_invoke_type],
+                        step_invoke_period=args.step_invoke_period,
+                        port=args.port)
+    report = {
+        "timestamp": time.time(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class for immutable snapshot of agent spaces with JSON descriptors and version hash."""
+from typing import Any, Dict
+import copy
+import hashlib
+import json
+
+import numpy as np
+from gym.spaces import Box, Dict as DictSpace, Discrete, MultiBinary, MultiDiscrete, Tuple as TupleSpace
+from gym.spaces.space import Space
+
+from ude import AgentID
+
+
+def _bound_to_json(bound: np.ndarray) -> Any:
+    """
+    Returns JSON value of Box bound. A uniform bound is collapsed to a scalar.
+
+    Args:
+        bound (np.ndarray): the low or high bound of Box space.
+
+    Returns:
+        Any: the scalar or nested list of the bound.
+    """
+    bound = np.asarray(bound)
+    if bound.size and np.all(bound == bound.flat[0]):
+        return bound.flat[0].item()
+    return bound.tolist()
+
+
+def describe_space(space: Space) -> Dict[str, Any]:
+    """
+    Returns the JSON-serializable descriptor of given space.
+
+    Args:
+        space (Space): OpenAI Gym space.
+
+    Returns:
+        Dict[str, Any]: the descriptor with "type" key and the parameters of the space.
+    """
+    if isinstance(space, Box):
+        return {"type": "Box",
+                "shape": list(space.shape),
+                "dtype": np.dtype(space.dtype).str,
+                "low": _bound_to_json(space.low),
+                "high": _bound_to_json(space.high)}
+    if isinstance(space, Discrete):
+        return {"type": "Discrete", "n": int(space.n), "start": int(getattr(space, "start", 0))}
+    if isinstance(space, MultiDiscrete):
+        return {"type": "MultiDiscrete", "nvec": np.asarray(space.nvec).tolist()}
+    if isinstance(space, MultiBinary):
+        return {"type": "MultiBinary", "n": np.asarray(space.n).tolist()}
+    if isinstance(space, TupleSpace):
+        return {"type": "Tuple", "spaces": [describe_space(sub_space) for sub_space in space.spaces]}
+    if isinstance(space, DictSpace):
+        return {"type": "Dict",
+                "spaces": {key: describe_space(sub_space) for key, sub_space in space.spaces.items()}}
+    return {"type": type(space).__name__, "repr": repr(space)}
+
+
+class SpaceSnapshot(object):
+    """
+    SpaceSnapshot class to hold the observation and action spaces of agents, together with
+    their descriptors and a version hash computed once. The snapshot is never mutated, so
+    it can be read without lock, and is replaced as a whole when the environments change.
+    """
+    def __init__(self,
+                 observation_spaces: Dict[AgentID, Space],
+                 action_spaces: Dict[AgentID, Space]):
+        """
+        Initialize SpaceSnapshot
+
+        Args:
+            observation_spaces (Dict[AgentID, Space]): the observation spaces with agent name as key.
+            action_spaces (Dict[AgentID, Space]): the action spaces with agent name as key.
+        """
+        self._observation_spaces = dict(observation_spaces)
+        self._action_spaces = dict(action_spaces)
+        self._descriptors = {
+            "observation_space": {agent_name: describe_space(space)
+                                  for agent_name, space in self._observation_spaces.items()},
+            "action_space": {agent_name: describe_space(space)
+                             for agent_name, space in self._action_spaces.items()}
+        }
+        descriptors_json = json.dumps(self._descriptors, sort_keys=True)
+        self._version = hashlib.sha1(descriptors_json.encode("utf-8")).hexdigest()
+        self._json = json.dumps(dict(self._descriptors, version=self._version), sort_keys=True)
+
+    @property
+    def observation_spaces(self) -> Dict[AgentID, Space]:
+        """
+        Returns the observation spaces of agents.
+
+        Returns:
+            Dict[AgentID, Space]: the observation spaces with agent name as key.
+        """
+        return dict(self._observation_spaces)
+
+    @property
+    def action_spaces(self) -> Dict[AgentID, Space]:
+        """
+        Returns the action spaces of agents.
+
+        Returns:
+            Dict[AgentID, Space]: the action spaces with agent name as key.
+        """
+        return dict(self._action_spaces)
+
+    @property
+    def descriptors(self) -> Dict[str, Dict[AgentID, Dict[str, Any]]]:
+        """
+        Returns the descriptors of observation and action spaces.
+
+        Returns:
+            Dict[str, Dict[AgentID, Dict[str, Any]]]: the space descriptors with agent name as key under
+                "observation_space" and "action_space" keys.
+        """
+        return copy.deepcopy(self._descriptors)
+
+    @property
+    def version(self) -> str:
+        """
+        Returns the version hash of the spaces. The hash is stable across processes and
+        changes only when any space changes.
+
+        Returns:
+            str: the version hash of the spaces.
+        """
+        return self._version
+
+    def to_json(self) -> str:
+        """
+        Returns the descriptors and the version hash in JSON.
+
+        Returns:
+            str: the descriptors and the version hash in JSON.
+        """
+        return self._json
@@ -0,0 +1,206 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class for per-phase timing histograms of GymEnvironmentAdapter hot path."""
+from typing import Any, Callable, Dict, Optional
+from threading import Event, Lock, Thread
+import json
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket i holds durations in [2^(i-1), 2^i) microseconds.
+_NUM_BUCKETS = 32
+
+
+class _PhaseHistogram(object):
+    """
+    Log2-bucketed histogram of durations for a single phase.
+    """
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = [0] * _NUM_BUCKETS
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        micros = int(seconds * 1e6)
+        self.buckets[min(micros.bit_length(), _NUM_BUCKETS - 1)] += 1
+
+    def percentile(self, q: float) -> float:
+        """
+        Returns the upper bound of the bucket holding q-th percentile in seconds.
+        """
+        target = q / 100.0 * self.count
+        cumulative = 0
+        for idx, bucket_count in enumerate(self.buckets):
+            cumulative += bucket_count
+            if cumulative >= target and bucket_count:
+                return min((1 << idx) / 1e6, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, float]:
+        if not self.count:
+            return {"count": 0}
+        return {"count": self.count,
+                "total_ms": self.total * 1000.0,
+                "mean_ms": self.total / self.count * 1000.0,
+                "min_ms": self.min * 1000.0,
+                "max_ms": self.max * 1000.0,
+                "p50_ms": self.percentile(50) * 1000.0,
+                "p99_ms": self.percentile(99) * 1000.0}
+
+
+class StepProfiler(object):
+    """
+    StepProfiler class to record timing histograms per phase (e.g. lock_wait, simulate,
+    render, pack) and episode stats of GymEnvironmentAdapter.
+    """
+    def __init__(self):
+        """
+        Initialize StepProfiler
+        """
+        self._phases = {}  # type: Dict[str, _PhaseHistogram]
+        self._episode_count = 0
+        self._episode_length_total = 0
+        self._episode_length_max = 0
+        self._episode_reward_total = 0.0
+        self._start_time = time.time()
+        self._lock = Lock()
+        self._dump_stop = None  # type: Optional[Event]
+
+    def record(self, phase: str, seconds: float) -> None:
+        """
+        Record the duration of given phase.
+
+        Args:
+            phase (str): the phase name.
+            seconds (float): the duration in seconds.
+        """
+        with self._lock:
+            histogram = self._phases.get(phase)
+            if histogram is None:
+                histogram = self._phases[phase] = _PhaseHistogram()
+            histogram.add(seconds)
+
+    def lap(self, phase: str, since: float) -> float:
+        """
+        Record the time elapsed since given perf_counter value as given phase.
+
+        Args:
+            phase (str): the phase name.
+            since (float): the time.perf_counter() value when the phase started.
+
+        Returns:
+            float: the current time.perf_counter() value to start next phase.
+        """
+        now = time.perf_counter()
+        self.record(phase, now - since)
+        return now
+
+    def record_episode(self, length: int, total_reward: float) -> None:
+        """
+        Record the stats of finished episode.
+
+        Args:
+            length (int): the number of steps in the episode.
+            total_reward (float): the sum of rewards in the episode.
+        """
+        with self._lock:
+            self._episode_count += 1
+            self._episode_length_total += length
+            self._episode_length_max = max(self._episode_length_max, length)
+            self._episode_reward_total += total_reward
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the snapshot of recorded stats.
+
+        Returns:
+            Dict[str, Any]: the snapshot of recorded stats.
+        """
+        with self._lock:
+            episodes = {"count": self._episode_count}
+            if self._episode_count:
+                episodes["mean_length"] = self._episode_length_total / self._episode_count
+                episodes["max_length"] = self._episode_length_max
+                episodes["mean_reward"] = self._episode_reward_total / self._episode_count
+            return {"elapsed_sec": time.time() - self._start_time,
+                    "phases": {phase: histogram.to_dict() for phase, histogram in self._phases.items()},
+                    "episodes": episodes}
+
+    def to_json(self) -> str:
+        """
+        Returns the snapshot of recorded stats in JSON.
+
+        Returns:
+            str: the snapshot of recorded stats in JSON.
+        """
+        return json.dumps(self.stats())
+
+    def clear(self) -> None:
+        """
+        Clear all recorded stats.
+        """
+        with self._lock:
+            self._phases = {}
+            self._episode_count = 0
+            self._episode_length_total = 0
+            self._episode_length_max = 0
+            self._episode_reward_total = 0.0
+            self._start_time = time.time()
+
+    def start_periodic_dump(self,
+                            interval: float,
+                            callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+        """
+        Start a background thread dumping stats periodically.
+
+        Args:
+            interval (float): the dump interval in seconds.
+            callback (Optional[Callable[[Dict[str, Any]], None]]): the function receiving the
+                stats snapshot (default: log the stats in JSON).
+        """
+        self.stop_periodic_dump()
+        stop = self._dump_stop = Event()
+
+        def dump() -> None:
+            while not stop.wait(interval):
+                stats = self.stats()
+                if callback:
+                    callback(stats)
+                else:
+                    logger.info("GymEnvironmentAdapter stats: %s", json.dumps(stats))
+
+        Thread(target=dump, daemon=True).start()
+
+    def stop_periodic_dump(self) -> None:
+        """
+        Stop the background thread dumping stats.
+        """
+        if self._dump_stop:
+            self._dump_stop.set()
+            self._dump_stop = None
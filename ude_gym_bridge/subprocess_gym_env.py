@@ -0,0 +1,324 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""A class for OpenAI Gym environment hosted in a worker subprocess."""
+from typing import Any, Callable, Dict, Optional, Tuple
+import multiprocessing
+from multiprocessing.connection import Connection
+
+import numpy as np
+import gym
+
+from ude_gym_bridge.env_state import get_env_state, set_env_state
+from ude_gym_bridge.gym_wrappers import unwrap_env
+from ude_gym_bridge.seeding import reset_env
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover - Python < 3.8
+    shared_memory = None
+
+
+def _worker(env_name: str,
+            conn: Connection,
+            env_wrapper: Optional[Callable[[gym.Env], gym.Env]] = None) -> None:
+    """
+    Subprocess loop hosting the OpenAI Gym environment.
+
+    Args:
+        env_name (str): OpenAI Gym environment name.
+        conn (Connection): the worker end of the pipe to the parent process.
+        env_wrapper (Optional[Callable[[gym.Env], gym.Env]]): the function wrapping the environment.
+    """
+    env = None
+    obs_view = None
+    obs_shm = None
+
+    def pack_obs(obs: Any) -> Any:
+        # Observation is written to shared memory when attached,
+        # then None is sent through the pipe in place of the observation.
+        if obs_view is not None:
+            np.copyto(obs_view, obs, casting="unsafe")
+            return None
+        return obs
+
+    try:
+        try:
+            env = gym.make(env_name)
+            if env_wrapper:
+                env = env_wrapper(env)
+        except Exception as ex:
+            conn.send((False, ex))
+            return
+        conn.send((True, (env.observation_space, env.action_space, unwrap_env(env).observation_space)))
+        while True:
+            cmd, data = conn.recv()
+            try:
+                if cmd == "step":
+                    obs, reward, done, info = env.step(data)
+                    result = (pack_obs(obs), reward, done, info)
+                elif cmd == "reset":
+                    result = pack_obs(reset_env(env, data))
+                elif cmd == "render":
+                    result = env.render(mode=data)
+                elif cmd == "get_state":
+                    result = get_env_state(env)
+                elif cmd == "set_state":
+                    result = set_env_state(env, data)
+                elif cmd == "attach":
+                    # The parent process owns the segment and unlinks it on close.
+                    obs_shm = shared_memory.SharedMemory(name=data)
+                    obs_view = np.ndarray(env.observation_space.shape,
+                                          dtype=env.observation_space.dtype,
+                                          buffer=obs_shm.buf)
+                    result = None
+                elif cmd == "close":
+                    conn.send((True, None))
+                    break
+                else:
+                    raise ValueError("Unknown command: {}".format(cmd))
+                conn.send((True, result))
+            except Exception as ex:
+                conn.send((False, ex))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        obs_view = None
+        if obs_shm is not None:
+            obs_shm.close()
+        if env is not None:
+            env.close()
+        conn.close()
+
+
+class SubprocessGymEnv(gym.Env):
+    """
+    SubprocessGymEnv class to host OpenAI Gym environment in a worker subprocess.
+
+    Actions and commands are sent through a pipe, while Box observations are
+    passed back through a shared-memory buffer (Python 3.8+). step and reset can be
+    issued asynchronously, so steps of several instances run in parallel.
+    """
+    def __init__(self,
+                 env_name: str,
+                 start_method: str = "spawn",
+                 env_wrapper: Optional[Callable[[gym.Env], gym.Env]] = None):
+        """
+        Initialize SubprocessGymEnv
+
+        Args:
+            env_name (str): OpenAI Gym environment name.
+            start_method (str): multiprocessing start method for the worker subprocess.
+            env_wrapper (Optional[Callable[[gym.Env], gym.Env]]): the picklable function wrapping
+                the environment inside the worker subprocess.
+        """
+        super().__init__()
+        self._env_name = env_name
+        self.env_wrapper = env_wrapper
+        ctx = multiprocessing.get_context(start_method)
+        self._conn, worker_conn = ctx.Pipe()
+        self._process = ctx.Process(target=_worker,
+                                    args=(env_name, worker_conn, env_wrapper),
+                                    daemon=True)
+        self._process.start()
+        worker_conn.close()
+        self._closed = False
+        self._waiting = False
+
+        # The observation space of the environment before being wrapped is kept
+        # to validate the preprocessing to apply in place of the current one.
+        self.observation_space, self.action_space, self.base_observation_space = self._receive()
+        self._obs_shm = None
+        self._obs_view = None
+        if shared_memory is not None and isinstance(self.observation_space, gym.spaces.Box):
+            nbytes = max(int(np.prod(self.observation_space.shape)) * self.observation_space.dtype.itemsize, 1)
+            self._obs_shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._obs_view = np.ndarray(self.observation_space.shape,
+                                        dtype=self.observation_space.dtype,
+                                        buffer=self._obs_shm.buf)
+            self._request("attach", self._obs_shm.name)
+
+    @property
+    def env_name(self) -> str:
+        """
+        Returns the OpenAI Gym environment name hosted.
+
+        Returns:
+            str: the OpenAI Gym environment name hosted.
+        """
+        return self._env_name
+
+    def _receive(self) -> Any:
+        """
+        Receive the result of the last command from the worker subprocess.
+
+        Returns:
+            Any: the result of the last command.
+        """
+        self._waiting = False
+        success, result = self._conn.recv()
+        if not success:
+            raise result
+        return result
+
+    def _request(self, cmd: str, data: Any = None) -> Any:
+        """
+        Send the command to the worker subprocess and wait for the result.
+
+        Args:
+            cmd (str): the command name.
+            data (Any): the command data.
+
+        Returns:
+            Any: the result of the command.
+        """
+        self._conn.send((cmd, data))
+        return self._receive()
+
+    def _unpack_obs(self, obs: Any) -> Any:
+        """
+        Returns the observation sent by the worker subprocess.
+
+        Args:
+            obs (Any): the observation received through the pipe.
+
+        Returns:
+            Any: the observation.
+        """
+        if self._obs_view is not None:
+            return self._obs_view.copy()
+        return obs
+
+    def step_async(self, action: Any) -> None:
+        """
+        Send the action to the worker subprocess without waiting for the result.
+
+        Args:
+            action (Any): the action to take.
+        """
+        self._conn.send(("step", action))
+        self._waiting = True
+
+    def step_wait(self) -> Tuple[Any, float, bool, dict]:
+        """
+        Wait for the result of the step issued by step_async.
+
+        Returns:
+            Tuple[Any, float, bool, dict]: observation, reward, done, info
+        """
+        obs, reward, done, info = self._receive()
+        return self._unpack_obs(obs), reward, done, info
+
+    def reset_async(self, seed: Optional[int] = None) -> None:
+        """
+        Send the reset to the worker subprocess without waiting for the result.
+
+        Args:
+            seed (Optional[int]): the seed of new episode, or None to reset without seeding.
+        """
+        if seed is not None:
+            # The action space sampled in this process is seeded along with the worker.
+            self.action_space.seed(seed)
+        self._conn.send(("reset", seed))
+        self._waiting = True
+
+    def reset_wait(self) -> Any:
+        """
+        Wait for the result of the reset issued by reset_async.
+
+        Returns:
+            Any: the first observation of new episode.
+        """
+        return self._unpack_obs(self._receive())
+
+    def step(self, action: Any) -> Tuple[Any, float, bool, dict]:
+        """
+        Performs one step with given action in the worker subprocess.
+
+        Args:
+            action (Any): the action to take.
+
+        Returns:
+            Tuple[Any, float, bool, dict]: observation, reward, done, info
+        """
+        self.step_async(action)
+        return self.step_wait()
+
+    def reset(self, seed: Optional[int] = None, **kwargs) -> Any:
+        """
+        Reset the environment in the worker subprocess.
+
+        Args:
+            seed (Optional[int]): the seed of new episode, or None to reset without seeding.
+
+        Returns:
+            Any: the first observation of new episode.
+        """
+        self.reset_async(seed)
+        return self.reset_wait()
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Returns the snapshot of the environment state in the worker subprocess.
+
+        Returns:
+            Dict[str, Any]: the snapshot of the environment state.
+        """
+        return self._request("get_state")
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restore the environment in the worker subprocess to the snapshot.
+
+        Args:
+            state (Dict[str, Any]): the snapshot of the environment state.
+        """
+        self._request("set_state", state)
+
+    def render(self, mode: str = "human") -> Any:
+        """
+        Render the environment in the worker subprocess.
+
+        Args:
+            mode (str): the render mode.
+
+        Returns:
+            Any: the render result.
+        """
+        return self._request("render", mode)
+
+    def close(self) -> None:
+        """
+        Close the environment, and terminate the worker subprocess.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._waiting:
+                self._receive()
+            self._request("close")
+        except Exception:
+            # The worker subprocess is already gone.
+            pass
+        self._conn.close()
+        self._process.join(timeout=5.0)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._obs_view = None
+        if self._obs_shm is not None:
+            self._obs_shm.close()
+            self._obs_shm.unlink()
+            self._obs_shm = None
@@ -0,0 +1,132 @@
+#################################################################################
+#   Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.          #
+#                                                                               #
+#   Licensed under the Apache License, Version 2.0 (the "License").             #
+#   You may not use this file except in compliance with the License.            #
+#   You may obtain a copy of the License at                                     #
+#                                                                               #
+#       http://www.apache.org/licenses/LICENSE-2.0                              #
+#                                                                               #
+#   Unless required by applicable law or agreed to in writing, software         #
+#   distributed under the License is distributed on an "AS IS" BASIS,           #
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.    #
+#   See the License for the specific language governing permissions and         #
+#   limitations under the License.                                              #
+#################################################################################
+"""Classes for server-side trajectory rollout returning several steps per request."""
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+from gym.spaces.space import Space
+
+POLICY_KEY = "policy"
+RANDOM_POLICY = "random"
+CONSTANT_POLICY = "constant"
+
+
+def make_action_source(value: Any,
+                       action_space: Space,
+                       horizon: int) -> Callable[[int], Optional[Any]]:
+    """
+    Returns the function producing the action of each rollout step from the client request.
+
+    The request is either a sequence of actions (the first dimension is time), a scalar
+    action repeated over the horizon, or a policy spec dict: {"policy": "random"} samples
+    the action space, and {"policy": "constant", "action": action} repeats the given action.
+    A policy spec may limit the number of steps with "steps" key.
+
+    Args:
+        value (Any): the action sequence or policy spec received for the agent.
+        action_space (Space): the action space of the agent.
+        horizon (int): the maximum number of steps in the rollout.
+
+    Returns:
+        Callable[[int], Optional[Any]]: the function returning the action of given step index,
+            or None when there is no more action.
+    """
+    if isinstance(value, dict):
+        policy = value.get(POLICY_KEY)
+        num_steps = min(int(value.get("steps", horizon)), horizon)
+        if policy == RANDOM_POLICY:
+            return lambda idx: action_space.sample() if idx < num_steps else None
+        if policy == CONSTANT_POLICY:
+            if "action" not in value:
+                raise ValueError("constant policy requires action: {}".format(value))
+            action = value["action"]
+            return lambda idx: action if idx < num_steps else None
+        raise ValueError("Unknown rollout policy: {}".format(policy))
+    if np.isscalar(value) or (isinstance(value, np.ndarray) and value.ndim == 0):
+        return lambda idx: value if idx < horizon else None
+    num_steps = min(len(value), horizon)
+    return lambda idx: value[idx] if idx < num_steps else None
+
+
+class TrajectoryBuffer(object):
+    """
+    TrajectoryBuffer class to collect the transitions of a rollout into contiguous
+    arrays preallocated for the rollout horizon on the first transition.
+    """
+    def __init__(self, horizon: int):
+        """
+        Initialize TrajectoryBuffer
+
+        Args:
+            horizon (int): the maximum number of transitions in the trajectory.
+        """
+        if horizon < 1:
+            raise ValueError("horizon must be at least 1: {}".format(horizon))
+        self._horizon = horizon
+        self._size = 0
+        self._obs = None  # type: Optional[np.ndarray]
+        self._actions = None  # type: Optional[np.ndarray]
+        self._rewards = np.empty(horizon, dtype=np.float64)
+        self._dones = np.empty(horizon, dtype=np.bool_)
+        self._infos = []  # type: List[dict]
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _allocate(horizon: int, value: Any) -> np.ndarray:
+        value = np.asarray(value)
+        return np.empty((horizon,) + value.shape, dtype=value.dtype)
+
+    def append(self, obs: Any, action: Any, reward: float, done: bool, info: dict) -> None:
+        """
+        Append the transition to the trajectory.
+
+        Args:
+            obs (Any): the observation after the step (the first observation of new episode,
+                if the environment was automatically reset).
+            action (Any): the action taken.
+            reward (float): the reward of the step.
+            done (bool): the flag whether the episode finished at the step.
+            info (dict): the info of the step.
+        """
+        if self._size >= self._horizon:
+            raise IndexError("TrajectoryBuffer is full: {}".format(self._horizon))
+        if self._obs is None:
+            self._obs = self._allocate(self._horizon, obs)
+            self._actions = self._allocate(self._horizon, action)
+        idx = self._size
+        self._obs[idx] = obs
+        self._actions[idx] = action
+        self._rewards[idx] = reward
+        self._dones[idx] = done
+        self._infos.append(info)
+        self._size += 1
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[dict]]:
+        """
+        Returns the trajectory collected.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[dict]]: observations,
+                rewards, dones and actions with time as the first dimension, and list of infos.
+        """
+        size = self._size
+        if self._obs is None:
+            empty = np.empty(0)
+            return empty, self._rewards[:0], self._dones[:0], empty, []
+        return (self._obs[:size], self._rewards[:size], self._dones[:size],
+                self._actions[:size], list(self._infos))